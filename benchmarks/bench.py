@@ -0,0 +1,355 @@
+"""
+End-to-end curtailment benchmark.
+
+Starts local mock servers for the GridWatch API and for the Proxmox,
+HiveOS and Foreman APIs (see mock_servers.py), then drives them with the
+same building blocks the trigger scripts use: GridWatchClient, the local
+decision, RegionState, TierScheduler, BulkDispatcher and
+dispatch_guests, with the scripts' default batch / parallelism settings.
+
+For every backend and fleet size it measures, over several trials:
+
+- signal-to-shed: the mock API starts answering curtail: true -> the
+  mock backend has received the stop command for the last device;
+- signal-to-resume: the API is back to normal (cooldown set to 0) -> the
+  last device has received its start command, through the resume waves;
+- backend requests per second while shedding.
+
+One untimed warm-up trial runs first for each fleet size. New pooled
+connections (and their TLS setup, for Proxmox) are then not counted;
+use --warmup 0 to include that cold start.
+
+Results are written as JSON tagged with the git commit, so two runs can
+be compared with --baseline.
+
+Usage:
+    python benchmarks/bench.py
+    python benchmarks/bench.py --backends hiveos foreman --fleet-sizes 10 100 1000 10000
+    python benchmarks/bench.py --latency-ms 20 --error-rate 0.05 --baseline benchmarks/results/abc1234.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gridwatch.api import GridWatchClient, GridWatchAPIError, pooled_session
+from gridwatch.decision import decide
+from gridwatch.dispatch import BulkDispatcher
+from gridwatch.monitor import RegionState, CURTAIL, RESUME
+from gridwatch.tiers import DeviceGroup, TierScheduler
+
+from mock_servers import MockGridWatch, MockHiveOS, MockForeman, MockProxmox
+
+BACKENDS = ("proxmox", "hiveos", "foreman")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+HIVE_FARM_ID = 123456
+REGION = "ERCOT"
+PRICE_CAP = 200
+STRESS_CAP = 90
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values), 2),
+        "mean": round(sum(values) / len(values), 2),
+    }
+
+
+def git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# --- Backends, wired the way the trigger scripts wire them ---
+
+class Fleet:
+    """One backend under test: its mock server and stop / start functions."""
+
+    def __init__(self, name, mock, stop_fn, start_fn, stop_action, start_action, wave_size, close=None):
+        self.name = name
+        self.mock = mock
+        self.stop_fn = stop_fn
+        self.start_fn = start_fn
+        self.stop_action = stop_action
+        self.start_action = start_action
+        self.wave_size = wave_size
+        self._close = close
+
+    def close(self):
+        if self._close:
+            self._close()
+        self.mock.stop()
+
+
+def mock_options(args):
+    return dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+
+
+def build_hiveos(args):
+    mock = MockHiveOS(**mock_options(args)).start()
+    dispatcher = BulkDispatcher(
+        pooled_session(args.parallel, {"Authorization": "Bearer bench"}),
+        max_batch_size=args.batch_size, max_workers=args.parallel, timeout=5,
+    )
+    url = f"{mock.url}/api/v2/farms/{HIVE_FARM_ID}/workers/command"
+
+    def command(action):
+        return lambda ids: dispatcher.post(url, ids, lambda batch: {
+            "worker_ids": batch, "data": {"command": "miner", "data": {"action": action}},
+        })
+
+    return Fleet("hiveos", mock, command("stop"), command("start"), "stop", "start",
+                 args.wave_size or 50, dispatcher.session.close)
+
+
+def build_foreman(args):
+    mock = MockForeman(**mock_options(args)).start()
+    dispatcher = BulkDispatcher(
+        pooled_session(args.parallel, {"Authorization": "Token bench"}),
+        max_batch_size=args.batch_size, max_workers=args.parallel, timeout=10,
+    )
+    url = f"{mock.url}/api/v2/miners/command"
+
+    def command(name):
+        return lambda ids: dispatcher.post(url, ids, lambda batch: {"command": name, "miner_ids": batch})
+
+    return Fleet("foreman", mock, command("stop"), command("start"), "stop", "start",
+                 args.wave_size or 50, dispatcher.session.close)
+
+
+def build_proxmox(args):
+    import urllib3
+    from gridwatch.proxmox import ProxmoxConnectionManager, dispatch_guests
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    nodes = [f"pve{i + 1}" for i in range(args.proxmox_nodes)]
+    mock = MockProxmox(nodes=nodes, **mock_options(args)).start()
+    address = mock.url[len("https://"):]
+    manager = ProxmoxConnectionManager({node: address for node in nodes}, "root@pam", password="bench")
+    errors = manager.prewarm()
+    if errors:
+        raise RuntimeError(f"could not log in to the Proxmox mock: {errors}")
+
+    def command(action):
+        return lambda ids: dispatch_guests(manager, ids, action, args.proxmox_parallel)
+
+    return Fleet("proxmox", mock, command("shutdown"), command("start"), "shutdown", "start",
+                 args.wave_size or 10)
+
+
+BUILDERS = {"proxmox": build_proxmox, "hiveos": build_hiveos, "foreman": build_foreman}
+
+
+# --- Measurement ---
+
+def poll_until_ok(client, attempts=20):
+    """One poll as the scripts do it (raw metrics, local decision); retries injected API errors."""
+    for _ in range(attempts):
+        try:
+            return decide(client.get_curtailment(REGION), PRICE_CAP, STRESS_CAP)
+        except GridWatchAPIError:
+            continue
+    raise RuntimeError("GridWatch mock kept failing")
+
+
+def run_trial(api, client, fleet, ids):
+    """
+    One curtail + resume cycle. Returns (shed_ms, resume_ms, shed_requests,
+    shed_seconds, missing devices). Latencies are up to the last device
+    that did receive its command; devices that never did are counted in
+    `missing` (e.g. with --error-rate, once retries run out).
+    """
+    state = RegionState(REGION, cooldown_minutes=0)
+    groups = DeviceGroup.from_config([], ids)
+    tiers = TierScheduler(groups, fleet.stop_fn, fleet.start_fn, wave_size=fleet.wave_size, wave_interval=0)
+    fleet.mock.reset()
+
+    # Signal -> shed
+    api.set_signal(True)
+    signal = api.signal_time
+    event, _ = state.update(poll_until_ok(client)["curtail"])
+    if event != CURTAIL:
+        raise RuntimeError(f"expected a curtailment, got {event}")
+    tiers.curtail()
+    last_stop, missing_stop = fleet.mock.last_receipt(fleet.stop_action, ids)
+    shed_seconds = time.perf_counter() - signal
+    shed_requests = fleet.mock.requests
+
+    # Signal -> resume (cooldown 0, waves back to back)
+    api.set_signal(False)
+    signal_normal = api.signal_time
+    event, _ = state.update(poll_until_ok(client)["curtail"])
+    if event != RESUME:
+        raise RuntimeError(f"expected a resume, got {event}")
+    tiers.resume(background=False)
+    # Guests whose stop never arrived are still running and are skipped
+    stopped = fleet.mock.delivered(fleet.stop_action, ids)
+    last_start, missing_start = fleet.mock.last_receipt(fleet.start_action, stopped)
+
+    shed_ms = (last_stop - signal) * 1000 if last_stop else None
+    resume_ms = (last_start - signal_normal) * 1000 if last_start else None
+    return shed_ms, resume_ms, shed_requests, shed_seconds, missing_stop + missing_start
+
+
+def bench_backend(args, api, client, name):
+    try:
+        fleet = BUILDERS[name](args)
+    except Exception as e:
+        print(f"[{name}] skipped: {e}")
+        return []
+
+    rows = []
+    try:
+        for size in args.fleet_sizes:
+            fleet.mock.reset(size)
+            ids = list(fleet.mock.ids)
+            shed, resume, rates, missing = [], [], [], 0
+            for trial in range(args.warmup + args.trials):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    shed_ms, resume_ms, requests, seconds, lost = run_trial(api, client, fleet, ids)
+                if trial < args.warmup:
+                    continue
+                if shed_ms is not None:
+                    shed.append(shed_ms)
+                if resume_ms is not None:
+                    resume.append(resume_ms)
+                rates.append(requests / seconds if seconds > 0 else 0.0)
+                missing = max(missing, lost)
+
+            row = {
+                "backend": name,
+                "fleet_size": size,
+                "trials": args.trials,
+                "signal_to_shed_ms": summarize(shed),
+                "signal_to_resume_ms": summarize(resume),
+                "shed_requests_per_sec": round(sum(rates) / len(rates), 1),
+                "devices_missed": missing,
+            }
+            rows.append(row)
+            print_row(row)
+    finally:
+        fleet.close()
+    return rows
+
+
+# --- Reporting ---
+
+def print_row(row, baseline=None):
+    shed = row["signal_to_shed_ms"] or {}
+    resume = row["signal_to_resume_ms"] or {}
+
+    def fmt(stats, key):
+        return f"{stats[key]:>9.1f}" if key in stats else f"{'n/a':>9}"
+
+    line = (f"{row['backend']:<8} {row['fleet_size']:>6} "
+            f"{fmt(shed, 'p50')} {fmt(shed, 'p95')} {fmt(shed, 'p99')} "
+            f"{fmt(resume, 'p50')} {fmt(resume, 'p95')} {row['shed_requests_per_sec']:>8.0f} "
+            f"{row['devices_missed']:>6}")
+    if baseline and baseline.get("signal_to_shed_ms") and shed:
+        before = baseline["signal_to_shed_ms"]["p50"]
+        line += f"   shed p50 {(shed['p50'] - before) / before * 100:+.1f}% vs baseline"
+    print(line)
+
+
+def print_header():
+    print(f"{'backend':<8} {'fleet':>6} {'shed p50':>9} {'p95':>9} {'p99':>9} "
+          f"{'resume p50':>9} {'p95':>9} {'req/s':>8} {'missed':>6}   (ms)")
+
+
+def compare(rows, path):
+    with open(path) as f:
+        baseline = json.load(f)
+    previous = {(r["backend"], r["fleet_size"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline['commit']} ({path}):")
+    print_header()
+    for row in rows:
+        print_row(row, previous.get((row["backend"], row["fleet_size"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GridWatch signal-to-shed benchmark against local mock servers.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--fleet-sizes", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="untimed trials per fleet size first; 0 includes cold connection pools")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="backend latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--api-latency-ms", type=float, default=30.0, help="GridWatch API latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of commands answered 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of commands answered 429")
+    parser.add_argument("--batch-size", type=int, default=100, help="HiveOS / Foreman IDs per request")
+    parser.add_argument("--parallel", type=int, default=4, help="HiveOS / Foreman requests in flight")
+    parser.add_argument("--proxmox-nodes", type=int, default=3)
+    parser.add_argument("--proxmox-parallel", type=int, default=8, help="Proxmox calls in flight per node")
+    parser.add_argument("--wave-size", type=int, help="resume wave size (default: each script's setting)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help=f"results file (default {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    print(f"--- GridWatch benchmark @ {commit} ---")
+    print(f"Backend latency {args.latency_ms}ms (+{args.jitter_ms}ms jitter), API {args.api_latency_ms}ms, "
+          f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%}, {args.trials} trials\n")
+
+    api = MockGridWatch(latency_ms=args.api_latency_ms, seed=args.seed).start()
+    client = GridWatchClient("bench", base_url=api.url)
+    print_header()
+    rows = []
+    try:
+        for name in args.backends:
+            rows.extend(bench_backend(args, api, client, name))
+    finally:
+        client.close()
+        api.stop()
+
+    result = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": rows,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.baseline:
+        compare(rows, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Local stand-ins for the GridWatch API and the fleet backends, for benchmarking.
+
+Each mock is a threaded keep-alive HTTP server on 127.0.0.1 with:
+
+- latency_ms / jitter_ms: delay added to every request;
+- error_rate: fraction of command requests answered 503 (retried by the
+  dispatchers), rate_limit_rate: fraction answered 429 + Retry-After;
+- fleet_size: how many devices exist (IDs start at FIRST_ID);
+- drop_rate: fraction of device commands acknowledged but never carried
+  out (for the reconciler). For the Proxmox mock these are guests that
+  ignore the ACPI shutdown: the task runs for `task_timeout_s` and fails.
+
+The fleet backends also keep each device's running / stopped state and
+serve it on their bulk read endpoints; set_state() plays an operator
+flipping devices by hand.
+
+Every device command is recorded with a time.perf_counter() timestamp, so
+the harness (same process) can tell when the last device got its command.
+
+The Proxmox mock speaks HTTPS, because proxmoxer only talks HTTPS. It uses
+a throwaway self-signed certificate made with the `openssl` command.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIRST_ID = 100
+
+
+class MockService:
+    """
+    Base class: request plumbing, latency / error injection, bookkeeping.
+    Subclasses implement route(method, path, query, body, headers).
+    """
+
+    name = "mock"
+    scheme = "http"
+
+    def __init__(self, fleet_size=100, latency_ms=5.0, jitter_ms=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, drop_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.drop_rate = drop_rate
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.server = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset(fleet_size)
+
+    def reset(self, fleet_size=None):
+        """Clears the counters; optionally resizes the fleet."""
+        with self._lock:
+            if fleet_size is not None:
+                self.fleet_size = fleet_size
+                self.ids = list(range(FIRST_ID, FIRST_ID + fleet_size))
+            self.requests = 0
+            self.errors = 0
+            self.received = {}  # (action, device id) -> perf_counter of the first receipt
+            self.state = {device: "running" for device in self.ids}
+
+    # --- Hooks for subclasses ---
+
+    def route(self, method, path, query, body, headers):
+        """Returns (status, body, headers)."""
+        return 404, {"error": "not found"}, {}
+
+    def ssl_context(self):
+        return None
+
+    # --- Bookkeeping ---
+
+    def record(self, action, ids):
+        now = time.perf_counter()
+        with self._lock:
+            for device in ids:
+                self.received.setdefault((action, int(device)), now)
+
+    def apply(self, action, ids):
+        """Records a command and changes device state, unless it is dropped."""
+        self.record(action, ids)
+        status = "running" if action == "start" else "stopped"
+        with self._lock:
+            for device in ids:
+                if self._random.random() >= self.drop_rate:
+                    self.state[int(device)] = status
+
+    def set_state(self, ids, status):
+        """Changes devices behind the controller's back ("running" / "stopped")."""
+        with self._lock:
+            for device in ids:
+                self.state[int(device)] = status
+
+    def last_receipt(self, action, ids):
+        """(perf_counter of the last receipt, devices that never got `action`)."""
+        with self._lock:
+            times = [self.received.get((action, int(i))) for i in ids]
+        missing = sum(t is None for t in times)
+        seen = [t for t in times if t is not None]
+        return (max(seen) if seen else None), missing
+
+    def delivered(self, action, ids):
+        """The subset of `ids` that received `action`."""
+        with self._lock:
+            return [i for i in ids if (action, int(i)) in self.received]
+
+    def inject_error(self):
+        """Returns (status, body, headers) for an injected failure, or None."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 429, {"error": "rate limited"}, {"Retry-After": "0.05"}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503, {"error": "injected failure"}, {}
+        return None
+
+    # --- Server ---
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this,
+            # Nagle + delayed ACK adds ~40ms to every keep-alive response.
+            disable_nagle_algorithm = True
+
+            def _handle(self, method):
+                with service._lock:
+                    service.requests += 1
+                delay = service.latency_ms + (service._random.uniform(0, service.jitter_ms) if service.jitter_ms else 0)
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                content_type = self.headers.get("Content-Type") or ""
+                if "json" in content_type:
+                    body = json.loads(raw or b"null")
+                else:
+                    body = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+                try:
+                    status, payload, headers = service.route(method, parts.path, query, body, self.headers)
+                except Exception as e:
+                    status, payload, headers = 500, {"error": str(e)}, {}
+                if status >= 400:
+                    with service._lock:
+                        service.errors += 1
+
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 128
+        context = self.ssl_context()
+        if context is not None:
+            # Accepted sockets inherit TCP_NODELAY; the TLS handshake runs on the
+            # first read, in the connection's own thread rather than in accept().
+            self.server.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.server.socket = context.wrap_socket(
+                self.server.socket, server_side=True, do_handshake_on_connect=False
+            )
+        threading.Thread(target=self.server.serve_forever, name=f"mock-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class MockGridWatch(MockService):
+    """
+    GET /api/curtailment. The harness flips the signal with set_signal();
+    responses carry an ETag, so unchanged polls come back 304.
+    """
+
+    name = "gridwatch"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.curtail = False
+        self.signal_time = None
+
+    def set_signal(self, curtail):
+        self.curtail = curtail
+        self.signal_time = time.perf_counter()
+
+    def route(self, method, path, query, body, headers):
+        if method != "GET" or path != "/api/curtailment":
+            return 404, {"error": "not found"}, {}
+        error = self.inject_error()
+        if error:
+            return error
+        payload = {
+            "region": query.get("region", "ERCOT"),
+            "curtail": self.curtail,
+            "trigger_reason": "BENCHMARK SPIKE" if self.curtail else None,
+            "metrics": {
+                "price_usd": 950.0 if self.curtail else 35.0,
+                "load_mw": 70000,
+                "utilization_pct": 97.0 if self.curtail else 60.0,
+                "data_age_mins": 0.5,
+            },
+        }
+        etag = '"' + hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+        if headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        return 200, payload, {"ETag": etag}
+
+
+class MockHiveOS(MockService):
+    """POST /api/v2/farms/{farm}/workers/command, as sent by hiveos_trigger.py."""
+
+    name = "hiveos"
+    PATH = re.compile(r"^/api/v2/farms/(\d+)/workers/command$")
+
+    WORKERS = re.compile(r"^/api/v2/farms/(\d+)/workers$")
+
+    def route(self, method, path, query, body, headers):
+        if method == "GET" and self.WORKERS.match(path):
+            with self._lock:
+                return 200, {"data": [
+                    {"id": device, "stats": {"online": True},
+                     "miners_summary": {"hashrates": [{"hash": 100.0 if status == "running" else 0}]}}
+                    for device, status in self.state.items()
+                ]}, {}
+        if method != "POST" or not self.PATH.match(path):
+            return 404, {"error": "not found"}, {}
+        error = self.inject_error()
+        if error:
+            return error
+        ids = body.get("worker_ids") or []
+        unknown = [i for i in ids if not FIRST_ID <= int(i) < FIRST_ID + self.fleet_size]
+        if unknown:
+            return 422, {"message": f"Unknown workers: {unknown[:5]}"}, {}
+        self.apply(body["data"]["data"]["action"], ids)
+        return 200, {"commands": [{"worker_id": i, "status": "queued"} for i in ids]}, {}
+
+
+class MockForeman(MockService):
+    """POST /api/v2/miners/command, as sent by foreman_trigger.py."""
+
+    name = "foreman"
+
+    def route(self, method, path, query, body, headers):
+        if method == "GET" and path == "/api/v2/miners":
+            with self._lock:
+                return 200, [
+                    {"id": device, "online": True, "hashRate": 95.0 if status == "running" else 0}
+                    for device, status in self.state.items()
+                ], {}
+        if method != "POST" or path != "/api/v2/miners/command":
+            return 404, {"error": "not found"}, {}
+        error = self.inject_error()
+        if error:
+            return error
+        ids = body.get("miner_ids") or []
+        unknown = [i for i in ids if not FIRST_ID <= int(i) < FIRST_ID + self.fleet_size]
+        if unknown:
+            return 400, {"error": f"Unknown miners: {unknown[:5]}"}, {}
+        self.apply(body["command"], ids)
+        return 200, {"success": True, "count": len(ids)}, {}
+
+
+class MockProxmox(MockService):
+    """
+    The slice of the Proxmox VE API used by gridwatch.proxmox: ticket login,
+    /cluster/status, /cluster/resources, nodes/{node}/{type}/{vmid}/status/{action}
+    and the task list of each node (source / errors / since / limit).
+    Guests are spread round-robin over `nodes`, alternating qemu / lxc.
+
+    A graceful shutdown takes `shutdown_s` seconds; its task (UPID) stays
+    active until then. `stop` (hard stop) and `start` take effect at once.
+    """
+
+    name = "proxmox"
+    scheme = "https"
+    PATH = re.compile(r"^/api2/json/nodes/([^/]+)/(qemu|lxc)/(\d+)/status/(\w+)$")
+    TASKS = re.compile(r"^/api2/json/nodes/([^/]+)/tasks$")
+
+    def __init__(self, nodes=("pve",), shutdown_s=0.0, task_timeout_s=60.0, **kwargs):
+        self.nodes = list(nodes)
+        self.shutdown_s = shutdown_s
+        self.task_timeout_s = task_timeout_s
+        self._certdir = None
+        super().__init__(**kwargs)
+
+    def reset(self, fleet_size=None):
+        super().reset(fleet_size)
+        with self._lock:
+            self.guests = {
+                vmid: {
+                    "vmid": vmid,
+                    "node": self.nodes[i % len(self.nodes)],
+                    "type": "qemu" if i % 2 == 0 else "lxc",
+                    "status": "running",
+                }
+                for i, vmid in enumerate(self.ids)
+            }
+            self.tasks = {}  # upid -> {"vmid", "node", "starttime", "ends", "stops", "exitstatus"}
+
+    def set_state(self, ids, status):
+        with self._lock:
+            for vmid in ids:
+                self.guests[int(vmid)]["status"] = status
+
+    def _advance(self):
+        """Finishes the shutdown tasks that are due (called with the lock held)."""
+        now = time.monotonic()
+        for task in self.tasks.values():
+            if task["exitstatus"] is None and now >= task["ends"]:
+                if task["stops"]:
+                    self.guests[task["vmid"]]["status"] = "stopped"
+                    task["exitstatus"] = "OK"
+                else:
+                    task["exitstatus"] = "VM quit/powerdown failed - got timeout"
+
+    def ssl_context(self):
+        openssl = shutil.which("openssl")
+        if not openssl:
+            raise RuntimeError("the Proxmox mock needs the `openssl` command to make a test certificate")
+        self._certdir = tempfile.mkdtemp(prefix="gridwatch-bench-")
+        cert = os.path.join(self._certdir, "cert.pem")
+        key = os.path.join(self._certdir, "key.pem")
+        subprocess.run(
+            [openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+            check=True, capture_output=True,
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        return context
+
+    def stop(self):
+        super().stop()
+        if self._certdir:
+            shutil.rmtree(self._certdir, ignore_errors=True)
+            self._certdir = None
+
+    def route(self, method, path, query, body, headers):
+        if path == "/api2/json/access/ticket" and method == "POST":
+            return 200, {"data": {"ticket": "PVE:bench@pam:0000", "CSRFPreventionToken": "0000:bench",
+                                  "username": body.get("username")}}, {}
+        if path == "/api2/json/cluster/status" and method == "GET":
+            host, port = self.server.server_address[:2]
+            return 200, {"data": [
+                {"type": "node", "name": node, "ip": f"{host}:{port}", "online": 1} for node in self.nodes
+            ]}, {}
+        if path == "/api2/json/cluster/resources" and method == "GET":
+            with self._lock:
+                self._advance()
+                return 200, {"data": [dict(g) for g in self.guests.values()]}, {}
+        match = self.TASKS.match(path)
+        if match and method == "GET":
+            # Like PVE: source=archive (default) lists finished tasks with their
+            # exit status, "active" the running ones, "all" both; newest first
+            source = query.get("source", "archive")
+            errors = query.get("errors") in ("1", "true")
+            since = int(query.get("since", 0))
+            with self._lock:
+                self._advance()
+                listed = []
+                for upid, task in reversed(list(self.tasks.items())):
+                    running = task["exitstatus"] is None
+                    if task["node"] != match.group(1) or task["starttime"] < since:
+                        continue
+                    if source != "all" and running != (source == "active"):
+                        continue
+                    if errors and (running or task["exitstatus"] == "OK"):
+                        continue
+                    entry = {"upid": upid, "node": task["node"], "starttime": task["starttime"]}
+                    if not running:
+                        entry["status"] = task["exitstatus"]
+                    listed.append(entry)
+                return 200, {"data": listed[:int(query.get("limit", 50))]}, {}
+
+        match = self.PATH.match(path)
+        if not match or method != "POST":
+            return 404, {"data": None, "errors": "not found"}, {}
+        node, kind, vmid, action = match.group(1), match.group(2), int(match.group(3)), match.group(4)
+        error = self.inject_error()
+        if error:
+            return error
+        with self._lock:
+            guest = self.guests.get(vmid)
+            if guest is None or guest["node"] != node or guest["type"] != kind:
+                return 500, {"data": None, "errors": f"Configuration file for {vmid} does not exist"}, {}
+            dropped = self._random.random() < self.drop_rate
+            starttime = int(time.time())
+            upid = f"UPID:{node}:0000{vmid:04X}:{len(self.tasks):08X}:{starttime:08X}:{kind[0]}m{action}:{vmid}:root@pam:"
+            if action == "shutdown":
+                # A guest ignoring ACPI keeps running until the task times out
+                self.tasks[upid] = {
+                    "vmid": vmid, "node": node, "starttime": starttime, "stops": not dropped, "exitstatus": None,
+                    "ends": time.monotonic() + (self.task_timeout_s if dropped else self.shutdown_s),
+                }
+                self._advance()
+            elif not dropped:
+                guest["status"] = "running" if action == "start" else "stopped"
+        self.record(action, [vmid])
+        return 200, {"data": upid}, {}
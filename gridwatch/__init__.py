@@ -0,0 +1,7 @@
+"""
+Shared building blocks for the GridWatch controllers.
+
+The scripts in the repository root and in `integrations/` keep their
+configuration at the top of the file; everything they have in common
+lives here.
+"""
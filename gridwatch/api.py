@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+API_HOST = "gridwatch-us-telemetry.p.rapidapi.com"
+API_URL = f"https://{API_HOST}"
+CURTAILMENT_PATH = "/api/curtailment"
+
+# Region Options: PJM, MISO, ERCOT, SPP, NYISO, ISONE, CAISO
+SUPPORTED_REGIONS = ["PJM", "MISO", "ERCOT", "SPP", "NYISO", "ISONE", "CAISO"]
+
+# Timing of a single API call, in milliseconds.
+#   connect_ms: TCP + TLS handshake (0.0 when a pooled connection was reused)
+#   ttfb_ms:    request sent -> response headers received (includes connect)
+#   total_ms:   request sent -> body fully read
+RequestTiming = namedtuple(
+    "RequestTiming", ["connect_ms", "ttfb_ms", "total_ms", "reused", "status_code", "not_modified"]
+)
+
+# Connect times are recorded per thread so concurrent polls don't mix them up.
+_local = threading.local()
+
+
+class GridWatchAPIError(Exception):
+    """Raised when the API answers with anything other than 200/304."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _local.connect_ms = (time.perf_counter() - start) * 1000
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _local.connect_ms = (time.perf_counter() - start) * 1000
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose pooled connections record how long the handshake took.
+    Used by every session in this package so timings are comparable.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def pooled_session(pool_size=10, headers=None):
+    """
+    Returns a keep-alive requests.Session with a connection pool of `pool_size`.
+    """
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def timed_request(session, method, url, **kwargs):
+    """
+    Performs a request on `session` and returns (response, RequestTiming).
+    The body is read before returning, so the connection goes back to the pool.
+    """
+    _local.connect_ms = None
+    start = time.perf_counter()
+    response = session.request(method, url, stream=True, **kwargs)
+    ttfb = time.perf_counter() - start
+    response.content  # read the body (decompressing gzip) and release the connection
+    total = time.perf_counter() - start
+
+    connect_ms = _local.connect_ms
+    timing = RequestTiming(
+        connect_ms=round(connect_ms or 0.0, 2),
+        ttfb_ms=round(ttfb * 1000, 2),
+        total_ms=round(total * 1000, 2),
+        reused=connect_ms is None,
+        status_code=response.status_code,
+        not_modified=response.status_code == 304,
+    )
+    return response, timing
+
+
+class GridWatchClient:
+    """
+    Reusable GridWatch API client.
+
+    Owns one pooled keep-alive session with the RapidAPI headers preset, so
+    only the first poll pays for the TCP/TLS handshake. Responses are
+    revalidated with ETag / Last-Modified: if the API answers 304 the cached
+    body is returned instead.
+
+    Usage:
+        client = GridWatchClient(RAPIDAPI_KEY)
+        data = client.get_curtailment("ERCOT", price_cap=200, stress_cap=90)
+        print(client.last_timing)
+    """
+
+    def __init__(self, api_key, base_url=API_URL, host=API_HOST, timeout=10, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = pooled_session(pool_size, {
+            "X-RapidAPI-Key": api_key,
+            "X-RapidAPI-Host": host,
+        })
+        self.last_timing = None
+        self.last_timings = {}  # region -> RequestTiming, safe to read after concurrent polls
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get_curtailment(self, region, price_cap=None, stress_cap=None):
+        """
+        Fetches /api/curtailment for `region` and returns the decoded JSON.
+        Raises GridWatchAPIError on a non-200 answer.
+        """
+        params = {"region": region}
+        if price_cap is not None:
+            params["price_cap"] = str(price_cap)
+        if stress_cap is not None:
+            params["stress_cap"] = str(stress_cap)
+
+        key = tuple(sorted(params.items()))
+        with self._lock:
+            cached = self._cache.get(key)
+
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response, timing = timed_request(
+            self.session, "GET", self.base_url + CURTAILMENT_PATH,
+            params=params, headers=headers, timeout=self.timeout,
+        )
+        self.last_timing = timing
+        self.last_timings[region] = timing
+
+        if response.status_code == 304 and cached:
+            return cached[2]
+        if response.status_code != 200:
+            raise GridWatchAPIError(response.status_code, response.text)
+
+        data = response.json()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self._cache[key] = (etag, last_modified, data)
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+def format_timing(timing):
+    """One-line summary of a RequestTiming for the console."""
+    if timing is None:
+        return "n/a"
+    connect = "reused" if timing.reused else f"{timing.connect_ms:.1f}ms"
+    cached = " (304 cached)" if timing.not_modified else ""
+    return f"connect {connect} | TTFB {timing.ttfb_ms:.1f}ms | total {timing.total_ms:.1f}ms{cached}"
@@ -0,0 +1,24 @@
+"""
+Backends the controller can curtail.
+
+Every backend implements the same three calls - stop(region),
+resume(region) and status() - so one controller process can drive any mix
+of them from a single poll (see gridwatch.controller).
+
+ProxmoxBackend imports proxmoxer only when it first connects.
+"""
+from gridwatch.backends.base import Backend, CallbackBackend, FleetBackend
+from gridwatch.backends.miners import ForemanBackend, HiveOSBackend
+from gridwatch.backends.proxmox import ProxmoxBackend
+from gridwatch.backends.shell import ShellBackend, WebhookBackend
+
+__all__ = [
+    "Backend",
+    "CallbackBackend",
+    "FleetBackend",
+    "ForemanBackend",
+    "HiveOSBackend",
+    "ProxmoxBackend",
+    "ShellBackend",
+    "WebhookBackend",
+]
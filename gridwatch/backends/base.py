@@ -0,0 +1,326 @@
+import threading
+import time
+
+from gridwatch.decision import ThresholdProfile
+from gridwatch.events import EventLog
+from gridwatch.metrics import ControllerMetrics, outcome_label
+from gridwatch.reconcile import RUNNING, STOPPED
+from gridwatch.tiers import DeviceGroup, TierScheduler
+
+
+class Backend:
+    """
+    Something the controller can curtail: a fleet manager, a PDU script, a
+    building management system...
+
+    Subclasses implement stop(region) / resume(region) and may override
+    status() and prepare(). stop() and resume() return {device: result},
+    using "ok" / "sent" for success and "failed: ..." / "error: ..." for
+    failures, like the dispatchers do.
+
+    timeout: seconds the controller waits for stop() / resume() before it
+             reports the backend as timed out and moves on.
+    regions: ISOs this backend follows (None = every monitored region).
+    profile: its own thresholds, as a ThresholdProfile or a dict of
+             price_cap / stress_cap / cooldown_minutes. The controller then
+             curtails it on those, with its own cooldown, from the same
+             fetch as everything else (None = the region's thresholds).
+
+    A backend following several regions is stopped once, when the first of
+    them goes critical, and resumed once all of them have recovered. Set
+    per_region = True to receive every region's stop / resume instead.
+    """
+
+    kind = "backend"
+    per_region = False
+
+    def __init__(self, name=None, timeout=60, regions=None, profile=None):
+        self.name = name or self.kind
+        self.timeout = timeout
+        self.regions = [r.upper() for r in regions] if regions else None
+        if isinstance(profile, ThresholdProfile):
+            profile = vars(profile)
+        if profile is not None:
+            profile = ThresholdProfile(self.name, **{k: v for k, v in profile.items() if k != "name"})
+        self.profile = profile
+        self.metrics = ControllerMetrics(enabled=False)  # replaced by the controller's
+        self.journal = None  # gridwatch.state.StateJournal, set by the controller
+        self.events = EventLog(None)  # replaced by the controller's
+        self.curtailed = False
+        self.last_action = None
+        self.last_results = {}
+        self.region = None  # region of the stop / resume being carried out, for the event stream
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+    def follows(self, region):
+        return self.regions is None or region.upper() in self.regions
+
+    def describe(self):
+        """One line for the startup banner."""
+        return self.name
+
+    def prepare(self):
+        """Called once before the first poll (log in, warm up connections)."""
+
+    def reconfigure(self, other):
+        """
+        Takes the settings of `other`, a freshly built instance of the same
+        backend, without touching the current curtailment (config reloads,
+        see gridwatch.config). Returns (added, removed) device IDs.
+        """
+        self.timeout = other.timeout
+        self.regions = other.regions
+        self.profile = other.profile
+        return [], []
+
+    def stop(self, region):
+        raise NotImplementedError
+
+    def resume(self, region):
+        raise NotImplementedError
+
+    def observe(self):
+        """
+        {device: "running" | "stopped" | "offline" | "unknown"} from one bulk
+        read, for the reconciler (gridwatch.reconcile). None if the backend
+        has no way to read device state.
+        """
+        return None
+
+    def status(self):
+        """
+        Current state as a dict. The default is what this process last did;
+        backends that can ask the devices override it.
+        """
+        counts = {}
+        for result in self.last_results.values():
+            outcome = str(result).split(":", 1)[0]
+            counts[outcome] = counts.get(outcome, 0) + 1
+        return {"curtailed": self.curtailed, "last_action": self.last_action, "last_results": counts}
+
+    def record(self, action, results, elapsed, region=None):
+        """
+        Keeps the outcome of one command for status(), the metrics, the event
+        stream and the journal. `region` defaults to the one of the current
+        stop / resume, so resume waves and reconciler commands are tagged too.
+        """
+        region = region or self.region
+        self.last_action = action
+        self.last_results = dict(results)
+        self.metrics.dispatch(self.name, action, results, elapsed)
+        if self.events.enabled:
+            outcomes = {}
+            for result in results.values():
+                outcome = outcome_label(result)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            self.events.emit("command", backend=self.name, action=action, region=region, devices=len(results),
+                             elapsed_s=round(elapsed, 3), outcomes=outcomes)
+            self.events.emit_devices(self.name, action, self.last_results, region=region)
+        self.save()
+
+    def snapshot(self):
+        """What has to survive a restart, as a JSON-safe dict."""
+        return {"curtailed": self.curtailed, "last_action": self.last_action, "region": self.region}
+
+    def restore(self, snapshot):
+        self.curtailed = bool(snapshot.get("curtailed"))
+        self.last_action = snapshot.get("last_action")
+        self.region = snapshot.get("region")
+
+    def save(self):
+        if self.journal is not None:
+            self.journal.record("backend", self.name, self.snapshot())
+
+
+class FleetBackend(Backend):
+    """
+    A backend that commands many devices by ID, shed in priority tiers and
+    resumed in waves (see gridwatch.tiers).
+
+    Subclasses implement send(action, ids) -> {id: result} and set
+    stop_action / start_action to the backend's own command names.
+
+    Devices the stop command actually reached are remembered in `stopped`
+    (and journaled); resume only starts those, so a device that was
+    already off, or that someone stopped by hand, is left alone.
+
+    `desired` maps every commanded device to (state, monotonic time of the
+    command) for the reconciler; subclasses that can read device state in
+    bulk implement observe().
+    """
+
+    stop_action = "stop"
+    start_action = "start"
+
+    def __init__(self, ids, groups=None, target_mw=None, wave_size=50, wave_interval=10, **kwargs):
+        super().__init__(**kwargs)
+        self.ids = list(ids)
+        self.stopped = None  # None = unknown (never stopped): resume starts every device
+        self.desired = {}
+        self._stopped_lock = threading.Lock()
+        self.tiers = TierScheduler(
+            DeviceGroup.from_config(groups, self.ids),
+            lambda batch: self.send_command(self.stop_action, batch),
+            self._start_batch,
+            target_mw=target_mw,
+            wave_size=wave_size,
+            wave_interval=wave_interval,
+        )
+
+    def describe(self):
+        return f"{self.name} ({len(self.ids)} devices)"
+
+    def send(self, action, ids):
+        raise NotImplementedError
+
+    @property
+    def resuming(self):
+        """True while staggered resume waves are still going out."""
+        return self.tiers.resuming
+
+    def reconfigure(self, other):
+        """
+        Also takes the devices, groups, shed target and resume waves.
+        Removed devices are no longer managed: they are left as they are
+        and not started on resume. Added devices are not stopped here; see
+        unshed().
+        """
+        super().reconfigure(other)
+        current = set(other.ids)
+        previous = set(self.ids)
+        added = [device for device in other.ids if device not in previous]
+        removed = [device for device in self.ids if device not in current]
+        self.ids = list(other.ids)
+        with self._stopped_lock:
+            for device in removed:
+                self.desired.pop(device, None)
+                if self.stopped is not None:
+                    self.stopped.discard(device)
+            stopped = set(self.stopped or ())
+
+        tiers = self.tiers
+        tiers.groups = other.tiers.groups
+        tiers.target_mw = other.tiers.target_mw
+        tiers.wave_size = other.tiers.wave_size
+        tiers.wave_interval = other.tiers.wave_interval
+        if self.curtailed or tiers.shed_groups:
+            # Shed groups (and so the resume waves) follow the new grouping;
+            # without a shed target a curtailment covers every group
+            everything = self.curtailed and tiers.target_mw is None
+            tiers.shed_groups = [
+                group for group in tiers.groups
+                if everything or any(device in stopped for device in group.ids)
+            ]
+        return added, removed
+
+    def unshed(self):
+        """Devices of the shed groups still running while curtailed, e.g. just added to the config."""
+        if not self.curtailed:
+            return []
+        with self._stopped_lock:
+            stopped = set(self.stopped or ())
+        return [device for group in self.tiers.shed_groups for device in group.ids if device not in stopped]
+
+    def _start_batch(self, ids):
+        if self.stopped is not None:
+            ids = [device for device in ids if device in self.stopped]
+        return self.send_command(self.start_action, ids) if ids else {}
+
+    def send_command(self, action, ids):
+        """Sends one command to `ids` and updates stopped / desired. Returns {id: result}."""
+        want = STOPPED if action == self.stop_action else RUNNING
+        now = time.monotonic()
+        for device in ids:
+            self.desired[device] = (want, now)
+        start = time.perf_counter()
+        try:
+            results = self.send(action, ids)
+        except Exception as e:
+            print(f"      -> {self.name} Error: {e}")
+            results = {device: f"error: {e}" for device in ids}
+
+        with self._stopped_lock:
+            if self.stopped is None and action == self.stop_action:
+                self.stopped = set()
+            for device, result in results.items():
+                outcome = str(result).split(":", 1)[0]
+                if action == self.stop_action and outcome in ("ok", "sent"):
+                    self.stopped.add(device)
+                elif (action == self.start_action and self.stopped is not None
+                      and (outcome in ("ok", "sent") or outcome.startswith("already"))):
+                    self.stopped.discard(device)
+        self.record(action, results, time.perf_counter() - start)
+        return results
+
+    def snapshot(self):
+        with self._stopped_lock:
+            stopped = sorted(self.stopped, key=str) if self.stopped is not None else None
+        return dict(super().snapshot(), stopped=stopped)
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        stopped = snapshot.get("stopped")
+        self.stopped = set(stopped) if stopped is not None else None
+        self.desired = {device: (STOPPED, 0.0) for device in self.stopped or ()}
+        # Resume waves cover the groups that still hold stopped devices
+        self.tiers.shed_groups = [
+            group for group in self.tiers.groups if any(device in self.stopped for device in group.ids)
+        ] if self.stopped else []
+
+    def stop(self, region):
+        self.curtailed = True
+        self.region = region
+        if self.stopped is None:
+            self.stopped = set()
+        shed_mw, elapsed, by_group = self.tiers.curtail()
+        print(f"      -> {self.name}: {shed_mw:.2f} MW shed in {elapsed:.2f}s")
+        results = {}
+        for group_results in by_group.values():
+            results.update(group_results or {})
+        return results
+
+    def resume(self, region):
+        self.curtailed = False
+        self.region = region
+        self.save()
+        waves = self.tiers.resume()
+        print(f"      -> {self.name}: resuming in {waves} waves")
+        return {}
+
+
+class CallbackBackend(Backend):
+    """
+    Wraps plain functions, e.g. the stop_mining_rigs(region) /
+    resume_mining_rigs(region) hooks in gridwatch_client.py.
+    """
+
+    kind = "custom"
+    per_region = True  # the hooks get the region and decide for themselves
+
+    def __init__(self, name, stop_fn, resume_fn, status_fn=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self.stop_fn = stop_fn
+        self.resume_fn = resume_fn
+        self.status_fn = status_fn
+
+    def _call(self, action, fn, region):
+        start = time.perf_counter()
+        fn(region)
+        results = {self.name: "ok"}
+        self.record(action, results, time.perf_counter() - start, region)
+        return results
+
+    def stop(self, region):
+        self.curtailed = True
+        return self._call("stop", self.stop_fn, region)
+
+    def resume(self, region):
+        self.curtailed = False
+        return self._call("resume", self.resume_fn, region)
+
+    def status(self):
+        if self.status_fn:
+            return self.status_fn()
+        return super().status()
@@ -0,0 +1,104 @@
+from gridwatch.api import pooled_session
+from gridwatch.backends.base import FleetBackend
+from gridwatch.dispatch import BulkDispatcher, print_dispatch_report
+from gridwatch.reconcile import OFFLINE, RUNNING, STOPPED
+
+
+def hashing_state(online, hashrate):
+    """Observed state of a miner from its online flag and total hashrate."""
+    if not online:
+        return OFFLINE
+    return RUNNING if hashrate and hashrate > 0 else STOPPED
+
+
+class HiveOSBackend(FleetBackend):
+    """
+    HiveOS workers: `miner stop` on curtailment, `miner start` on resume,
+    sent in concurrent batches (see gridwatch.dispatch.BulkDispatcher).
+    """
+
+    kind = "hiveos"
+    API_URL = "https://api2.hiveos.farm/api/v2"
+
+    def __init__(self, token, farm_id, worker_ids, batch_size=100, max_parallel=4,
+                 api_url=API_URL, **kwargs):
+        super().__init__(worker_ids, **kwargs)
+        self.farm_id = farm_id
+        self.workers_url = f"{api_url.rstrip('/')}/farms/{farm_id}/workers"
+        self.url = self.workers_url + "/command"
+        self.dispatcher = BulkDispatcher(
+            pooled_session(max_parallel, {"Authorization": f"Bearer {token}"}),
+            max_batch_size=batch_size,
+            max_workers=max_parallel,
+            timeout=5,
+        )
+
+    def send(self, action, ids):
+        def payload(batch):
+            return {
+                "worker_ids": batch,
+                "data": {
+                    "command": "miner",
+                    "data": {"action": action}
+                }
+            }
+
+        report = self.dispatcher.post(self.url, ids, payload)
+        print_dispatch_report("HiveOS", action, report)
+        return report.results
+
+    def observe(self):
+        """Every managed worker's state from one GET /farms/{farm}/workers."""
+        response = self.dispatcher.session.get(self.workers_url, timeout=self.dispatcher.timeout)
+        response.raise_for_status()
+        wanted = set(self.ids)
+        states = {}
+        for worker in response.json().get("data", []):
+            if worker.get("id") not in wanted:
+                continue
+            stats = worker.get("stats") or {}
+            hashrates = (worker.get("miners_summary") or {}).get("hashrates") or []
+            states[worker["id"]] = hashing_state(stats.get("online"), sum(h.get("hash") or 0 for h in hashrates))
+        return states
+
+
+class ForemanBackend(FleetBackend):
+    """
+    Foreman miners: `stop` pauses mining on curtailment (usually safer than a
+    full power off), `start` on resume, sent in concurrent batches.
+    """
+
+    kind = "foreman"
+    API_URL = "https://api.foreman.mn/api/v2"
+
+    def __init__(self, token, miner_ids, batch_size=100, max_parallel=4, api_url=API_URL, **kwargs):
+        super().__init__(miner_ids, **kwargs)
+        self.miners_url = f"{api_url.rstrip('/')}/miners"
+        self.url = self.miners_url + "/command"
+        self.dispatcher = BulkDispatcher(
+            pooled_session(max_parallel, {"Authorization": f"Token {token}"}),
+            max_batch_size=batch_size,
+            max_workers=max_parallel,
+            timeout=10,
+        )
+
+    def send(self, action, ids):
+        report = self.dispatcher.post(
+            self.url, ids,
+            lambda batch: {"command": action, "miner_ids": batch}
+        )
+        print_dispatch_report("Foreman", action, report)
+        return report.results
+
+    def observe(self):
+        """Every managed miner's state from one GET /miners."""
+        response = self.dispatcher.session.get(self.miners_url, timeout=self.dispatcher.timeout)
+        response.raise_for_status()
+        body = response.json()
+        wanted = set(self.ids)
+        states = {}
+        for miner in body.get("miners", []) if isinstance(body, dict) else body:
+            if miner.get("id") not in wanted:
+                continue
+            states[miner["id"]] = hashing_state(miner.get("online"), miner.get("hashRate"))
+        return states
@@ -0,0 +1,179 @@
+import threading
+
+from gridwatch.backends.base import FleetBackend
+from gridwatch.reconcile import RUNNING, STOPPED, UNKNOWN
+
+
+class ProxmoxBackend(FleetBackend):
+    """
+    Proxmox VE VMs and LXC containers: graceful ACPI shutdown on curtailment,
+    start on resume. Sessions are opened once per node by prepare() (see
+    gridwatch.proxmox.ProxmoxConnectionManager) and reused afterwards.
+
+    After a curtailment the shutdowns are followed in the background until
+    the guests are actually off (gridwatch.proxmox.ShutdownTracker). A
+    guest still running `shutdown_deadline` seconds later gets a hard stop
+    (unless hard_stop=False). The result, power actually shed and
+    time-to-stopped, goes to the console, the metrics and the event stream,
+    and is kept in `last_shed`.
+
+    Usage:
+        ProxmoxBackend({"pve": "192.168.1.10"}, "root@pam", token_name="gridwatch",
+                       token_value="...", vmids=[100, 101, 102])
+    """
+
+    kind = "proxmox"
+    stop_action = "shutdown"
+    start_action = "start"
+
+    def __init__(self, nodes, user, password=None, token_name=None, token_value=None,
+                 vmids=(), max_parallel=8, verify_ssl=False, wave_size=10, shutdown_deadline=120,
+                 hard_stop=True, stop_deadline=30, **kwargs):
+        super().__init__(vmids, wave_size=wave_size, **kwargs)
+        self.shutdown_deadline = shutdown_deadline
+        self.hard_stop = hard_stop
+        self.stop_deadline = stop_deadline
+        self.last_shed = None  # gridwatch.proxmox.ShutdownReport of the last curtailment
+        self._tasks = None  # {vmid: (guest, upid, sent at)} collected during stop()
+        self._tracking = None
+        self._tracking_cancel = threading.Event()
+        self.nodes = dict(nodes)
+        self.user = user
+        self.password = password
+        self.token_name = token_name
+        self.token_value = token_value
+        self.max_parallel = max_parallel
+        self.verify_ssl = verify_ssl
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def describe(self):
+        return f"{self.name} (nodes {', '.join(self.nodes)} | guests {self.ids})"
+
+    def manager(self):
+        """The shared connection manager; logs in to every node on first use."""
+        with self._lock:
+            if self._manager is None:
+                # Imported here so proxmoxer is only needed when Proxmox is used
+                from gridwatch.proxmox import ProxmoxConnectionManager
+
+                if not self.verify_ssl:
+                    import urllib3
+
+                    # Self-signed Proxmox certs: don't warn on every call
+                    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+                manager = ProxmoxConnectionManager(
+                    self.nodes,
+                    user=self.user,
+                    password=self.password,
+                    token_name=self.token_name,
+                    token_value=self.token_value,
+                    verify_ssl=self.verify_ssl,
+                )
+                manager.discover()
+                for node, e in manager.prewarm().items():
+                    print(f"   [WARN] Proxmox node {node} unreachable: {e}")
+                manager.start_refresher()
+                self._manager = manager
+            return self._manager
+
+    def reconfigure(self, other):
+        self.shutdown_deadline = other.shutdown_deadline
+        self.hard_stop = other.hard_stop
+        self.stop_deadline = other.stop_deadline
+        return super().reconfigure(other)
+
+    def prepare(self):
+        # Log in now rather than during the first price spike
+        try:
+            self.manager()
+        except Exception as e:
+            print(f"   [ERROR] Could not connect to Proxmox: {e}")
+
+    def send(self, action, ids):
+        from gridwatch.proxmox import dispatch_guests, print_dispatch_results
+
+        tasks = {} if action == self.stop_action else None
+        results, latency = dispatch_guests(self.manager(), ids, action, self.max_parallel, tasks)
+        print_dispatch_results(results, latency)
+        if tasks:
+            with self._lock:
+                if self._tasks is not None:
+                    self._tasks.update(tasks)
+        return results
+
+    # --- Shutdown tracking ---
+
+    @property
+    def tracking(self):
+        """True while shutdowns are still being followed."""
+        return self._tracking is not None and self._tracking.is_alive()
+
+    def _cancel_tracking(self):
+        if self.tracking:
+            self._tracking_cancel.set()
+            self._tracking.join()
+        self._tracking_cancel = threading.Event()
+
+    def _guest_mw(self):
+        """{vmid: its share of its group's MW}."""
+        return {vmid: group.mw / len(group.ids) for group in self.tiers.groups for vmid in group.ids if group.mw}
+
+    def _track(self, tasks, cancel):
+        from gridwatch.proxmox import HARD_STOPPED, STILL_RUNNING, ShutdownTracker
+
+        tracker = ShutdownTracker(self.manager(), self.shutdown_deadline, self.stop_deadline, self.hard_stop,
+                                  max_workers=self.max_parallel)
+        report = tracker.track(tasks, self._guest_mw(), cancel)
+        if cancel.is_set():
+            return
+        self.last_shed = report
+        print(f"\n      -> {self.name}: {report.summary()}")
+        self.metrics.shutdowns(self.name, report)
+        if self.events.enabled:
+            latency = report.latency()
+            self.events.emit("shed", backend=self.name, region=self.region, guests=len(report.outcomes),
+                             shed_mw=round(report.shed_mw, 3), target_mw=round(report.target_mw, 3),
+                             hard_stopped=report.count(HARD_STOPPED), still_running=report.count(STILL_RUNNING),
+                             p50_s=round(latency[0], 1) if latency else None,
+                             p95_s=round(latency[1], 1) if latency else None)
+            self.events.emit_devices(self.name, "shed", {
+                vmid: f"{outcome} after {report.seconds[vmid]:.0f}s" if vmid in report.seconds else outcome
+                for vmid, outcome in report.outcomes.items()
+            }, region=self.region)
+
+    def stop(self, region):
+        self._cancel_tracking()
+        with self._lock:
+            self._tasks = {}
+        results = super().stop(region)
+        with self._lock:
+            tasks, self._tasks = self._tasks, None
+        if tasks:
+            cancel = self._tracking_cancel
+            self._tracking = threading.Thread(target=self._track, args=(tasks, cancel),
+                                              name=f"gridwatch-{self.name}-shed", daemon=True)
+            self._tracking.start()
+        return results
+
+    def resume(self, region):
+        # Guests are about to be started: no more escalations
+        self._cancel_tracking()
+        return super().resume(region)
+
+    def observe(self):
+        """Every managed guest's state from one /cluster/resources query."""
+        from gridwatch.proxmox import guest_index
+
+        index = guest_index(self.manager().connection())
+        states = {"running": RUNNING, "stopped": STOPPED}
+        return {
+            vmid: states.get(index[int(vmid)].get("status"), UNKNOWN)
+            for vmid in self.ids if int(vmid) in index
+        }
+
+    def status(self):
+        from gridwatch.proxmox import guest_index
+
+        index = guest_index(self.manager().connection())
+        return {vmid: index[vmid].get("status") if vmid in index else "not found" for vmid in self.ids}
@@ -0,0 +1,122 @@
+import os
+import subprocess
+import time
+
+from gridwatch.api import pooled_session
+from gridwatch.backends.base import Backend
+
+
+class ShellBackend(Backend):
+    """
+    Runs a local command on curtailment / resume: a PDU or smart plug CLI,
+    an SSH one-liner, a systemctl call...
+
+    The command runs through the shell with GRIDWATCH_ACTION ("stop" /
+    "resume") and GRIDWATCH_REGION set in its environment. A non-zero exit
+    status or running past `timeout` counts as a failure.
+
+    Usage:
+        ShellBackend("pdu", "snmpset ... outletCommand.1 i 2", "snmpset ... outletCommand.1 i 1")
+    """
+
+    kind = "shell"
+
+    def __init__(self, name, stop_command, resume_command, status_command=None, timeout=30, **kwargs):
+        super().__init__(name=name, timeout=timeout, **kwargs)
+        self.stop_command = stop_command
+        self.resume_command = resume_command
+        self.status_command = status_command
+
+    def describe(self):
+        return f"{self.name} (shell)"
+
+    def _run(self, command, action, region):
+        env = dict(os.environ, GRIDWATCH_ACTION=action, GRIDWATCH_REGION=region or "")
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(command, shell=True, env=env, capture_output=True, text=True,
+                                  timeout=self.timeout)
+            if proc.returncode == 0:
+                result = "ok"
+            else:
+                output = (proc.stderr or proc.stdout).strip()[:200]
+                result = f"failed: exit {proc.returncode} {output}".strip()
+        except subprocess.TimeoutExpired:
+            result = f"failed: timed out after {self.timeout}s"
+        except OSError as e:
+            result = f"error: {e}"
+
+        print(f"      -> {self.name}: {action} {result}")
+        results = {self.name: result}
+        self.record(action, results, time.perf_counter() - start, region)
+        return results
+
+    def stop(self, region):
+        self.curtailed = True
+        return self._run(self.stop_command, "stop", region)
+
+    def resume(self, region):
+        self.curtailed = False
+        return self._run(self.resume_command, "resume", region)
+
+    def status(self):
+        if not self.status_command:
+            return super().status()
+        proc = subprocess.run(self.status_command, shell=True, capture_output=True, text=True,
+                              timeout=self.timeout)
+        return {"returncode": proc.returncode, "output": proc.stdout.strip()}
+
+
+class WebhookBackend(Backend):
+    """
+    POSTs {"action": "stop" | "resume", "region": ..., "source": "gridwatch"}
+    to a URL: Home Assistant, Node-RED, a BMS gateway, an internal service.
+    Any 2xx answer counts as success.
+
+    status_url: optional URL whose JSON body is returned by status().
+    """
+
+    kind = "webhook"
+
+    def __init__(self, name, url, headers=None, status_url=None, timeout=10, **kwargs):
+        super().__init__(name=name, timeout=timeout, **kwargs)
+        self.url = url
+        self.status_url = status_url
+        self.session = pooled_session(2, headers)
+
+    def describe(self):
+        return f"{self.name} ({self.url})"
+
+    def _post(self, action, region):
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.url, json={"action": action, "region": region, "source": "gridwatch"},
+                timeout=self.timeout
+            )
+            if 200 <= response.status_code < 300:
+                result = "ok"
+            else:
+                result = f"failed: {response.status_code} {response.text[:200]}"
+        except Exception as e:
+            result = f"error: {e}"
+
+        print(f"      -> {self.name}: {action} {result}")
+        results = {self.name: result}
+        self.record(action, results, time.perf_counter() - start, region)
+        return results
+
+    def stop(self, region):
+        self.curtailed = True
+        return self._post("stop", region)
+
+    def resume(self, region):
+        self.curtailed = False
+        return self._post("resume", region)
+
+    def status(self):
+        if not self.status_url:
+            return super().status()
+        response = self.session.get(self.status_url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
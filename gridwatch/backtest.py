@@ -0,0 +1,275 @@
+"""
+Backtesting and parameter sweeps for the curtailment logic.
+
+Replays a historical price / utilization series through the same rules
+the controller uses live:
+
+- curtail when price > PRICE_CAP or utilization > STRESS_CAP
+  (gridwatch.decision.evaluate);
+- a new breach while curtailed resets the cooldown;
+- resume once the grid has been normal for COOLDOWN_MINUTES
+  (gridwatch.monitor.RegionState).
+
+The state machine is solved in closed form instead of step by step: after
+sample i the fleet is curtailed iff sample i breaches, or the last breach
+was at j < i and t[i] - t[j + 1] < cooldown (t[j + 1] being the poll that
+started the cooldown). With np.maximum.accumulate that is a handful of
+array operations per cap pair, broadcast over every cooldown at once.
+
+Per combination it reports curtailed hours, avoided energy cost
+(price x LOAD_MW while curtailed), net savings after the value of the
+lost work (VALUE_PER_MWH), and the number of stop/start cycles.
+
+Usage:
+    python -m gridwatch.backtest gridwatch_history --regions ERCOT PJM \\
+        --price-caps 100:500:10 --stress-caps 80:99:1 --cooldowns 0,5,15,30,60
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from gridwatch.decision import evaluate
+from gridwatch.monitor import RegionState, CURTAIL
+
+SAMPLE_SECONDS = 300
+COLUMNS = ("region", "price_cap", "stress_cap", "cooldown_minutes",
+           "curtailed_hours", "avoided_cost", "net_savings", "cycles")
+
+
+def load_series(history_dir, region, start=None, end=None):
+    """
+    Reads one region from a gridwatch.history store as
+    {"ts", "price_usd", "utilization_pct"} NumPy columns.
+    """
+    from gridwatch.history import HistoryStore
+
+    store = HistoryStore(history_dir)
+    try:
+        columns = store.region(region).query(start, end)
+    finally:
+        store.close()
+    return {name: columns[name] for name in ("ts", "price_usd", "utilization_pct")}
+
+
+def _durations(ts):
+    """Seconds each sample's state is held: until the next sample (last: one interval)."""
+    import numpy as np
+
+    if not len(ts):
+        return np.empty(0)
+    step = np.diff(ts).astype(float)
+    last = float(np.median(step)) if len(step) else SAMPLE_SECONDS
+    return np.r_[step, last]
+
+
+def prepare(series, load_mw=1.0):
+    """
+    Precomputes the per-sample arrays every combination shares, so a sweep
+    only pays for them once per region.
+    """
+    import numpy as np
+
+    ts = np.asarray(series["ts"], dtype=np.int64)
+    held = _durations(ts)
+    energy = held / 3600.0 * load_mw
+    price = np.asarray(series["price_usd"], dtype=float)
+    return {
+        "ts": ts,
+        "price_usd": price,
+        "utilization_pct": np.asarray(series["utilization_pct"], dtype=float),
+        "index": np.arange(len(ts)),
+        "held": held,
+        "energy": energy,
+        "cost": np.nan_to_num(price) * energy,
+    }
+
+
+def _run(prepared, breach, cooldowns, value_per_mwh):
+    import numpy as np
+
+    ts = prepared["ts"]
+    n = len(ts)
+    if not n:
+        zeros = np.zeros(len(cooldowns))
+        return {"curtailed_hours": zeros, "avoided_cost": zeros, "net_savings": zeros,
+                "cycles": zeros.astype(int)}
+
+    # Index of the last breach at or before each sample (-1 = none yet)
+    last = np.maximum.accumulate(np.where(breach, prepared["index"], -1))
+    # The cooldown starts at the first normal poll after that breach
+    since = (ts - ts[np.minimum(last + 1, n - 1)]).astype(float)
+    since[last < 0] = -np.inf
+
+    curtailed = breach | (since[None, :] < cooldowns[:, None] * 60)
+    curtailed &= (last >= 0)
+    rising = curtailed.copy()
+    rising[:, 1:] &= ~curtailed[:, :-1]
+
+    curtailed = curtailed.astype(float)
+    avoided_cost = curtailed @ prepared["cost"]
+    return {
+        "curtailed_hours": curtailed @ prepared["held"] / 3600.0,
+        "avoided_cost": avoided_cost,
+        "net_savings": avoided_cost - curtailed @ prepared["energy"] * value_per_mwh,
+        "cycles": rising.sum(axis=1),
+    }
+
+
+def simulate(series, price_cap, stress_cap, cooldowns, load_mw=1.0, value_per_mwh=0.0):
+    """
+    Runs one cap pair against `series` for every cooldown (minutes) in
+    `cooldowns`. Returns a dict of arrays, one entry per cooldown:
+    {"curtailed_hours", "avoided_cost", "net_savings", "cycles"}.
+    """
+    import numpy as np
+
+    prepared = prepare(series, load_mw)
+    with np.errstate(invalid="ignore"):
+        breach = (prepared["price_usd"] > price_cap) | (prepared["utilization_pct"] > stress_cap)
+    return _run(prepared, breach, np.atleast_1d(np.asarray(cooldowns, dtype=float)), value_per_mwh)
+
+
+def replay(series, price_cap, stress_cap, cooldown_minutes, load_mw=1.0, value_per_mwh=0.0):
+    """
+    Reference implementation: feeds the series sample by sample through
+    RegionState, exactly as the live controller does. Slow; used to
+    check simulate().
+    """
+    import datetime
+
+    ts = [int(t) for t in series["ts"]]
+    held = _durations(series["ts"])
+    state = RegionState("backtest", cooldown_minutes)
+    hours = avoided = energy_total = 0.0
+    cycles = 0
+    for i, t in enumerate(ts):
+        price = float(series["price_usd"][i])
+        metrics = {"price_usd": None if price != price else price,
+                   "utilization_pct": float(series["utilization_pct"][i])}
+        curtail, _ = evaluate(metrics, price_cap, stress_cap)
+        event, _ = state.update(curtail, datetime.datetime.fromtimestamp(t))
+        cycles += event == CURTAIL
+        if state.curtailed:
+            energy = held[i] / 3600.0 * load_mw
+            hours += held[i] / 3600.0
+            avoided += (metrics["price_usd"] or 0.0) * energy
+            energy_total += energy
+    return {
+        "curtailed_hours": hours,
+        "avoided_cost": avoided,
+        "net_savings": avoided - energy_total * value_per_mwh,
+        "cycles": cycles,
+    }
+
+
+def _sweep_chunk(args):
+    import numpy as np
+
+    region, series, price_caps, stress_caps, cooldowns, load_mw, value_per_mwh = args
+    prepared = prepare(series, load_mw)
+    cooldown_array = np.asarray(cooldowns, dtype=float)
+    with np.errstate(invalid="ignore"):
+        # Each cap's breach mask is computed once and OR-ed per combination
+        stress_breach = [prepared["utilization_pct"] > cap for cap in stress_caps]
+        rows = []
+        for price_cap in price_caps:
+            price_breach = prepared["price_usd"] > price_cap
+            for stress_cap, util_breach in zip(stress_caps, stress_breach):
+                result = _run(prepared, price_breach | util_breach, cooldown_array, value_per_mwh)
+                for k, cooldown in enumerate(cooldowns):
+                    rows.append((region, price_cap, stress_cap, cooldown,
+                                 float(result["curtailed_hours"][k]), float(result["avoided_cost"][k]),
+                                 float(result["net_savings"][k]), int(result["cycles"][k])))
+    return rows
+
+
+def sweep(series_by_region, price_caps, stress_caps, cooldowns, load_mw=1.0,
+          value_per_mwh=0.0, workers=None):
+    """
+    Backtests every (region, price_cap, stress_cap, cooldown) combination.
+
+    The price caps of each region are split into chunks and run on a
+    process pool (workers=1 runs in-process). Returns a list of row tuples
+    in COLUMNS order.
+    """
+    workers = workers or os.cpu_count() or 1
+    price_caps = list(price_caps)
+    chunks = max(1, min(len(price_caps), -(-workers * 2 // max(1, len(series_by_region)))))
+    size = -(-len(price_caps) // chunks)
+    tasks = [
+        (region, series, price_caps[i:i + size], list(stress_caps), list(cooldowns), load_mw, value_per_mwh)
+        for region, series in series_by_region.items()
+        for i in range(0, len(price_caps), size)
+    ]
+
+    if workers == 1:
+        return [row for chunk in map(_sweep_chunk, tasks) for row in chunk]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [row for chunk in pool.map(_sweep_chunk, tasks) for row in chunk]
+
+
+def parse_values(text):
+    """'100:400:25' -> 100, 125, ... 400 (inclusive); '5,15,30' -> a list."""
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 6) for i in range(count)]
+    return [float(v) for v in text.split(",")]
+
+
+def _main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest GridWatch curtailment thresholds against recorded history.")
+    parser.add_argument("directory", help="gridwatch.history directory")
+    parser.add_argument("--regions", nargs="+", help="default: every region in the directory")
+    parser.add_argument("--days", type=float, default=365, help="how far back to replay (default 365)")
+    parser.add_argument("--price-caps", default="100:500:25", help="start:stop:step or a comma list")
+    parser.add_argument("--stress-caps", default="80:98:2")
+    parser.add_argument("--cooldowns", default="0,5,15,30,60", help="minutes")
+    parser.add_argument("--load-mw", type=float, default=1.0, help="fleet draw while running (default 1 MW)")
+    parser.add_argument("--value-per-mwh", type=float, default=0.0,
+                        help="what an MWh of work earns, charged against avoided cost")
+    parser.add_argument("--max-cycles", type=int, help="ignore combinations with more stop/start cycles")
+    parser.add_argument("--sort", choices=COLUMNS[4:], default="net_savings")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--verify", action="store_true",
+                        help="check the best combination against a step-by-step replay")
+    args = parser.parse_args()
+
+    from gridwatch.history import HistoryStore
+
+    regions = args.regions or HistoryStore(args.directory).regions()
+    start = time.time() - args.days * 86400
+    series = {region.upper(): load_series(args.directory, region, start) for region in regions}
+    price_caps = parse_values(args.price_caps)
+    stress_caps = parse_values(args.stress_caps)
+    cooldowns = parse_values(args.cooldowns)
+
+    combos = len(series) * len(price_caps) * len(stress_caps) * len(cooldowns)
+    samples = sum(len(s["ts"]) for s in series.values())
+    began = time.perf_counter()
+    rows = sweep(series, price_caps, stress_caps, cooldowns, args.load_mw, args.value_per_mwh, args.workers)
+    elapsed = time.perf_counter() - began
+    print(f"Backtested {combos} combinations over {samples} samples in {elapsed:.2f}s\n")
+
+    key = COLUMNS.index(args.sort)
+    for region in series:
+        best = [r for r in rows if r[0] == region and (args.max_cycles is None or r[7] <= args.max_cycles)]
+        best.sort(key=lambda r: r[key], reverse=args.sort != "cycles")
+        print(f"[{region}] top {min(args.top, len(best))} by {args.sort}:")
+        print(f"   {'price':>7} {'stress':>6} {'cool':>5} {'hours':>8} {'avoided $':>11} {'net $':>11} {'cycles':>6}")
+        for r in best[:args.top]:
+            print(f"   {r[1]:>7g} {r[2]:>6g} {r[3]:>5g} {r[4]:>8.1f} {r[5]:>11,.0f} {r[6]:>11,.0f} {r[7]:>6}")
+        if args.verify and best:
+            r = best[0]
+            check = replay(series[region], r[1], r[2], r[3], args.load_mw, args.value_per_mwh)
+            ok = check["cycles"] == r[7] and abs(check["avoided_cost"] - r[5]) < 1e-6 * max(1.0, abs(r[5]))
+            print(f"   Replay check: {'✅ matches' if ok else '❌ MISMATCH'} "
+                  f"({check['curtailed_hours']:.1f}h, ${check['avoided_cost']:,.0f}, {check['cycles']} cycles)")
+        print()
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,226 @@
+"""
+Command-line entry point: one subcommand per backend.
+
+    python -m gridwatch <backend> [options] [--once]
+
+With --once the process loads the journaled state, polls every region
+once, dispatches if needed, saves the state and exits. This is meant for
+a systemd timer or cron: nothing holds memory between polls, and each
+run starts in a fraction of a second. Backend libraries are imported only
+for the subcommand used. proxmoxer is loaded only when a Proxmox command
+is actually sent, and NumPy only for history queries. Each --once run
+ends with a line showing its wall time and peak RSS.
+
+Secrets can come from the environment instead of the command line:
+GRIDWATCH_API_KEY, PROXMOX_PASSWORD, PROXMOX_TOKEN_VALUE, HIVEOS_TOKEN,
+FOREMAN_TOKEN.
+
+Usage:
+    python -m gridwatch monitor --regions ERCOT PJM               # watch only
+    python -m gridwatch proxmox --node pve=192.168.1.10 --user root@pam \\
+        --token-name gridwatch --vmids 100,101,102 --live --once
+    python -m gridwatch hiveos --farm-id 123456 --workers 112233,445566 --live
+    python -m gridwatch foreman --miners 123,456 --live --once
+    python -m gridwatch shell --stop "./pdu.sh off" --resume "./pdu.sh on" --live --once
+    python -m gridwatch webhook --url http://homeassistant.local:8123/api/webhook/gridwatch --live
+    python -m gridwatch fleet --config fleet.json --live        # many sites, hot-reloaded
+
+The fleet command takes its regions, per-region thresholds and backends
+from a config file (gridwatch.config) and applies edits to it without a
+restart.
+"""
+import argparse
+import os
+import time
+
+
+def _ids(text):
+    """'100,101,102' -> [100, 101, 102]"""
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def _listen(text):
+    """'127.0.0.1:9108' -> ("127.0.0.1", 9108)"""
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _node(text):
+    """'pve=192.168.1.10' -> ("pve", "192.168.1.10")"""
+    name, sep, host = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=HOST, got {text!r}")
+    return name, host
+
+
+# --- Backends (each imports only its own module) ---
+
+def _monitor(args):
+    return []
+
+
+def _fleet(args):
+    return []  # built from --config by the controller
+
+
+def _proxmox(args):
+    from gridwatch.backends.proxmox import ProxmoxBackend
+
+    return [ProxmoxBackend(
+        dict(args.node), args.user,
+        password=args.password,
+        token_name=args.token_name,
+        token_value=args.token_value,
+        vmids=args.vmids,
+        max_parallel=args.max_parallel,
+        verify_ssl=args.verify_ssl,
+        shutdown_deadline=args.shutdown_deadline,
+        hard_stop=args.hard_stop,
+        timeout=args.timeout or 120,
+    )]
+
+
+def _hiveos(args):
+    from gridwatch.backends.miners import HiveOSBackend
+
+    return [HiveOSBackend(args.token, args.farm_id, args.workers, timeout=args.timeout or 60)]
+
+
+def _foreman(args):
+    from gridwatch.backends.miners import ForemanBackend
+
+    return [ForemanBackend(args.token, args.miners, timeout=args.timeout or 60)]
+
+
+def _shell(args):
+    from gridwatch.backends.shell import ShellBackend
+
+    return [ShellBackend(args.name, args.stop, args.resume, args.status, timeout=args.timeout or 30)]
+
+
+def _webhook(args):
+    from gridwatch.backends.shell import WebhookBackend
+
+    return [WebhookBackend(args.name, args.url, status_url=args.status_url, timeout=args.timeout or 10)]
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--api-key", default=os.environ.get("GRIDWATCH_API_KEY"),
+                        help="RapidAPI key (default: $GRIDWATCH_API_KEY)")
+    common.add_argument("--gridwatch-url", help="GridWatch base URL, e.g. a LAN sidecar")
+    common.add_argument("--regions", nargs="+", default=["ERCOT"])
+    common.add_argument("--price-cap", type=float, default=200)
+    common.add_argument("--stress-cap", type=float, default=90)
+    common.add_argument("--cooldown", type=int, default=15, help="minutes (default 15)")
+    common.add_argument("--live", action="store_true", help="actually send commands (default: simulation)")
+    common.add_argument("--once", action="store_true", help="poll once, act, save state and exit")
+    common.add_argument("--state-file", default="gridwatch_state.jsonl", help="'' to disable")
+    common.add_argument("--history-dir", default="gridwatch_history", help="'' to disable")
+    common.add_argument("--events-file", default="gridwatch_events.jsonl", help="'' to disable")
+    common.add_argument("--fail-safe", choices=("curtail", "hold", "run"), default="hold")
+    common.add_argument("--fail-safe-after", type=float, default=15, help="minutes of data age (default 15)")
+    common.add_argument("--forecast-threshold", type=float, help="curtail ahead of a forecast breach")
+    common.add_argument("--reconcile-interval", type=float,
+                        help="seconds between drift corrections (with --once: one pass per run)")
+    common.add_argument("--metrics-listen", type=_listen, help="HOST:PORT for Prometheus metrics (not with --once)")
+    common.add_argument("--timeout", type=float, help="seconds the backend may take per command")
+
+    parser = argparse.ArgumentParser(prog="gridwatch", description="GridWatch curtailment controller.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("monitor", parents=[common], help="watch and log only, no backend")
+    p.set_defaults(build=_monitor)
+
+    p = commands.add_parser("fleet", parents=[common], help="sites, regions and backends from a config file")
+    p.add_argument("--config", required=True, help="fleet config, checked with: python -m gridwatch.config FILE")
+    p.set_defaults(build=_fleet)
+
+    p = commands.add_parser("proxmox", parents=[common], help="graceful shutdown / start of VMs and LXCs")
+    p.add_argument("--node", type=_node, action="append", required=True, help="NAME=HOST, repeatable")
+    p.add_argument("--user", default="root@pam")
+    p.add_argument("--password", default=os.environ.get("PROXMOX_PASSWORD"))
+    p.add_argument("--token-name")
+    p.add_argument("--token-value", default=os.environ.get("PROXMOX_TOKEN_VALUE"))
+    p.add_argument("--vmids", type=_ids, required=True, help="comma-separated guest IDs")
+    p.add_argument("--max-parallel", type=int, default=8)
+    p.add_argument("--verify-ssl", action="store_true")
+    p.add_argument("--shutdown-deadline", type=float, default=120,
+                   help="seconds a guest gets to shut down before it is hard-stopped")
+    p.add_argument("--no-hard-stop", dest="hard_stop", action="store_false",
+                   help="only report guests still running after the deadline")
+    p.set_defaults(build=_proxmox)
+
+    p = commands.add_parser("hiveos", parents=[common], help="HiveOS workers (bulk miner stop / start)")
+    p.add_argument("--token", default=os.environ.get("HIVEOS_TOKEN"))
+    p.add_argument("--farm-id", type=int, required=True)
+    p.add_argument("--workers", type=_ids, required=True, help="comma-separated worker IDs")
+    p.set_defaults(build=_hiveos)
+
+    p = commands.add_parser("foreman", parents=[common], help="Foreman miners (bulk curtail / resume)")
+    p.add_argument("--token", default=os.environ.get("FOREMAN_TOKEN"))
+    p.add_argument("--miners", type=_ids, required=True, help="comma-separated miner IDs")
+    p.set_defaults(build=_foreman)
+
+    p = commands.add_parser("shell", parents=[common], help="run a command on curtail / resume")
+    p.add_argument("--name", default="shell")
+    p.add_argument("--stop", required=True, help="shell command run on curtail")
+    p.add_argument("--resume", required=True, help="shell command run on resume")
+    p.add_argument("--status", help="optional status command")
+    p.set_defaults(build=_shell)
+
+    p = commands.add_parser("webhook", parents=[common], help="POST curtail / resume to a URL")
+    p.add_argument("--name", default="webhook")
+    p.add_argument("--url", required=True)
+    p.add_argument("--status-url")
+    p.set_defaults(build=_webhook)
+    return parser
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    if not args.api_key and not args.gridwatch_url:
+        raise SystemExit("gridwatch: set --api-key or $GRIDWATCH_API_KEY (or --gridwatch-url for a sidecar)")
+
+    from gridwatch.config import ConfigError
+    from gridwatch.controller import Controller
+
+    try:
+        controller = Controller(
+            args.api_key, args.regions, args.build(args),
+            price_cap=args.price_cap,
+            stress_cap=args.stress_cap,
+            cooldown_minutes=args.cooldown,
+            simulation=not args.live,
+            history_dir=args.history_dir or None,
+            metrics_listen=args.metrics_listen,
+            base_url=args.gridwatch_url,
+            state_file=args.state_file or None,
+            events_file=args.events_file or None,
+            reconcile_interval=args.reconcile_interval,
+            fail_safe_policy=args.fail_safe,
+            fail_safe_after_mins=args.fail_safe_after,
+            forecast_threshold=args.forecast_threshold,
+            config_file=getattr(args, "config", None),
+        )
+    except ConfigError as e:
+        raise SystemExit(str(e))
+
+    if not args.once:
+        controller.banner(f"GridWatch ({args.command})")
+        controller.run()
+        return
+
+    controller.once()
+    rss = _peak_rss_mb()
+    print(f"Done in {(time.perf_counter() - started) * 1000:.0f}ms"
+          + (f" (peak RSS {rss:.1f} MB)" if rss is not None else ""))
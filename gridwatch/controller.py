@@ -0,0 +1,904 @@
+"""
+One controller process for every backend.
+
+The Controller polls GridWatch once per cycle (all regions concurrently),
+runs the decision and hysteresis logic once per region, and fans each
+resulting stop / resume out to every configured backend at the same time.
+Each backend runs on its own worker thread with its own timeout: a slow
+Proxmox cluster does not hold back the HiveOS batch, and a backend that
+hangs is reported and skipped rather than stalling the next poll. Commands
+to the same backend always run in order, never on top of each other.
+
+A backend that follows several regions is stopped when the first of them
+goes critical and resumed only once all of them have cleared their
+cooldown. A backend with its own thresholds (Backend.profile) is curtailed
+on those instead, with its own cooldown: every profile is evaluated from
+the same fetch per region by one gridwatch.decision.ProfileEngine.
+
+With a state file, every region's curtailment / cooldown and every
+backend's stopped devices are journaled (gridwatch.state), so a restart in
+the middle of a price event carries on where it left off instead of
+assuming the fleet is running. The last fresh answer per region is
+journaled too, so the fail-safe clock keeps running across restarts and
+--once runs.
+
+With a forecast threshold, a short-horizon price / utilization forecast
+(gridwatch.forecast) can curtail ahead of a breach that has not landed
+yet; the usual cooldown then applies once the forecast clears.
+
+With an events file, every poll, decision, command and per-device result
+is also written as JSON lines by a background thread (gridwatch.events).
+
+Fetches go through gridwatch.resilience (hedging, backoff, circuit
+breaker, last-known-good snapshot). Once the data is older than
+`fail_safe_after_mins` the fail-safe policy decides: curtail, run, or hold
+the current state.
+
+With a reconcile interval, every fleet backend is also read in bulk on that
+schedule and devices that drifted from their commanded state (restarted
+by hand, a dropped command) get the command again (gridwatch.reconcile).
+
+With a config file, regions, per-region thresholds and backends come from
+a fleet definition (gridwatch.config). The file is watched between polls
+and only what changed is applied; cooldowns keep running.
+
+Usage:
+    controller = Controller(
+        RAPIDAPI_KEY, ["ERCOT"],
+        [HiveOSBackend(HIVE_TOKEN, HIVE_FARM_ID, HIVE_WORKER_IDS),
+         ShellBackend("pdu", "./pdu.sh off", "./pdu.sh on")],
+        simulation=False,
+    )
+    controller.run()
+"""
+import datetime
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from gridwatch.api import API_URL, GridWatchClient, GridWatchAPIError, format_timing
+from gridwatch.backends.base import FleetBackend
+from gridwatch.config import ConfigError, ConfigWatcher, load_config
+from gridwatch.decision import ProfileEngine, ThresholdProfile, decide
+from gridwatch.events import ConsoleWriter, EventLog
+from gridwatch.forecast import Forecaster
+from gridwatch.history import HistoryStore
+from gridwatch.metrics import ControllerMetrics
+from gridwatch.monitor import RegionState, fetch_regions, CURTAIL, COOLDOWN_START, COOLDOWN, RESUME, CRITICAL
+from gridwatch.polling import PollScheduler
+from gridwatch.reconcile import Reconciler
+from gridwatch.resilience import HOLD, ResilientClient, fail_safe, no_data
+from gridwatch.state import StateJournal
+
+STOP = "stop"
+RESUME_ACTION = "resume"
+
+# Seconds between checks of the fleet config file while waiting to poll
+CONFIG_CHECK_INTERVAL = 5
+
+
+class Controller:
+    """
+    Shared polling + decision core driving any number of backends.
+
+    api_key / client:  RapidAPI key, or a ready GridWatchClient.
+    base_url:          API base URL; point it at a LAN sidecar
+                       (python -m gridwatch.sidecar) to share one fetch.
+    regions:           ISOs to watch.
+    backends:          gridwatch.backends.Backend instances; those with a
+                       `profile` follow their own thresholds.
+    simulation:        print what would be sent instead of sending it.
+    local_decisions:   compare raw metrics against the caps here instead of
+                       sending the caps with every request.
+    history_dir:       HistoryStore directory (None disables it).
+    adaptive_polling:  PollScheduler timing instead of a fixed `poll_interval`.
+    metrics_listen:    (host, port) for Prometheus metrics, or None.
+    state_file:        StateJournal path for warm restarts (None disables it).
+    reconcile_interval: seconds between bulk device reads + drift correction
+                       (None disables it); `reconcile_grace` is how long a
+                       device may take to reach its commanded state.
+    events_file:       JSON-lines event stream (None disables it).
+    console:           while running, print() goes through a background
+                       writer (gridwatch.events.ConsoleWriter), so a slow
+                       terminal or journald pipe never holds up a poll or
+                       a dispatch. False prints directly.
+    forecast_threshold: breach probability (0-1) at which to curtail
+                       pre-emptively, looking `forecast_horizon` 5-minute
+                       intervals ahead (None disables forecasting).
+    resilient:         hedged / retried / circuit-broken fetches (ResilientClient).
+    fetch_deadline:    seconds a poll may spend retrying.
+    fail_safe_policy:  "curtail", "hold" or "run" once data is older than
+                       `fail_safe_after_mins` (None disables the check).
+    config_file:       fleet config (gridwatch.config). Its regions,
+                       thresholds and backends replace `regions` and the
+                       caps, and its backends are added to `backends`. The
+                       file is reloaded when it changes.
+    """
+
+    def __init__(self, api_key=None, regions=("ERCOT",), backends=(), price_cap=200, stress_cap=90,
+                 cooldown_minutes=15, simulation=True, local_decisions=True, history_dir=None,
+                 adaptive_polling=True, poll_interval=300, metrics_listen=None, client=None, base_url=None,
+                 state_file=None, reconcile_interval=None, reconcile_grace=180, resilient=True,
+                 fetch_deadline=30, fail_safe_policy=HOLD, fail_safe_after_mins=15,
+                 forecast_threshold=None, forecast_horizon=3, events_file=None, config_file=None,
+                 console=True):
+        self.config = load_config(config_file) if config_file else None
+        self.config_watcher = ConfigWatcher(config_file) if config_file else None
+        if self.config is not None:
+            regions = self.config.regions
+            backends = list(backends) + self.config.build_backends()
+        self.regions = [r.upper() for r in regions]
+        self.backends = list(backends)
+        # Per-region caps / cooldown; regions without an entry use the arguments
+        self.thresholds = dict(self.config.thresholds) if self.config is not None else {}
+        self.price_cap = price_cap
+        self.stress_cap = stress_cap
+        self.cooldown_minutes = cooldown_minutes
+        self.simulation = simulation
+        self.local_decisions = local_decisions
+        self.adaptive_polling = adaptive_polling
+        self.poll_interval = poll_interval
+        self.metrics_listen = metrics_listen
+
+        self.fail_safe_policy = fail_safe_policy
+        self.fail_safe_after_mins = fail_safe_after_mins
+        self.last_data = {}  # region -> monotonic time of the last fresh response (seeded from the journal)
+        self.started = time.monotonic()
+
+        self.metrics = ControllerMetrics(enabled=metrics_listen is not None)
+        self.events = EventLog(events_file)
+        self.console = console
+        self._console = None  # the installed ConsoleWriter while running
+        # One pooled keep-alive connection, reused by every poll.
+        self.client = client or GridWatchClient(api_key, base_url=base_url or API_URL)
+        if resilient and not isinstance(self.client, ResilientClient):
+            self.client = ResilientClient(self.client, deadline=fetch_deadline)
+        if isinstance(self.client, ResilientClient):
+            self.client.metrics = self.metrics
+        self.history = HistoryStore(history_dir) if history_dir else None
+        self.scheduler = PollScheduler(price_cap, stress_cap)
+        self.scheduler.caps = {region: (t.price_cap, t.stress_cap) for region, t in self.thresholds.items()}
+        self.forecaster = Forecaster(forecast_threshold, forecast_horizon) if forecast_threshold else None
+        if self.forecaster is not None and self.history is not None:
+            self._seed_forecasts()
+        self.states = {region: RegionState(region, self.caps(region).cooldown_minutes) for region in self.regions}
+        self.profiles = None  # ProfileEngine for the backends with their own thresholds
+
+        # Regions currently holding each backend curtailed
+        self.holds = {backend.name: set() for backend in self.backends}
+        # One worker per backend: backends run in parallel, each one's commands in order
+        self.workers = {}
+        # Held while the backend list changes (config reloads vs. the reconcile thread)
+        self._backends_lock = threading.Lock()
+        for backend in self.backends:
+            self._attach(backend)
+
+        self.reconcile_interval = reconcile_interval
+        self.reconciler = Reconciler(reconcile_grace)
+
+        self.journal = StateJournal(state_file) if state_file else None
+        self.restored = self._restore() if self.journal else []
+        if self.journal is None:
+            self._build_profiles()
+
+    def _restore(self):
+        """
+        Loads the journaled state. Simulation runs never restore into live
+        ones (or the other way round): their curtailments didn't happen.
+        Returns a list of lines describing what was picked up.
+        """
+        lines = []
+        for region in self.states:
+            fetched = self.journal.get("fetch", region)
+            if not fetched:
+                continue
+            age = max(0.0, time.time() - fetched["at"])
+            self.last_data[region] = time.monotonic() - age
+            if isinstance(self.client, ResilientClient):
+                self.client.seed(region, fetched["data"], age, *self.api_caps(region))
+
+        for region, state in self.states.items():
+            snapshot = self.journal.get("region", region)
+            if not snapshot or snapshot.get("simulation", False) != self.simulation:
+                continue
+            state.restore(snapshot)
+            if state.curtailed:
+                if state.last_normal_time:
+                    elapsed = (datetime.datetime.now() - state.last_normal_time).total_seconds()
+                    remaining = max(0, state.cooldown_minutes * 60 - elapsed)
+                    lines.append(f"{region} curtailed, cooldown {int(remaining/60)}m {int(remaining%60)}s left")
+                else:
+                    lines.append(f"{region} curtailed")
+
+        saved = {}
+        for region in self.states:
+            snapshot = self.journal.get("profiles", region)
+            if not snapshot or snapshot.get("simulation", False) != self.simulation:
+                continue
+            for name, state in snapshot["profiles"].items():
+                saved.setdefault(name, {})[region] = state
+        self._build_profiles(saved)
+
+        for backend in self.backends:
+            backend.journal = self.journal
+            # Holds are the curtailed regions the backend follows
+            self.holds[backend.name] = self._held_by(backend)
+            if backend.profile is not None and self.holds[backend.name]:
+                regions = ", ".join(sorted(self.holds[backend.name]))
+                lines.append(f"{backend.name} curtailed by its own thresholds in {regions}")
+            snapshot = self.journal.get("backend", backend.name)
+            if not snapshot or self.simulation:
+                continue
+            backend.restore(snapshot)
+            stopped = snapshot.get("stopped")
+            if backend.curtailed or stopped:
+                count = f"{len(stopped)} devices stopped" if stopped is not None else "stopped"
+                lines.append(f"{backend.name}: {count} (last action: {backend.last_action})")
+        return lines
+
+    def _attach(self, backend):
+        """Wires a backend to the controller's metrics, events and journal, with its own worker."""
+        backend.metrics = self.metrics
+        backend.events = self.events
+        backend.journal = getattr(self, "journal", None)
+        if backend.name not in self.workers:
+            self.workers[backend.name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"gridwatch-{backend.name}")
+
+    def save(self, region):
+        if self.journal is not None:
+            self.journal.record("region", region, dict(self.states[region].snapshot(), simulation=self.simulation))
+            if self.profiles is not None:
+                self.journal.record("profiles", region, {"profiles": self.profiles.snapshot(region),
+                                                         "simulation": self.simulation})
+
+    def _build_profiles(self, saved=None):
+        """
+        (Re)builds the ProfileEngine for the backends that have a profile.
+        Each profile keeps its state from the engine it replaces, or from
+        `saved` ({backend name: {region: snapshot}}, the journal); a new one
+        starts from its region's state, so attaching a profile to a
+        curtailed backend doesn't flip it.
+        """
+        old = self.profiles
+        profiles = [backend.profile for backend in self.backends if backend.profile is not None]
+        self.profiles = ProfileEngine(profiles) if profiles else None
+        if self.profiles is None:
+            return
+        for region, state in self.states.items():
+            current = old.snapshot(region) if old is not None else {}
+            snapshots = {}
+            for name in self.profiles.names:
+                if old is not None and name in old.names:
+                    snapshots[name] = current.get(name)
+                else:
+                    snapshots[name] = (saved or {}).get(name, {}).get(region) or state.snapshot()
+            self.profiles.restore(region, snapshots)
+
+    def _held_by(self, backend):
+        """Regions whose curtailment holds `backend`: its profile's, or else the regions' own."""
+        if backend.profile is not None and self.profiles is not None:
+            return {r for r in self.states if backend.follows(r) and self.profiles.curtailed(r).get(backend.name)}
+        return {r for r, s in self.states.items() if s.curtailed and backend.follows(r)}
+
+    def caps(self, region):
+        """The ThresholdProfile for `region`: its config entry, or the controller-wide caps."""
+        profile = self.thresholds.get(region)
+        if profile is None:
+            profile = ThresholdProfile(region, self.price_cap, self.stress_cap, self.cooldown_minutes)
+        return profile
+
+    def api_caps(self, region=None):
+        """Caps to send to the API: none when deciding locally (raw metrics only)."""
+        if self.local_decisions:
+            return None, None
+        caps = self.caps(region)
+        return caps.price_cap, caps.stress_cap
+
+    def banner(self, title="GridWatch 'Kill Switch' Controller"):
+        print(f"--- {title} Started ---")
+        print(f"Monitoring: {', '.join(self.regions)}")
+        if self.config is not None:
+            print(f"Fleet: {self.config.path} ({self.config.summary()}, loaded in {self.config.load_ms:.0f}ms)")
+        if self.thresholds:
+            for region in self.regions:
+                caps = self.caps(region)
+                print(f"Thresholds [{region}]: Price > ${caps.price_cap} | Stress > {caps.stress_cap}% | "
+                      f"Cooldown {caps.cooldown_minutes}m")
+        else:
+            print(f"Thresholds: Price > ${self.price_cap} | Stress > {self.stress_cap}%")
+            print(f"Cooldown: {self.cooldown_minutes} Minutes")
+        if len(self.backends) > 20:
+            # A fleet of hundreds of sites would bury the banner
+            print(f"Backends: {len(self.backends)}")
+        else:
+            for backend in self.backends:
+                regions = ", ".join(backend.regions) if backend.regions else "all regions"
+                profile = backend.profile
+                own = (f", own caps ${profile.price_cap} / {profile.stress_cap}% / {profile.cooldown_minutes}m"
+                       if profile is not None else "")
+                print(f"Backend: {backend.describe()} [{regions}, timeout {backend.timeout}s{own}]")
+        print("Press Ctrl+C to stop.\n")
+
+    # --- Dispatch ---
+
+    def _seed_forecasts(self, hours=6):
+        """Warms the forecaster from the last few hours of recorded history."""
+        since = time.time() - hours * 3600
+        for region in self.regions:
+            try:
+                self.forecaster.seed(region, self.history.region(region).query(since))
+            except ImportError:
+                return  # range queries need NumPy; forecasts then warm up live
+
+    def _targets(self, action, region):
+        """Backends on the region's thresholds that should act on `action` for `region`, updating the holds."""
+        return [backend for backend in self.backends
+                if backend.follows(region) and backend.profile is None and self._hold(backend, action, region)]
+
+    def _hold(self, backend, action, region):
+        """Records `region` taking / releasing its hold on `backend`. True if the backend should act."""
+        holds = self.holds[backend.name]
+        if getattr(backend, "per_region", False):
+            act = True
+        elif action == STOP:
+            act = not holds
+        else:
+            act = holds == {region}
+        if action == STOP:
+            holds.add(region)
+        else:
+            holds.discard(region)
+        return act
+
+    def dispatch(self, action, region):
+        """
+        Sends `action` ("stop" / "resume") for `region` to every backend
+        concurrently and waits for each up to its own timeout.
+        Returns {backend name: results dict, "timeout" or "error: ..."}.
+        """
+        return self._send(self._targets(action, region), action, region)
+
+    def _send(self, targets, action, region):
+        """Runs `action` on `targets` in parallel; see dispatch()."""
+        if self.simulation:
+            for backend in targets:
+                print(f"   [SIMULATION] {backend.describe()}: {action} command would fire.")
+                self.events.emit("command", backend=backend.name, action=action, region=region, simulated=True)
+            return {}
+
+        start = time.monotonic()
+        method = "stop" if action == STOP else "resume"
+        futures = [(backend, self.workers[backend.name].submit(getattr(backend, method), region))
+                   for backend in targets]
+
+        outcomes = {}
+        for backend, future in futures:
+            remaining = max(0.0, start + backend.timeout - time.monotonic())
+            try:
+                outcomes[backend.name] = future.result(timeout=remaining)
+            except TimeoutError:
+                print(f"   [TIMEOUT] {backend.name}: no answer after {backend.timeout}s, moving on.")
+                self.metrics.backend_error(backend.name, action, "timeout")
+                self.events.emit("command_error", backend=backend.name, action=action, region=region, error="timeout")
+                outcomes[backend.name] = "timeout"
+            except Exception as e:
+                print(f"   [ERROR] {backend.name}: {e}")
+                self.metrics.backend_error(backend.name, action, "exception")
+                self.events.emit("command_error", backend=backend.name, action=action, region=region, error=str(e))
+                outcomes[backend.name] = f"error: {e}"
+        return outcomes
+
+    def reconcile(self):
+        """
+        One reconciliation pass: every fleet backend is read and corrected
+        in parallel, on its own worker so it never overlaps a stop / resume.
+        """
+        with self._backends_lock:
+            futures = [(backend, self.workers[backend.name].submit(self.reconciler.reconcile, backend))
+                       for backend in self.backends if isinstance(backend, FleetBackend)]
+        for backend, future in futures:
+            try:
+                sent = future.result(timeout=backend.timeout)
+            except TimeoutError:
+                print(f"\n   [RECONCILE] {backend.name}: no answer after {backend.timeout}s.")
+                continue
+            except Exception as e:
+                print(f"\n   [RECONCILE] {backend.name}: could not read device state ({e})")
+                continue
+            counts = self.reconciler.table.counts(backend.name)
+            self.metrics.reconcile(backend.name, counts, sent)
+            if sent:
+                self.events.emit("reconcile", backend=backend.name, observed=counts,
+                                 resent={action: len(ids) for action, ids in sent.items()})
+
+    def _reconcile_loop(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            self.reconcile()
+
+    def status(self):
+        """{backend name: backend.status()} for every backend."""
+        report = {}
+        for backend in self.backends:
+            try:
+                report[backend.name] = backend.status()
+            except Exception as e:
+                report[backend.name] = {"error": str(e)}
+        return report
+
+    # --- Decision ---
+
+    def apply(self, region, data, timing=None):
+        """
+        Runs the hysteresis logic for one region against a fresh API response
+        or a pushed event, and dispatches on curtail / resume.
+        """
+        caps = self.caps(region)
+        response = data
+        with self.metrics.phase("decide", region):
+            data, hold = fail_safe(data, self.fail_safe_policy, self.fail_safe_after_mins)
+            if self.local_decisions and data.get('metrics') and not data.get('fail_safe'):
+                data = decide(data, caps.price_cap, caps.stress_cap)
+            if self.forecaster is not None and not (data.get('stale') or data.get('fail_safe') or hold):
+                self.forecaster.observe(region, data)
+                data = self.forecaster.pre_empt(region, data, caps.price_cap, caps.stress_cap)
+        state = self.states.setdefault(region, RegionState(region, caps.cooldown_minutes))
+        # Snapshots are re-served old data: keep them out of history and poll timing
+        fresh = not data.get('stale')
+        if fresh:
+            self.last_data[region] = time.monotonic()
+            if self.journal is not None:
+                self.journal.record("fetch", region, {"at": time.time(), "data": response})
+            if self.history:
+                self.history.record(region, data)
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        metrics = data.get('metrics') or {}
+
+        if data.get('stale') and not data.get('fail_safe') and not hold:
+            print(f"\n[{timestamp}] [{region}] ⚠️  GridWatch unreachable; using last known data ({data.get('stale_mins', 0):.1f} min old).")
+        if hold:
+            age = metrics.get('data_age_mins')
+            print(f"\n[{timestamp}] [{region}] ⚠️  FAIL-SAFE (hold): data is {age or 0:.0f} min old; "
+                  f"holding current state ({'curtailed' if state.curtailed else 'running'}).")
+            self.log_poll(region, data, "hold", timing)
+            self.metrics.grid(region, data, state.curtailed)
+            if fresh:
+                self.scheduler.observe(region, data, curtailed=state.curtailed)
+            return None
+
+        event, remaining = state.update(data.get('curtail'))
+        if fresh:
+            self.scheduler.observe(region, data, curtailed=state.curtailed,
+                                   cooldown_left=remaining if event in (COOLDOWN_START, COOLDOWN) else None)
+        self.log_poll(region, data, event, timing, remaining)
+
+        if event == CURTAIL:
+            print(f"\n[{timestamp}] [{region}] 🔴 CURTAILMENT SIGNAL RECEIVED!")
+            print(f"   Reason: {data.get('trigger_reason')}")
+            print(f"   Price: ${metrics.get('price_usd')}/MWh | Load: {metrics.get('load_mw')} MW")
+            if timing is not None:
+                print(f"   API: {format_timing(timing)}")
+
+            self.metrics.event(region, "curtail")
+            print(f"   [ACTION] 🛑 SENDING STOP SIGNAL TO {region} BACKENDS...")
+            with self.metrics.phase("action", region):
+                self.dispatch(STOP, region)
+
+        elif event == CRITICAL:
+            # Still critical, already curtailed. Cooldown timer was reset.
+            pass
+
+        else:
+            if event == COOLDOWN_START:
+                print(f"\n[{timestamp}] [{region}] 🟡 Grid Normal. Starting {state.cooldown_minutes}m cooldown timer...")
+
+            if event == RESUME:
+                print(f"\n[{timestamp}] [{region}] 🟢 Cooldown Complete. Resuming Operations.")
+                self.metrics.event(region, "resume")
+                print(f"   [ACTION] SENDING RESUME SIGNAL TO {region} BACKENDS...")
+                with self.metrics.phase("action", region):
+                    self.dispatch(RESUME_ACTION, region)
+            elif event in (COOLDOWN_START, COOLDOWN):
+                print(f"\n[{timestamp}] [{region}] 🟡 Grid Normal. Waiting {int(remaining/60)}m {int(remaining%60)}s for safety cooldown.")
+            else:
+                print(f"\n[{timestamp}] [{region}] 🟢 Grid Normal. Operations Nominal.")
+
+            print(f"   Price: ${metrics.get('price_usd')}/MWh | Utilization: {metrics.get('utilization_pct')}%")
+            if timing is not None:
+                print(f"   API: {format_timing(timing)}")
+
+        self.apply_profiles(region, data, timestamp)
+
+        # Saved after the dispatch: a crash in between replays the command on restart
+        self.save(region)
+        self.metrics.grid(region, data, state.curtailed)
+        return event
+
+    def apply_profiles(self, region, data, timestamp):
+        """
+        Runs the backends with their own thresholds against the same
+        response, each through its own hysteresis, and dispatches their
+        stops / resumes.
+        """
+        if self.profiles is None:
+            return
+        backends = [b for b in self.backends if b.profile is not None and b.follows(region)]
+        if not backends:
+            return
+        metrics = data.get('metrics') or {}
+        events = self.profiles.update(region, data)
+        stops, resumes = [], []
+        for backend in backends:
+            event, remaining = events[backend.name]
+            profile = backend.profile
+            if event == CURTAIL:
+                print(f"\n[{timestamp}] [{region}] 🔴 {backend.name}: own caps breached "
+                      f"(Price ${metrics.get('price_usd')}/MWh > ${profile.price_cap} | "
+                      f"Utilization {metrics.get('utilization_pct')}% > {profile.stress_cap}%).")
+                if self._hold(backend, STOP, region):
+                    stops.append(backend)
+            elif event == COOLDOWN_START:
+                print(f"\n[{timestamp}] [{region}] 🟡 {backend.name}: back under its caps. "
+                      f"Starting {profile.cooldown_minutes}m cooldown timer...")
+            elif event == RESUME:
+                print(f"\n[{timestamp}] [{region}] 🟢 {backend.name}: cooldown complete.")
+                if self._hold(backend, RESUME_ACTION, region):
+                    resumes.append(backend)
+            if event in (CURTAIL, COOLDOWN_START, RESUME):
+                self.events.emit("profile", region=region, backend=backend.name, decision=event,
+                                 cooldown_s=round(remaining) if remaining else None)
+        if stops:
+            print(f"   [ACTION] 🛑 SENDING STOP SIGNAL TO {', '.join(b.name for b in stops)}...")
+            with self.metrics.phase("action", region):
+                self._send(stops, STOP, region)
+        if resumes:
+            print(f"   [ACTION] SENDING RESUME SIGNAL TO {', '.join(b.name for b in resumes)}...")
+            with self.metrics.phase("action", region):
+                self._send(resumes, RESUME_ACTION, region)
+
+    def log_poll(self, region, data, decision, timing=None, remaining=0):
+        """One "poll" event: the readings, the decision and how the data was obtained."""
+        if not self.events.enabled:
+            return
+        metrics = data.get('metrics') or {}
+        self.events.emit(
+            "poll", region=region, decision=decision, curtail=bool(data.get('curtail')),
+            reason=data.get('trigger_reason'), price_usd=metrics.get('price_usd'),
+            utilization_pct=metrics.get('utilization_pct'), load_mw=metrics.get('load_mw'),
+            data_age_mins=metrics.get('data_age_mins'), cooldown_s=round(remaining) if remaining else None,
+            stale=bool(data.get('stale')), fail_safe=bool(data.get('fail_safe')),
+            forecast=data.get('breach_probability'),
+            fetch_ms=round(timing.total_ms, 1) if timing is not None else None,
+        )
+
+    # --- Polling ---
+
+    def check(self, region):
+        """Polls one region and applies the result."""
+        try:
+            if sys.stdout.isatty():
+                print(f"Checking {region} grid status...", end="\r")
+            try:
+                with self.metrics.phase("fetch", region):
+                    data = self.client.get_curtailment(region, *self.api_caps(region))
+            except GridWatchAPIError as e:
+                self.metrics.api_call(region, self.client.last_timing)
+                self.metrics.api_error(region, e.status_code)
+                self.events.emit("fetch_error", region=region, code=e.status_code, error=e.text[:200])
+                print(f"\n❌ API Error: {e.status_code} - {e.text}")
+                self.no_data(region)
+                return
+            except Exception as e:
+                self.metrics.api_error(region, "network")
+                self.events.emit("fetch_error", region=region, code="network", error=str(e)[:200])
+                print(f"\nError connecting to GridWatch: {e}")
+                self.no_data(region)
+                return
+            self.metrics.api_call(region, self.client.last_timing)
+
+            self.apply(region, data, self.client.last_timing)
+
+        except Exception as e:
+            self.metrics.api_error(region, "exception")
+            print(f"\nError connecting to GridWatch: {e}")
+
+    def no_data(self, region):
+        """
+        Fail-safe for a poll that returned nothing at all (not even a
+        snapshot), once nothing fresh has arrived for `fail_safe_after_mins`.
+        """
+        if self.fail_safe_after_mins is None:
+            return
+        since = self.last_data.get(region, self.started)
+        if time.monotonic() - since < self.fail_safe_after_mins * 60:
+            return
+        data = no_data(self.fail_safe_policy)
+        if data is not None:
+            self.apply(region, data)
+
+    def poll(self):
+        """
+        One cycle: every region fetched in parallel, then each region's
+        logic applied in order. Takes about as long as the slowest request.
+        """
+        self.reload_config()
+        if not self.regions:
+            return
+        if len(self.regions) == 1:
+            self.check(self.regions[0])
+            return
+
+        if sys.stdout.isatty():
+            print(f"Checking {', '.join(self.regions)} grid status...", end="\r")
+        with self.metrics.phase("fetch", "all"):
+            results = fetch_regions(self.client, self.regions, caps=self.api_caps)
+
+        for region in self.regions:
+            data, error = results[region]
+            timing = self.client.last_timings.get(region)
+            if error is None or isinstance(error, GridWatchAPIError):
+                self.metrics.api_call(region, timing)
+            try:
+                if isinstance(error, GridWatchAPIError):
+                    self.metrics.api_error(region, error.status_code)
+                    self.events.emit("fetch_error", region=region, code=error.status_code, error=error.text[:200])
+                    print(f"\n❌ [{region}] API Error: {error.status_code} - {error.text}")
+                    self.no_data(region)
+                elif error is not None:
+                    self.metrics.api_error(region, "network")
+                    self.events.emit("fetch_error", region=region, code="network", error=str(error)[:200])
+                    print(f"\n[{region}] Error connecting to GridWatch: {error}")
+                    self.no_data(region)
+                else:
+                    self.apply(region, data, timing)
+            except Exception as e:
+                print(f"\n[{region}] Error connecting to GridWatch: {e}")
+
+    # --- Fleet config ---
+
+    def _backend(self, name):
+        for backend in self.backends:
+            if backend.name == name:
+                return backend
+        return None
+
+    def reload_config(self):
+        """
+        Re-reads the fleet config if the file changed and applies only the
+        difference (see gridwatch.config.ConfigDiff). Region states are
+        kept, so a cooldown in progress carries on under the new thresholds.
+        A file that does not validate, or whose backends cannot be built,
+        is reported and ignored: the running config stays in place. Returns
+        the applied ConfigDiff, or None.
+        """
+        if self.config_watcher is None or not self.config_watcher.changed():
+            return None
+        start = time.perf_counter()
+        try:
+            new = load_config(self.config.path)
+        except ConfigError as e:
+            print(f"\n[CONFIG] ⚠️  {e}\n   Keeping the running config.")
+            self.events.emit("config_error", path=self.config.path, errors=e.errors[:20])
+            return None
+
+        diff = self.config.diff(new)
+        try:
+            # Built before anything live changes, so a backend that fails to
+            # build leaves the running config whole
+            built = {name: new.build(name)
+                     for name in dict.fromkeys(diff.replaced + diff.regrouped + diff.moved + diff.added)}
+            with self._backends_lock:
+                transitions, additions = self._apply_config(new, diff, built)
+        except Exception as e:
+            print(f"\n[CONFIG] ⚠️  Could not apply {new.path}: {e}\n   Keeping the running config.")
+            self.events.emit("config_error", path=new.path, errors=[str(e)[:200]])
+            return None
+        self.config = new
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n[CONFIG] Reloaded {new.path} in {elapsed:.0f}ms ({new.summary()}): {diff.summary()}")
+        self.events.emit("config_reload", path=new.path, ms=round(elapsed, 1),
+                         changes={k: len(v) for k, v in vars(diff).items() if v})
+
+        # Commands go out after the swap, like any other dispatch
+        for backend, ids in additions:
+            print(f"   [CONFIG] {backend.name}: {len(ids)} added devices belong to a shed group, stopping them.")
+            if self.simulation:
+                print(f"   [SIMULATION] {backend.describe()}: {backend.stop_action} {len(ids)} devices would fire.")
+                continue
+            self.workers[backend.name].submit(backend.send_command, backend.stop_action, ids)
+        for backend, action, region in transitions:
+            print(f"   [CONFIG] {backend.name}: {'curtailed' if action == STOP else 'released'} by {region}, "
+                  f"sending {action}.")
+            self._send([backend], action, region)
+        return diff
+
+    def _apply_config(self, new, diff, built):
+        """
+        Swaps the changed parts of the config in, using the backends in
+        `built` ({name: new instance}). Returns the commands the change
+        calls for: ([(backend, action, region)], [(backend, device ids to stop)]).
+        """
+        self.thresholds = dict(new.thresholds)
+        self.scheduler.caps = {region: (t.price_cap, t.stress_cap) for region, t in self.thresholds.items()}
+        for region in diff.regions_removed:
+            # In place: push mode holds on to this list
+            self.regions.remove(region)
+            self.states.pop(region, None)
+            self.last_data.pop(region, None)
+            self.scheduler.forget(region)
+        for region in diff.regions_added:
+            self.regions.append(region)
+        for region in self.regions:
+            cooldown = self.caps(region).cooldown_minutes
+            if region in self.states:
+                self.states[region].cooldown_minutes = cooldown
+            else:
+                self.states[region] = RegionState(region, cooldown)
+
+        for name in diff.removed:
+            backend = self._backend(name)
+            self.backends.remove(backend)
+            self.holds.pop(name, None)
+            self.workers.pop(name).shutdown(wait=False)
+            if isinstance(backend, FleetBackend):
+                backend.tiers.cancel_resume()
+            if backend.curtailed:
+                print(f"   [CONFIG] {name} removed while curtailed: its devices are left as they are.")
+
+        resumes = []
+        for name in diff.replaced:
+            old = self._backend(name)
+            backend = built[name]
+            if isinstance(old, FleetBackend):
+                if old.resuming:
+                    resumes.append(backend)
+                old.tiers.cancel_resume()
+            if type(backend) is type(old):
+                backend.restore(old.snapshot())
+            else:
+                print(f"   [CONFIG] {name} changed type: its previous state is not carried over.")
+            self._attach(backend)
+            self.backends[self.backends.index(old)] = backend
+            if not self.simulation:
+                self.workers[name].submit(backend.prepare)
+
+        additions = []
+        for name in dict.fromkeys(diff.regrouped + diff.moved):
+            backend = self._backend(name)
+            added, removed = backend.reconfigure(built[name])
+            if removed:
+                print(f"   [CONFIG] {name}: {len(removed)} devices removed; they are left as they are.")
+            if added and isinstance(backend, FleetBackend):
+                added = set(added)
+                unshed = [device for device in backend.unshed() if device in added]
+                if unshed:
+                    additions.append((backend, unshed))
+
+        for name in diff.added:
+            backend = built[name]
+            self._attach(backend)
+            self.backends.append(backend)
+            self.holds[name] = set()
+            if not self.simulation:
+                self.workers[name].submit(backend.prepare)
+
+        self._build_profiles()
+
+        # Holds follow the new region layout and profiles; a backend that
+        # gained its first hold is stopped, one that lost its last is released
+        transitions = []
+        for backend in self.backends:
+            if backend.per_region:
+                continue
+            before = self.holds.get(backend.name, set())
+            after = self._held_by(backend)
+            self.holds[backend.name] = after
+            if after and not before:
+                transitions.append((backend, STOP, sorted(after)[0]))
+            elif before and not after:
+                transitions.append((backend, RESUME_ACTION, sorted(before)[0]))
+        for backend in resumes:
+            if self.holds[backend.name]:
+                continue
+            transitions.append((backend, RESUME_ACTION, backend.regions[0] if backend.regions else None))
+        return transitions, additions
+
+    def wait(self, seconds):
+        """Sleeps until the next poll, applying fleet config changes as soon as they are saved."""
+        if self.config_watcher is None:
+            time.sleep(seconds)
+            return
+        deadline = time.monotonic() + seconds
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            time.sleep(min(left, CONFIG_CHECK_INTERVAL))
+            self.reload_config()
+
+    def prepare(self):
+        """Starts the metrics endpoint and lets every backend log in up front."""
+        if self.journal is not None:
+            print(f"State: {self.journal.path} (loaded in {self.journal.load_ms:.1f}ms)")
+            for line in self.restored:
+                print(f"   [RESTORED] {line}")
+            print()
+        if self.metrics_listen:
+            self.metrics.serve(self.metrics_listen)
+            print(f"Metrics: http://{self.metrics_listen[0]}:{self.metrics_listen[1]}/metrics\n")
+        if not self.simulation:
+            for backend in self.backends:
+                backend.prepare()
+            if self.reconcile_interval:
+                threading.Thread(target=self._reconcile_loop, name="gridwatch-reconcile", daemon=True).start()
+                print(f"Reconciling fleet state every {self.reconcile_interval}s\n")
+
+    def run(self, feed=None):
+        """
+        Main loop. With a SignalFeed, pushed events are acted on as they
+        arrive (polling when the feed is quiet for 300s); otherwise polls
+        on the adaptive schedule or every `poll_interval` seconds.
+        """
+        self._install_console()
+        try:
+            self._run(feed)
+        finally:
+            self._release_console()
+
+    def _run(self, feed):
+        self.prepare()
+
+        if feed is not None:
+            from gridwatch.push import run_push_mode
+
+            print("Push mode: listening for events (polling if quiet for 300s)\n")
+            run_push_mode(feed, self.apply, self.poll, self.regions, quiet_after=300)
+
+        while True:
+            self.poll()
+            if self.adaptive_polling:
+                print(f"   {self.scheduler.summary()}")
+                self.wait(self.scheduler.next_delay())
+            else:
+                self.wait(self.poll_interval)
+
+    def once(self):
+        """
+        A single cycle for cron / systemd timers: picks up the journaled
+        state, polls every region once, dispatches if needed, runs one
+        reconciliation pass (with a reconcile interval set), waits for any
+        staggered resume to finish, then closes everything. Backends only
+        log in when a command actually goes out.
+        """
+        self._install_console()
+        for line in self.restored:
+            print(f"   [RESTORED] {line}")
+        self.poll()
+        if self.reconcile_interval and not self.simulation:
+            self.reconcile()
+        while any(getattr(backend, "resuming", False) or getattr(backend, "tracking", False)
+                  for backend in self.backends):
+            time.sleep(0.5)
+        self.close()
+
+    def close(self):
+        """Flushes history and the state journal and releases the API session."""
+        for worker in self.workers.values():
+            worker.shutdown(wait=True)
+        if self.history is not None:
+            self.history.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.events.close()
+        self.client.close()
+        self._release_console()
+
+    def _install_console(self):
+        if self.console and self._console is None and not isinstance(sys.stdout, ConsoleWriter):
+            self._console = ConsoleWriter.install()
+
+    def _release_console(self):
+        if self._console is not None:
+            self._console.uninstall()
+            self._console = None
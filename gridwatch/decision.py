@@ -0,0 +1,204 @@
+"""
+Client-side curtailment decisions.
+
+The API can make the decision for us (send price_cap / stress_cap, read
+data['curtail']), but then every threshold profile needs its own call.
+Fetching the raw metrics once per region and deciding locally lets any
+number of profiles share one request.
+
+The rule is the one the server applies: curtail when
+price_usd > price_cap OR utilization_pct > stress_cap. A missing price
+(Tier 2 regions) never trips the price cap, and a cap of None is ignored.
+"""
+import datetime
+import math
+
+from gridwatch.monitor import (
+    RegionState, CURTAIL, CRITICAL, COOLDOWN_START, COOLDOWN, RESUME, NOMINAL,
+)
+
+# Event codes used by the vectorized engine, in RegionState terms
+EVENTS = [NOMINAL, CURTAIL, CRITICAL, COOLDOWN_START, COOLDOWN, RESUME]
+
+
+class ThresholdProfile:
+    """
+    One set of thresholds + cooldown, e.g. for one device group.
+    """
+
+    def __init__(self, name, price_cap=None, stress_cap=None, cooldown_minutes=15):
+        self.name = name
+        self.price_cap = price_cap
+        self.stress_cap = stress_cap
+        self.cooldown_minutes = cooldown_minutes
+
+    def __repr__(self):
+        return (f"ThresholdProfile({self.name!r}, price_cap={self.price_cap}, "
+                f"stress_cap={self.stress_cap}, cooldown_minutes={self.cooldown_minutes})")
+
+
+def evaluate(metrics, price_cap=None, stress_cap=None):
+    """
+    Returns (curtail, trigger_reason) for one set of metrics.
+    """
+    price = metrics.get("price_usd")
+    utilization = metrics.get("utilization_pct")
+    reasons = []
+    if price_cap is not None and price is not None and float(price) > float(price_cap):
+        reasons.append(f"Price ${price}/MWh > ${price_cap} cap")
+    if stress_cap is not None and utilization is not None and float(utilization) > float(stress_cap):
+        reasons.append(f"Grid stress {utilization}% > {stress_cap}% cap")
+    return bool(reasons), " & ".join(reasons) or None
+
+
+def decide(data, price_cap=None, stress_cap=None):
+    """
+    Returns a copy of an API response with `curtail` / `trigger_reason`
+    decided locally, so it can go straight into the usual logic engine.
+    """
+    curtail, reason = evaluate(data.get("metrics") or {}, price_cap, stress_cap)
+    decided = dict(data)
+    decided["curtail"] = curtail
+    decided["trigger_reason"] = reason
+    return decided
+
+
+class ProfileEngine:
+    """
+    Runs many threshold profiles, each with its own hysteresis, against one
+    fetch per region. The Controller uses one for the backends that have
+    their own thresholds (Backend.profile), named after those backends.
+
+    With NumPy installed the breach test and the cooldown state machine
+    are evaluated for all profiles at once (the same transitions as
+    RegionState.update()); without it each profile gets a RegionState.
+    A fail-safe response (gridwatch.resilience) applies its verdict to
+    every profile.
+
+    Usage:
+        engine = ProfileEngine([ThresholdProfile("gpus", 150, 85),
+                                ThresholdProfile("asics", 300, 95, 30)])
+        data = client.get_curtailment("ERCOT")       # raw metrics, no caps
+        for name, (event, remaining) in engine.update("ERCOT", data).items():
+            ...
+    """
+
+    def __init__(self, profiles):
+        self.profiles = list(profiles)
+        self.names = [p.name for p in self.profiles]
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        self._np = np
+        self._regions = {}
+
+        if np is not None:
+            nan = math.nan
+            self._price_caps = np.array([nan if p.price_cap is None else p.price_cap for p in self.profiles], float)
+            self._stress_caps = np.array([nan if p.stress_cap is None else p.stress_cap for p in self.profiles], float)
+            self._cooldowns = np.array([p.cooldown_minutes * 60 for p in self.profiles], float)
+
+    def breaches(self, metrics):
+        """Boolean per profile: would this profile curtail on `metrics`?"""
+        if self._np is None:
+            return [evaluate(metrics, p.price_cap, p.stress_cap)[0] for p in self.profiles]
+        np = self._np
+        price = metrics.get("price_usd")
+        utilization = metrics.get("utilization_pct")
+        with np.errstate(invalid="ignore"):
+            breach = np.zeros(len(self.profiles), bool)
+            if price is not None:
+                breach |= float(price) > self._price_caps
+            if utilization is not None:
+                breach |= float(utilization) > self._stress_caps
+        return breach
+
+    def update(self, region, data, now=None):
+        """
+        Feeds one response through every profile's hysteresis.
+        Returns {profile name: (event, remaining_seconds)}.
+        """
+        now = now or datetime.datetime.now()
+        breach = self.breaches(data.get("metrics") or {})
+        if data.get("fail_safe"):
+            breach = [bool(data.get("curtail"))] * len(self.profiles)
+            if self._np is not None:
+                breach = self._np.array(breach, bool)
+
+        if self._np is None:
+            states = self._regions.setdefault(region, [
+                RegionState(region, p.cooldown_minutes) for p in self.profiles
+            ])
+            return {
+                name: state.update(hit, now)
+                for name, state, hit in zip(self.names, states, breach)
+            }
+
+        np = self._np
+        ts = now.timestamp()
+        curtailed, last_normal = self._regions.setdefault(region, (
+            np.zeros(len(self.profiles), bool),
+            np.full(len(self.profiles), np.nan),
+        ))
+        events = np.zeros(len(self.profiles), np.int8)
+        remaining = np.zeros(len(self.profiles))
+
+        # Grid critical: curtail (or stay curtailed) and reset the cooldown
+        events[breach & ~curtailed] = 1
+        events[breach & curtailed] = 2
+        curtailed |= breach
+        last_normal[breach] = np.nan
+
+        # Grid normal while curtailed: start / continue / finish the cooldown
+        waiting = ~breach & curtailed
+        starting = waiting & np.isnan(last_normal)
+        last_normal[starting] = ts
+        events[waiting] = 4
+        events[starting] = 3
+        remaining[waiting] = self._cooldowns[waiting] - (ts - last_normal[waiting])
+        done = waiting & (remaining <= 0)
+        events[done] = 5
+        remaining[done] = 0
+        curtailed[done] = False
+        last_normal[done] = np.nan
+
+        return {
+            name: (EVENTS[code], float(left))
+            for name, code, left in zip(self.names, events.tolist(), remaining.tolist())
+        }
+
+    def snapshot(self, region):
+        """{profile name: RegionState.snapshot()-style dict} for `region`; {} if never updated."""
+        if region not in self._regions:
+            return {}
+        if self._np is None:
+            return {name: state.snapshot() for name, state in zip(self.names, self._regions[region])}
+        curtailed, last_normal = self._regions[region]
+        return {
+            name: {"curtailed": hit, "normal_since": None if math.isnan(since) else since}
+            for name, hit, since in zip(self.names, curtailed.tolist(), last_normal.tolist())
+        }
+
+    def restore(self, region, snapshots):
+        """Picks up {profile name: snapshot} for `region`; profiles missing from it start uncurtailed."""
+        if self._np is None:
+            states = [RegionState(region, p.cooldown_minutes) for p in self.profiles]
+            for name, state in zip(self.names, states):
+                state.restore(snapshots.get(name) or {})
+            self._regions[region] = states
+            return
+        np = self._np
+        saved = [snapshots.get(name) or {} for name in self.names]
+        self._regions[region] = (
+            np.array([bool(s.get("curtailed")) for s in saved], bool),
+            np.array([s.get("normal_since") or np.nan for s in saved], float),
+        )
+
+    def curtailed(self, region):
+        """{profile name: currently curtailed?} for `region`."""
+        if region not in self._regions:
+            return {name: False for name in self.names}
+        if self._np is None:
+            return {name: s.curtailed for name, s in zip(self.names, self._regions[region])}
+        return dict(zip(self.names, self._regions[region][0].tolist()))
@@ -0,0 +1,178 @@
+import email.utils
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Outcome of one fleet-wide command.
+#   results:  {device_id: "ok" | "failed: <reason>"}
+#   elapsed:  seconds from the first batch sent to the last answer received
+#   requests: HTTP requests made, retries included
+DispatchReport = namedtuple("DispatchReport", ["results", "elapsed", "requests"])
+
+# 4xx answers that reject specific IDs: worth bisecting the batch
+SPLIT_STATUSES = (400, 404, 409, 422)
+
+# 4xx answers about the credentials: every other batch would fail the same way
+AUTH_STATUSES = (401, 403)
+
+
+def plan_batches(ids, max_batch_size, max_workers):
+    """
+    Splits `ids` into evenly sized batches.
+
+    Uses at least one batch per worker so every connection is busy, and as
+    many more as needed to keep each batch under `max_batch_size`.
+    """
+    ids = list(ids)
+    if not ids:
+        return []
+    count = max(max_workers, math.ceil(len(ids) / max_batch_size))
+    count = min(count, len(ids))
+    size = math.ceil(len(ids) / count)
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def parse_retry_after(value, default=1.0):
+    """Retry-After is either a number of seconds or an HTTP date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class BulkDispatcher:
+    """
+    Sends one command to thousands of devices as concurrent batches.
+
+    - Batches go out `max_workers` at a time over one pooled session.
+    - 429 pauses every worker for the Retry-After the server asked for,
+      then resends the batch without using up one of its `max_attempts`
+      (at most `max_throttled` times).
+    - 5xx and network errors retry the same batch, up to `max_attempts`.
+    - 400 / 404 / 409 / 422 usually mean one bad ID poisoned the whole
+      batch. The batch is bisected so only the offending IDs end up failed.
+    - 401 / 403 fail the batch, and every batch still waiting for a retry,
+      at once: a bad token is not fixed by sending more requests.
+    - Any other 4xx fails the batch.
+
+    Usage:
+        dispatcher = BulkDispatcher(session, max_batch_size=100)
+        report = dispatcher.post(url, ids, lambda batch: {"ids": batch})
+    """
+
+    def __init__(self, session, max_batch_size=100, max_workers=4, max_attempts=3,
+                 timeout=5, max_retry_after=30, max_throttled=10):
+        self.session = session
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.max_retry_after = max_retry_after
+        self.max_throttled = max_throttled
+
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_for_rate_limit(self):
+        with self._lock:
+            delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause(self, seconds):
+        seconds = min(seconds, self.max_retry_after)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _send(self, url, batch, build_payload):
+        """
+        Returns ("ok" | "retry" | "throttled" | "split" | "auth" | "failed", reason).
+        """
+        self._wait_for_rate_limit()
+        try:
+            response = self.session.post(url, json=build_payload(batch), timeout=self.timeout)
+        except requests.RequestException as e:
+            return "retry", type(e).__name__
+
+        if 200 <= response.status_code < 300:
+            return "ok", None
+        if response.status_code == 429:
+            self._pause(parse_retry_after(response.headers.get("Retry-After")))
+            return "throttled", "429 rate limited"
+        reason = f"{response.status_code} {response.text[:200]}"
+        if response.status_code >= 500:
+            return "retry", reason
+        if response.status_code in AUTH_STATUSES:
+            return "auth", reason
+        if response.status_code in SPLIT_STATUSES and len(batch) > 1:
+            return "split", reason
+        return "failed", reason
+
+    def post(self, url, ids, build_payload):
+        """
+        POSTs build_payload(batch) to `url` for every batch of `ids`.
+        Returns a DispatchReport with one entry per device.
+        """
+        start = time.perf_counter()
+        results = {}
+        request_count = 0
+
+        # (batch, attempt, times throttled) still to send
+        pending = [(batch, 1, 0) for batch in plan_batches(ids, self.max_batch_size, self.max_workers)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending:
+                outcomes = list(pool.map(lambda item: self._send(url, item[0], build_payload), pending))
+                request_count += len(pending)
+
+                retry = []
+                auth_failure = None
+                for (batch, attempt, throttled), (status, reason) in zip(pending, outcomes):
+                    if status == "ok":
+                        results.update((device, "ok") for device in batch)
+                    elif status == "split":
+                        half = len(batch) // 2
+                        retry += [(batch[:half], attempt, throttled), (batch[half:], attempt, throttled)]
+                    elif status == "throttled" and throttled < self.max_throttled:
+                        retry.append((batch, attempt, throttled + 1))
+                    elif status == "retry" and attempt < self.max_attempts:
+                        retry.append((batch, attempt + 1, throttled))
+                    else:
+                        auth_failure = reason if status == "auth" else auth_failure
+                        results.update((device, f"failed: {reason}") for device in batch)
+
+                if auth_failure is not None:
+                    for batch, _, _ in retry:
+                        results.update((device, f"failed: {auth_failure}") for device in batch)
+                    break
+
+                # Back off before retrying transient failures; 429 pauses come on top.
+                backoff = max((0.25 * 2 ** (attempt - 2) for _, attempt, _ in retry if attempt > 1), default=0)
+                if backoff:
+                    time.sleep(min(backoff, self.max_retry_after) * random.uniform(0.5, 1.0))
+                pending = retry
+
+        elapsed = time.perf_counter() - start
+        return DispatchReport({device: results[device] for device in ids}, elapsed, request_count)
+
+
+def print_dispatch_report(name, command, report):
+    """Console summary of a DispatchReport."""
+    failed = {device: outcome for device, outcome in report.results.items() if outcome != "ok"}
+    ok = len(report.results) - len(failed)
+    print(f"      -> {name}: {command} sent to {ok}/{len(report.results)} devices "
+          f"in {report.elapsed:.2f}s ({report.requests} requests).")
+    for device, outcome in failed.items():
+        print(f"      -> {name} {device}: {outcome}")
@@ -0,0 +1,386 @@
+"""
+Structured event stream: every poll, decision, command and per-device
+result as one JSON line.
+
+EventLog.emit() only puts a tuple on a bounded queue and returns. A
+background thread serializes, writes and rotates, so the poll loop never
+waits on a disk or a pipe. If the writer falls behind (a stalled disk)
+and the queue fills, events are dropped and counted instead of blocking
+a curtailment. Once the file passes `max_bytes`, it is gzip'd to
+<file>.<UTC time>.gz next to the live file. The oldest rotations beyond
+`backups` are deleted.
+
+Event types:
+- poll: one per region per poll, with the readings and the decision.
+- fetch_error: a poll that returned no data.
+- command: one backend stop / start, with its outcome counts.
+- command_error: a command that timed out or raised.
+- device: one device's result from a command.
+- reconcile: a reconciliation pass that re-sent commands.
+- profile: a backend with its own thresholds curtailed, started its
+  cooldown or resumed.
+
+The console output gets the same treatment: ConsoleWriter stands in for
+sys.stdout while the controller runs, so print() only queues the text
+and a slow terminal or a stalled journald pipe holds up a background
+thread, not a curtailment.
+
+Lines are compact and every key is written the same way ("region":"ERCOT"),
+so the query tool finds matches with bytes.find() over whole files and
+only parses the lines it prints. A month of events (~300k lines) filters
+in a few hundred milliseconds. Rotated files older than --days are
+skipped by name.
+
+Usage:
+    events = EventLog("gridwatch_events.jsonl")
+    events.emit("poll", region="ERCOT", price_usd=35.0, decision="nominal")
+    events.emit_devices("proxmox", "stop", {101: "ok", 102: "failed: 500"})
+
+    console = ConsoleWriter.install()   # print() no longer blocks
+    console.uninstall()                 # writes what is queued, restores sys.stdout
+
+    python -m gridwatch.events gridwatch_events.jsonl --region ERCOT --event command --days 30
+"""
+import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 30
+QUEUE_SIZE = 10000
+ROTATED_TIME = "%Y%m%dT%H%M%S"
+
+
+def _line(ts, event, fields):
+    record = {"ts": round(ts, 3), "event": event}
+    record.update(fields)
+    return json.dumps(record, separators=(",", ":"), default=str) + "\n"
+
+
+class EventLog:
+    """
+    Non-blocking JSON-lines event writer. EventLog(None) is a no-op, so
+    the emit calls can stay in the hot path when the stream is disabled.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        if path is None:
+            self._queue = None
+            return
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="gridwatch-events", daemon=True)
+        self._thread.start()
+
+    @property
+    def enabled(self):
+        return self._queue is not None
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, event, **fields):
+        """Queues one event; never blocks."""
+        if self._queue is not None:
+            self._put((time.time(), event, fields, None))
+
+    def emit_devices(self, backend, action, results, **fields):
+        """
+        Queues one "device" event per entry of `results` ({device: result}).
+        The whole batch is one queue slot, and the writer expands it.
+        """
+        if self._queue is not None and results:
+            self._put((time.time(), "device", dict(fields, backend=backend, action=action), results))
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not None and len(batch) < 1000:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            try:
+                self._write([entry for entry in batch if entry is not None])
+            except Exception as e:
+                print(f"   [EVENTS] write to {self.path} failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, batch):
+        lines = []
+        for ts, event, fields, devices in batch:
+            if devices is None:
+                lines.append(_line(ts, event, fields))
+                continue
+            for device, result in devices.items():
+                lines.append(_line(ts, event, dict(fields, device=str(device), result=str(result))))
+        if not lines:
+            return
+        self._file.write("".join(lines))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime(ROTATED_TIME)
+        target = f"{self.path}.{stamp}.gz"
+        n = 1
+        while os.path.exists(target):
+            target = f"{self.path}.{stamp}-{n}.gz"
+            n += 1
+        pending = self.path + ".rotating"
+        os.replace(self.path, pending)
+        self._file = open(self.path, "a", encoding="utf-8")
+        with open(pending, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(pending)
+        for old in rotated_files(self.path)[:-self.backups or None]:
+            os.remove(old)
+
+    def flush(self):
+        """Waits until every queued event is written."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._queue is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        self._queue = None
+
+
+class ConsoleWriter:
+    """
+    Non-blocking stand-in for sys.stdout. write() queues the text and
+    returns; a background thread writes it to the real stream in order.
+    If the stream stalls and the queue fills, output is dropped and
+    counted (and the count reported once it catches up) instead of
+    blocking. flush() does not wait, so print(..., flush=True) cannot
+    block either; drain() does.
+    """
+
+    def __init__(self, stream, queue_size=QUEUE_SIZE):
+        self.stream = stream
+        self.dropped = 0
+        self._reported = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="gridwatch-console", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def install(cls):
+        """Replaces sys.stdout with a ConsoleWriter (once) and returns it."""
+        if isinstance(sys.stdout, cls):
+            return sys.stdout
+        console = cls(sys.stdout)
+        sys.stdout = console
+        return console
+
+    def write(self, text):
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def __getattr__(self, name):
+        # encoding, fileno, ... of the real stream
+        return getattr(self.stream, name)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not None and len(batch) < 1000:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            text = "".join(entry for entry in batch if entry is not None)
+            if self.dropped > self._reported:
+                text += f"\n   [CONSOLE] {self.dropped - self._reported} writes dropped (output stalled)\n"
+                self._reported = self.dropped
+            try:
+                self.stream.write(text)
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass  # closed or broken pipe: nothing to report it to
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def drain(self):
+        """Waits until everything queued is written."""
+        self._queue.join()
+
+    def uninstall(self):
+        """Writes what is queued, stops the thread and puts the real stream back."""
+        if sys.stdout is self:
+            sys.stdout = self.stream
+        self._queue.put(None)
+        self._thread.join()
+
+
+# --- Query ---
+
+def rotated_files(path):
+    """Rotated files of `path`, oldest first."""
+    def order(name):
+        stamp, _, n = name[len(path) + 1:-3].partition("-")
+        return stamp, int(n) if n.isdigit() else 0
+
+    return sorted(glob.glob(glob.escape(path) + ".*.gz"), key=order)
+
+
+def _rotated_at(name, path):
+    stamp = name[len(path) + 1:-3].partition("-")[0]
+    try:
+        return datetime.datetime.strptime(stamp, ROTATED_TIME).replace(tzinfo=datetime.timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _lines(data, needle):
+    """Lines of `data` containing `needle`, located with bytes.find (C speed)."""
+    if needle is None:
+        yield from data.splitlines()
+        return
+    pos = 0
+    while True:
+        hit = data.find(needle, pos)
+        if hit < 0:
+            return
+        begin = data.rfind(b"\n", 0, hit) + 1
+        end = data.find(b"\n", hit)
+        if end < 0:
+            end = len(data)
+        yield data[begin:end]
+        pos = end + 1
+
+
+def scan(path, since=None, until=None, event=None, region=None, device=None, backend=None):
+    """
+    Yields the raw JSON lines (bytes) that match, oldest first, from the
+    live file and its rotations. Each filter is an exact match; None
+    matches anything. Quotes inside values are escaped, so a
+    '"region":"PJM"' substring can only be that key, and no line has to
+    be parsed.
+    """
+    # Rarest first: the first needle drives the find() loop
+    needles = [json.dumps({key: str(value)}, separators=(",", ":"))[1:-1].encode()
+               for key, value in (("device", device), ("backend", backend), ("region", region), ("event", event))
+               if value is not None]
+
+    files = []
+    for name in rotated_files(path):
+        rotated = _rotated_at(name, path)
+        # A rotation only holds events from before it was rotated
+        if since is not None and rotated is not None and rotated < since:
+            continue
+        files.append(name)
+    if os.path.exists(path):
+        files.append(path)
+
+    for name in files:
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(name, "rb") as f:
+            data = f.read()
+        for line in _lines(data, needles[0] if needles else None):
+            if any(needle not in line for needle in needles[1:]):
+                continue
+            if since is not None or until is not None:
+                # Every line starts {"ts":<seconds>,
+                try:
+                    ts = float(line[6:line.index(b",")])
+                except ValueError:
+                    continue  # torn last line
+                if (since is not None and ts < since) or (until is not None and ts >= until):
+                    continue
+            yield line
+
+
+def query(path, since=None, until=None, event=None, region=None, device=None, backend=None):
+    """Like scan(), but yields the events as dicts."""
+    for line in scan(path, since, until, event, region, device, backend):
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue  # torn last line
+
+
+def format_event(record):
+    when = datetime.datetime.fromtimestamp(record["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+    fields = " ".join(f"{k}={v}" for k, v in record.items() if k not in ("ts", "event") and v is not None)
+    return f"{when}  {record['event']:<13} {fields}"
+
+
+def _main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Query the GridWatch event stream.")
+    parser.add_argument("path", help="event file, e.g. gridwatch_events.jsonl")
+    parser.add_argument("--days", type=float, default=1, help="how far back to look (default 1)")
+    parser.add_argument("--event", help="poll, fetch_error, command, command_error, device, reconcile")
+    parser.add_argument("--region")
+    parser.add_argument("--device")
+    parser.add_argument("--backend")
+    parser.add_argument("--limit", type=int, help="only the last N matches")
+    parser.add_argument("--count", action="store_true", help="print the number of matches only")
+    parser.add_argument("--json", action="store_true", help="print raw JSON lines")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    since = time.time() - args.days * 86400
+    lines = scan(args.path, since, event=args.event, region=args.region, device=args.device, backend=args.backend)
+    if args.count:
+        print(sum(1 for _ in lines))
+    else:
+        if args.limit:
+            from collections import deque
+            lines = deque(lines, maxlen=args.limit)
+        for line in lines:
+            if args.json:
+                print(line.decode())
+                continue
+            try:
+                print(format_event(json.loads(line)))
+            except ValueError:
+                continue  # torn last line
+    print(f"({(time.perf_counter() - began) * 1000:.0f}ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,266 @@
+"""
+Compact on-disk history of polled grid metrics.
+
+Each region gets one fixed-size, memory-mapped ring buffer file. Every
+record is 16 bytes:
+
+    uint32  timestamp (unix seconds, UTC)
+    float32 price_usd        (NaN when the ISO publishes no price)
+    float32 load_mw          (NaN when missing)
+    uint16  utilization_pct  (x100, 0xFFFF when missing)
+    uint16  data_age_mins    (x10, 0xFFFF when missing)
+
+Queries return missing values as NaN, and rollups skip them, so a gap is
+never mistaken for a zero reading.
+
+The default capacity is one year of 5-minute samples (~1.7 MB per region).
+Once full, the oldest samples are overwritten, so disk use never grows.
+
+Appending only needs the standard library. Range queries and rollups use
+NumPy, which is imported the first time a query runs.
+
+Usage:
+    store = HistoryStore("gridwatch_history")
+    store.record("ERCOT", data)                 # data = API response
+    store.region("ERCOT").rollup("hour", start=time.time() - 86400)
+
+    python -m gridwatch.history gridwatch_history ERCOT --rollup day --days 30
+"""
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"GWTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ12x")   # magic, version, record size, capacity, appended count
+RECORD = struct.Struct("<IffHH")
+SAMPLES_PER_YEAR = 366 * 24 * 12       # 5-minute samples
+PERIODS = {"hour": 3600, "day": 86400}
+MISSING = 0xFFFF                       # uint16 fields: value not published
+
+_DTYPE = None
+
+
+def _dtype():
+    global _DTYPE
+    if _DTYPE is None:
+        import numpy as np
+        _DTYPE = np.dtype([
+            ("ts", "<u4"), ("price_usd", "<f4"), ("load_mw", "<f4"),
+            ("utilization_pct", "<u2"), ("data_age_mins", "<u2"),
+        ])
+    return _DTYPE
+
+
+def _scaled(value, scale):
+    if value is None or value != value:
+        return MISSING
+    return max(0, min(MISSING - 1, int(round(float(value) * scale))))
+
+
+def _unscaled(column, scale):
+    import numpy as np
+
+    return np.where(column == MISSING, np.nan, column / scale)
+
+
+class MetricStore:
+    """
+    One region's ring buffer. Safe to share between threads.
+    """
+
+    def __init__(self, path, capacity=SAMPLES_PER_YEAR):
+        self.path = path
+        self._lock = threading.Lock()
+
+        size = HEADER.size + capacity * RECORD.size
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self._file = open(path, "r+b" if exists else "w+b")
+
+        if exists:
+            magic, version, record_size, capacity, count = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                self._file.close()
+                raise ValueError(f"{path} is not a GridWatch history file")
+            size = HEADER.size + capacity * RECORD.size
+        else:
+            count = 0
+            self._file.truncate(size)
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, capacity, 0))
+            self._file.flush()
+
+        self.capacity = capacity
+        self._count = count
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, metrics, timestamp=None):
+        """
+        Stores one sample. `metrics` is the API's data['metrics'] dict.
+        """
+        price = metrics.get("price_usd")
+        load = metrics.get("load_mw")
+        record = (
+            int(timestamp if timestamp is not None else time.time()),
+            math.nan if price is None else float(price),
+            math.nan if load is None else float(load),
+            _scaled(metrics.get("utilization_pct"), 100),
+            _scaled(metrics.get("data_age_mins"), 10),
+        )
+        with self._lock:
+            slot = self._count % self.capacity
+            RECORD.pack_into(self._map, HEADER.size + slot * RECORD.size, *record)
+            self._count += 1
+            HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self.capacity, self._count)
+
+    def flush(self):
+        with self._lock:
+            self._map.flush()
+
+    def close(self):
+        with self._lock:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+
+    def samples(self):
+        """
+        All samples, oldest first, as a NumPy structured array (a copy).
+        """
+        import numpy as np
+
+        with self._lock:
+            raw = np.frombuffer(self._map, dtype=_dtype(), count=self.capacity, offset=HEADER.size)
+            if self._count <= self.capacity:
+                return raw[:self._count].copy()
+            head = self._count % self.capacity
+            return np.concatenate((raw[head:], raw[:head]))
+
+    def query(self, start=None, end=None):
+        """
+        Samples with start <= timestamp < end, oldest first, as columns:
+        {"ts", "price_usd", "load_mw", "utilization_pct", "data_age_mins"}.
+        Values the ISO did not publish are NaN.
+        """
+        import numpy as np
+
+        samples = self.samples()
+        ts = samples["ts"]
+        lo = 0 if start is None else np.searchsorted(ts, start, side="left")
+        hi = len(ts) if end is None else np.searchsorted(ts, end, side="left")
+        samples = samples[lo:hi]
+        return {
+            "ts": samples["ts"].astype(np.int64),
+            "price_usd": samples["price_usd"].astype(np.float64),
+            "load_mw": samples["load_mw"].astype(np.float64),
+            "utilization_pct": _unscaled(samples["utilization_pct"], 100.0),
+            "data_age_mins": _unscaled(samples["data_age_mins"], 10.0),
+        }
+
+    def rollup(self, period="hour", start=None, end=None):
+        """
+        Min / max / mean of every metric per UTC hour or day.
+        Returns {"ts": bucket starts, "count": samples per bucket,
+                 "<metric>_min" / "_max" / "_mean": arrays}.
+        """
+        import numpy as np
+
+        width = PERIODS[period]
+        columns = self.query(start, end)
+        buckets = columns["ts"] // width * width
+        # Samples are already in time order: a bucket starts wherever the value changes.
+        index = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if len(buckets) else np.empty(0, int)
+        starts = buckets[index]
+        counts = np.diff(np.r_[index, len(buckets)])
+
+        result = {"ts": starts, "count": counts}
+        if not len(starts):
+            for name in ("price_usd", "load_mw", "utilization_pct", "data_age_mins"):
+                for stat in ("min", "max", "mean"):
+                    result[f"{name}_{stat}"] = np.empty(0)
+            return result
+
+        for name in ("price_usd", "load_mw", "utilization_pct", "data_age_mins"):
+            values = columns[name]
+            valid = ~np.isnan(values)
+            total = np.add.reduceat(np.where(valid, values, 0.0), index)
+            seen = np.add.reduceat(valid.astype(np.int64), index)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[f"{name}_min"] = np.fmin.reduceat(values, index)
+                result[f"{name}_max"] = np.fmax.reduceat(values, index)
+                result[f"{name}_mean"] = np.where(seen > 0, total / np.maximum(seen, 1), np.nan)
+        return result
+
+
+class HistoryStore:
+    """
+    A directory holding one MetricStore per region.
+    """
+
+    def __init__(self, directory, capacity=SAMPLES_PER_YEAR):
+        self.directory = directory
+        self.capacity = capacity
+        self._stores = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def region(self, region):
+        with self._lock:
+            if region not in self._stores:
+                path = os.path.join(self.directory, f"{region.upper()}.gwts")
+                self._stores[region] = MetricStore(path, self.capacity)
+            return self._stores[region]
+
+    def record(self, region, data, timestamp=None):
+        """Appends the metrics of one successful API response."""
+        metrics = data.get("metrics") if data else None
+        if metrics:
+            self.region(region).append(metrics, timestamp)
+
+    def regions(self):
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".gwts"))
+
+    def close(self):
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores = {}
+
+
+def _main():
+    import argparse
+    import datetime
+
+    parser = argparse.ArgumentParser(description="Query the GridWatch metric history.")
+    parser.add_argument("directory")
+    parser.add_argument("region")
+    parser.add_argument("--days", type=float, default=1, help="how far back to look (default 1)")
+    parser.add_argument("--rollup", choices=sorted(PERIODS), help="aggregate per hour or day")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.directory).region(args.region)
+    start = time.time() - args.days * 86400
+
+    if args.rollup:
+        rows = store.rollup(args.rollup, start)
+        print(f"{'period (UTC)':<17} {'n':>4} {'price min':>10} {'max':>9} {'mean':>9} {'util max':>9}")
+        for i, ts in enumerate(rows["ts"]):
+            when = datetime.datetime.fromtimestamp(int(ts), datetime.timezone.utc).strftime("%Y-%m-%d %H:%M")
+            print(f"{when:<17} {rows['count'][i]:>4} {rows['price_usd_min'][i]:>10.2f} "
+                  f"{rows['price_usd_max'][i]:>9.2f} {rows['price_usd_mean'][i]:>9.2f} "
+                  f"{rows['utilization_pct_max'][i]:>8.1f}%")
+    else:
+        rows = store.query(start)
+        for i, ts in enumerate(rows["ts"]):
+            when = datetime.datetime.fromtimestamp(int(ts), datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{when}  ${rows['price_usd'][i]:.2f}/MWh  {rows['load_mw'][i]:.0f} MW  "
+                  f"{rows['utilization_pct'][i]:.1f}%  age {rows['data_age_mins'][i]:.1f}m")
+
+
+if __name__ == "__main__":
+    _main()
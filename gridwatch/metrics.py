@@ -0,0 +1,358 @@
+"""
+Prometheus-style metrics for the controllers, with no extra dependencies.
+
+Counters, gauges and histograms live in a Registry and are rendered in the
+Prometheus text format on a small local HTTP endpoint:
+
+    curl http://127.0.0.1:9108/metrics
+
+ControllerMetrics wraps the registry with the metrics the scripts record:
+the time spent in each phase of a poll (fetch / decide / action), API
+round trips and errors, data age and grid readings, the curtailment state,
+and per-device dispatch outcomes. When it is created with enabled=False
+every call returns immediately, so leaving the calls in the hot path costs
+one attribute check.
+
+Usage:
+    METRICS = ControllerMetrics(enabled=True)
+    METRICS.serve(("127.0.0.1", 9108))
+    with METRICS.phase("fetch", "ERCOT"):
+        data = client.get_curtailment("ERCOT")
+"""
+import contextlib
+import math
+import threading
+import time
+
+# Seconds; covers a fast cached poll up to a slow fleet-wide dispatch.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Seconds from a shutdown command to the guest being off.
+SHUTDOWN_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+
+_NULL = contextlib.nullcontext()
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += 1
+            entry[2] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), count, total)) for key, (counts, count, total) in self._values.items())
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """A set of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self.server = None
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def serve(self, listen=("127.0.0.1", 9108)):
+        """Serves GET /metrics from a daemon thread. Returns the server."""
+        # Imported here: one-shot runs (--once) never serve metrics
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(listen, Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="gridwatch-metrics", daemon=True).start()
+        return self.server
+
+
+def outcome_label(result):
+    """'failed: 422 ...' -> 'failed', 'already stopped' -> 'already stopped'."""
+    return str(result).split(":", 1)[0].strip() or "unknown"
+
+
+class ControllerMetrics:
+    """
+    The metrics a GridWatch controller records. Every method is a no-op
+    when `enabled` is False.
+
+    per_device=True additionally keeps the last outcome of every device
+    (one series per device ID); leave it off for very large fleets.
+    """
+
+    def __init__(self, enabled=True, per_device=False):
+        self.enabled = enabled
+        self.per_device = per_device
+        self.registry = Registry()
+        if not enabled:
+            return
+
+        r = self.registry
+        self.phase_seconds = r.histogram(
+            "gridwatch_phase_seconds", "Time spent in each phase of a poll (fetch, decide, action).",
+            ("phase", "region"))
+        self.api_seconds = r.histogram(
+            "gridwatch_api_request_seconds", "GridWatch API round trip (total, body included).", ("region",))
+        self.api_ttfb_seconds = r.histogram(
+            "gridwatch_api_ttfb_seconds", "GridWatch API time to first byte.", ("region",))
+        self.api_requests = r.counter(
+            "gridwatch_api_requests_total", "GridWatch API requests by HTTP status.", ("region", "status"))
+        self.api_errors = r.counter(
+            "gridwatch_api_errors_total", "Failed GridWatch polls (HTTP status or 'network').", ("region", "code"))
+        self.data_age = r.gauge(
+            "gridwatch_data_age_minutes", "Age of the settlement data in the last response.", ("region",))
+        self.price = r.gauge("gridwatch_price_usd_per_mwh", "Last reported price.", ("region",))
+        self.utilization = r.gauge("gridwatch_utilization_pct", "Last reported grid utilization.", ("region",))
+        self.curtailed = r.gauge(
+            "gridwatch_curtailed", "1 while the controller holds the fleet curtailed.", ("region",))
+        self.signal = r.gauge(
+            "gridwatch_curtail_signal", "1 if the last response breached a cap.", ("region",))
+        self.last_poll = r.gauge(
+            "gridwatch_last_poll_timestamp_seconds", "Unix time of the last successful poll.", ("region",))
+        self.events = r.counter(
+            "gridwatch_events_total", "Hysteresis events (curtail, resume, ...).", ("region", "event"))
+        self.dispatch_seconds = r.histogram(
+            "gridwatch_dispatch_seconds", "Time for one backend command to reach every device.",
+            ("backend", "action"))
+        self.dispatch_devices = r.counter(
+            "gridwatch_dispatch_devices_total", "Per-device command outcomes.", ("backend", "action", "outcome"))
+        self.device_ok = r.gauge(
+            "gridwatch_device_command_ok", "1 if the device's last command succeeded.", ("backend", "device"))
+        self.backend_errors = r.counter(
+            "gridwatch_backend_errors_total", "Backend commands that timed out or raised.",
+            ("backend", "action", "reason"))
+        self.fleet_devices = r.gauge(
+            "gridwatch_fleet_devices", "Devices per observed state at the last bulk read.", ("backend", "state"))
+        self.drift = r.counter(
+            "gridwatch_reconcile_drift_total", "Devices re-commanded after drifting from their desired state.",
+            ("backend", "action"))
+        self.fetch_events = r.counter(
+            "gridwatch_fetch_events_total", "Fetch resilience events (hedge, hedge_won, retry, breaker_open, snapshot).",
+            ("region", "event"))
+        self.breach_probability = r.gauge(
+            "gridwatch_breach_probability", "Forecast probability of a cap breach within the horizon.", ("region",))
+        self.time_to_stopped = r.histogram(
+            "gridwatch_time_to_stopped_seconds", "Shutdown command -> guest seen stopped.",
+            ("backend",), buckets=SHUTDOWN_BUCKETS)
+        self.shutdown_outcomes = r.counter(
+            "gridwatch_shutdown_outcomes_total", "Tracked shutdowns by outcome (stopped, hard stopped, still running).",
+            ("backend", "outcome"))
+        self.power_shed = r.gauge(
+            "gridwatch_power_shed_mw", "MW actually off after the last curtailment (guests seen stopped).",
+            ("backend",))
+        self.power_shed_target = r.gauge(
+            "gridwatch_power_shed_target_mw", "MW the last curtailment set out to shed.", ("backend",))
+
+    def serve(self, listen):
+        if self.enabled:
+            return self.registry.serve(listen)
+
+    def phase(self, phase, region=""):
+        """Context manager timing one phase of a poll."""
+        if not self.enabled:
+            return _NULL
+        return self.phase_seconds.time(phase=phase, region=region)
+
+    def api_call(self, region, timing):
+        """Records a gridwatch.api.RequestTiming."""
+        if not self.enabled or timing is None:
+            return
+        self.api_seconds.observe(timing.total_ms / 1000.0, region=region)
+        self.api_ttfb_seconds.observe(timing.ttfb_ms / 1000.0, region=region)
+        self.api_requests.inc(region=region, status=timing.status_code)
+
+    def api_error(self, region, code):
+        if self.enabled:
+            self.api_errors.inc(region=region, code=code)
+
+    def grid(self, region, data, curtailed):
+        """Records one processed response and the resulting state."""
+        if not self.enabled:
+            return
+        metrics = (data or {}).get("metrics") or {}
+        if metrics.get("data_age_mins") is not None:
+            self.data_age.set(float(metrics["data_age_mins"]), region=region)
+        if metrics.get("price_usd") is not None:
+            self.price.set(float(metrics["price_usd"]), region=region)
+        if metrics.get("utilization_pct") is not None:
+            self.utilization.set(float(metrics["utilization_pct"]), region=region)
+        self.signal.set(1 if (data or {}).get("curtail") else 0, region=region)
+        if (data or {}).get("breach_probability") is not None:
+            self.breach_probability.set(data["breach_probability"], region=region)
+        self.curtailed.set(1 if curtailed else 0, region=region)
+        self.last_poll.set(time.time(), region=region)
+
+    def event(self, region, event):
+        """Counts a hysteresis event (curtail / resume)."""
+        if self.enabled:
+            self.events.inc(region=region, event=event)
+
+    def dispatch(self, backend, action, results, elapsed):
+        """Records one backend command: {device: result} plus its duration."""
+        if not self.enabled:
+            return
+        self.dispatch_seconds.observe(elapsed, backend=backend, action=action)
+        counts = {}
+        for device, result in results.items():
+            outcome = outcome_label(result)
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if self.per_device:
+                ok = outcome in ("ok", "sent") or outcome.startswith("already")
+                self.device_ok.set(1 if ok else 0, backend=backend, device=device)
+        for outcome, n in counts.items():
+            self.dispatch_devices.inc(n, backend=backend, action=action, outcome=outcome)
+
+    def reconcile(self, backend, counts, sent):
+        """Records one reconciliation pass: observed state counts and re-sent commands."""
+        if not self.enabled:
+            return
+        for state in set(counts) | {"running", "stopped", "offline", "unknown"}:
+            self.fleet_devices.set(counts.get(state, 0), backend=backend, state=state)
+        for action, ids in sent.items():
+            self.drift.inc(len(ids), backend=backend, action=action)
+
+    def backend_error(self, backend, action, reason):
+        """Counts a backend command that timed out or raised as a whole."""
+        if self.enabled:
+            self.backend_errors.inc(backend=backend, action=action, reason=reason)
+
+    def shutdowns(self, backend, report):
+        """Records a gridwatch.proxmox.ShutdownReport: time-to-stopped, outcomes, power shed."""
+        if not self.enabled:
+            return
+        for seconds in report.seconds.values():
+            self.time_to_stopped.observe(seconds, backend=backend)
+        counts = {}
+        for outcome in report.outcomes.values():
+            counts[outcome] = counts.get(outcome, 0) + 1
+        for outcome, n in counts.items():
+            self.shutdown_outcomes.inc(n, backend=backend, outcome=outcome)
+        self.power_shed.set(report.shed_mw, backend=backend)
+        self.power_shed_target.set(report.target_mw, backend=backend)
+
+    def fetch_event(self, region, event):
+        """Counts a hedge, retry, breaker trip or snapshot fallback (gridwatch.resilience)."""
+        if self.enabled:
+            self.fetch_events.inc(region=region, event=event)
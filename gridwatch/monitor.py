@@ -0,0 +1,94 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Events returned by RegionState.update()
+CURTAIL = "curtail"                # grid went critical: send STOP
+CRITICAL = "critical"              # still critical, already curtailed
+COOLDOWN_START = "cooldown_start"  # grid normal again, cooldown timer started
+COOLDOWN = "cooldown"              # waiting for the cooldown to expire
+RESUME = "resume"                  # cooldown complete: send START
+NOMINAL = "nominal"                # normal operation, nothing to do
+
+
+class RegionState:
+    """
+    Hysteresis state for one region.
+
+    This is the CURRENTLY_CURTAILED / LAST_NORMAL_TIME pair from the
+    single-region scripts, kept per region so several ISOs can be
+    watched from the same process without sharing a cooldown.
+    """
+
+    def __init__(self, region, cooldown_minutes=15):
+        self.region = region
+        self.cooldown_minutes = cooldown_minutes
+        self.curtailed = False
+        self.last_normal_time = None
+
+    def update(self, curtail, now=None):
+        """
+        Feeds one decision into the state machine.
+        Returns (event, remaining_seconds); remaining is only meaningful
+        for COOLDOWN_START / COOLDOWN.
+        """
+        now = now or datetime.datetime.now()
+
+        if curtail:
+            # Reset cooldown timer because grid is bad again
+            self.last_normal_time = None
+            if self.curtailed:
+                return CRITICAL, 0
+            self.curtailed = True
+            return CURTAIL, 0
+
+        if not self.curtailed:
+            return NOMINAL, 0
+
+        event = COOLDOWN
+        if self.last_normal_time is None:
+            self.last_normal_time = now
+            event = COOLDOWN_START
+
+        elapsed = now - self.last_normal_time
+        remaining = (self.cooldown_minutes * 60) - elapsed.total_seconds()
+        if remaining <= 0:
+            self.curtailed = False
+            self.last_normal_time = None
+            return RESUME, 0
+        return event, remaining
+
+    def snapshot(self):
+        """The state as a JSON-safe dict (see gridwatch.state)."""
+        return {
+            "curtailed": self.curtailed,
+            "normal_since": self.last_normal_time.timestamp() if self.last_normal_time else None,
+        }
+
+    def restore(self, snapshot):
+        """
+        Picks up a saved snapshot. The cooldown keeps counting from when it
+        originally started, so time spent restarting counts towards it.
+        """
+        self.curtailed = bool(snapshot.get("curtailed"))
+        normal_since = snapshot.get("normal_since")
+        self.last_normal_time = datetime.datetime.fromtimestamp(normal_since) if normal_since else None
+
+
+def fetch_regions(client, regions, price_cap=None, stress_cap=None, max_workers=None, caps=None):
+    """
+    Polls every region concurrently over the client's pooled session.
+    Returns {region: (data, error)}; exactly one of the two is None.
+    caps(region) -> (price_cap, stress_cap) sends each region its own caps.
+
+    Wall-clock time is roughly that of the slowest single request.
+    """
+    def fetch(region):
+        try:
+            region_caps = caps(region) if caps is not None else (price_cap, stress_cap)
+            return client.get_curtailment(region, *region_caps), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(regions) or 1) as pool:
+        results = pool.map(fetch, regions)
+        return dict(zip(regions, results))
@@ -0,0 +1,189 @@
+import time
+from collections import deque
+
+# Poll modes, reported by PollScheduler.mode()
+ALERT = "alert"    # near (or past) a cap: poll every `alert_interval`
+NORMAL = "normal"  # one poll per settlement interval, just after publication
+CALM = "calm"      # far below the caps: skip intervals to save API quota
+RETRY = "retry"    # the last poll returned the previous interval: retry soon
+
+
+def cap_ratio(metrics, price_cap, stress_cap):
+    """
+    How close the grid is to tripping, as a fraction of the nearest cap
+    (1.0 = at the cap). Missing prices (Tier 2 regions) are ignored.
+    """
+    ratios = [0.0]
+    price = metrics.get("price_usd")
+    if price is not None and price_cap:
+        ratios.append(float(price) / float(price_cap))
+    utilization = metrics.get("utilization_pct")
+    if utilization is not None and stress_cap:
+        ratios.append(float(utilization) / float(stress_cap))
+    return max(ratios)
+
+
+class PollScheduler:
+    """
+    Times polls against the ISO's settlement intervals instead of a fixed sleep.
+
+    Every response carries metrics.data_age_mins, so `fetch time - age` is
+    when the current interval was published. The scheduler smooths that
+    phase and schedules the next poll `publish_delay` seconds after the
+    next interval should appear, rather than drifting against it.
+
+    On top of that:
+    - near a cap (>= alert_ratio of PRICE_CAP / STRESS_CAP) or while
+      curtailed, it polls every `alert_interval` seconds, and once more
+      when a running cooldown ends so the resume is not late;
+    - when calm (< calm_ratio), it only polls every `calm_intervals`
+      intervals;
+    - if a poll comes back with the interval we already had, it retries
+      after `retry_delay` seconds (at most `max_retries` times).
+
+    Works for any number of regions: next_delay() returns the soonest one.
+    The age of each new interval when first seen is kept so the achieved
+    freshness can be reported.
+    """
+
+    def __init__(self, price_cap, stress_cap, interval=300, publish_delay=20,
+                 alert_ratio=0.85, calm_ratio=0.5, alert_interval=60, calm_intervals=3,
+                 retry_delay=30, max_retries=2, smoothing=0.3):
+        self.price_cap = price_cap
+        self.stress_cap = stress_cap
+        self.interval = interval
+        self.publish_delay = publish_delay
+        self.alert_ratio = alert_ratio
+        self.calm_ratio = calm_ratio
+        self.alert_interval = alert_interval
+        self.calm_intervals = calm_intervals
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.smoothing = smoothing
+
+        self.caps = {}  # region -> (price_cap, stress_cap), overriding the caps above
+        self._regions = {}
+        self._ages = deque(maxlen=288)
+        self.polls = 0
+
+    def _state(self, region):
+        if region not in self._regions:
+            self._regions[region] = {
+                "phase": None, "published": None, "due": None, "retries": 0,
+                "next_poll": None, "mode": NORMAL,
+            }
+        return self._regions[region]
+
+    def observe(self, region, data, now=None, curtailed=False, cooldown_left=None):
+        """
+        Feeds one response into the schedule. Returns the time of the next
+        poll for `region` (unix seconds).
+
+        curtailed:     the controller's state for `region` after this response.
+        cooldown_left: seconds until its cooldown ends, if one is running.
+        """
+        now = now if now is not None else time.time()
+        state = self._state(region)
+        metrics = (data or {}).get("metrics") or {}
+        self.polls += 1
+
+        published = None
+        age = metrics.get("data_age_mins")
+        if age is not None:
+            age = float(age) * 60
+            published = now - age
+            if state["published"] is None or published >= state["published"] + self.interval / 2:
+                # First sighting of a new interval: how late did we catch it?
+                self._ages.append(age)
+            phase = published % self.interval
+            if state["phase"] is None:
+                state["phase"] = phase
+            else:
+                # Smooth on the circle so 299s and 1s average to ~0s, not 150s
+                delta = (phase - state["phase"] + self.interval / 2) % self.interval - self.interval / 2
+                state["phase"] = (state["phase"] + self.smoothing * delta) % self.interval
+
+        # A new interval was due by now, but the response still carries the old one
+        stale = (
+            published is not None and state["published"] is not None
+            and state["due"] is not None and now >= state["due"]
+            and published < state["published"] + self.interval / 2
+        )
+
+        # Next publication after now
+        if state["phase"] is None:
+            next_poll = now + self.interval
+        else:
+            last_boundary = now - ((now - state["phase"]) % self.interval)
+            next_poll = last_boundary + self.interval + self.publish_delay
+            if not stale:
+                state["due"] = last_boundary + self.interval
+        ratio = cap_ratio(metrics, *self.caps.get(region, (self.price_cap, self.stress_cap)))
+
+        if stale and state["retries"] < self.max_retries:
+            mode = RETRY
+            state["retries"] += 1
+            next_poll = now + self.retry_delay
+        else:
+            state["retries"] = 0
+            if curtailed or (data and data.get("curtail")) or ratio >= self.alert_ratio:
+                mode = ALERT
+                next_poll = min(next_poll, now + self.alert_interval)
+            elif ratio < self.calm_ratio:
+                mode = CALM
+                next_poll += (self.calm_intervals - 1) * self.interval
+            else:
+                mode = NORMAL
+
+        if cooldown_left is not None:
+            # Poll right after the cooldown ends rather than up to an interval later
+            next_poll = min(next_poll, now + cooldown_left + 1)
+
+        if published is not None and not stale:
+            state["published"] = published
+        state["mode"] = mode
+        state["next_poll"] = max(next_poll, now + 5)
+        return state["next_poll"]
+
+    def forget(self, region):
+        """Stops scheduling `region` (no longer watched)."""
+        self._regions.pop(region, None)
+
+    def next_delay(self, now=None):
+        """
+        Seconds until the soonest scheduled poll across all regions.
+        If that time has already passed (the last poll failed and was never
+        observed), waits `retry_delay` rather than hammering the API.
+        """
+        now = now if now is not None else time.time()
+        pending = [s["next_poll"] for s in self._regions.values() if s["next_poll"] is not None]
+        if not pending:
+            return self.interval
+        delay = min(pending) - now
+        return delay if delay > 0 else self.retry_delay
+
+    def mode(self, region=None):
+        if region is not None:
+            return self._state(region)["mode"]
+        modes = [s["mode"] for s in self._regions.values()]
+        for mode in (ALERT, RETRY, NORMAL, CALM):
+            if mode in modes:
+                return mode
+        return NORMAL
+
+    def freshness(self):
+        """
+        (mean, p95) age in minutes of each new interval when we first saw
+        it, over the last 288 intervals. (None, None) before the first poll.
+        """
+        if not self._ages:
+            return None, None
+        ages = sorted(self._ages)
+        p95 = ages[min(len(ages) - 1, int(round(0.95 * (len(ages) - 1))))]
+        return sum(ages) / len(ages) / 60, p95 / 60
+
+    def summary(self, now=None):
+        delay = self.next_delay(now)
+        mean, p95 = self.freshness()
+        fresh = "n/a" if mean is None else f"avg {mean:.1f}m, p95 {p95:.1f}m"
+        return f"Next poll in {int(delay / 60)}m {int(delay % 60)}s ({self.mode()}) | Data freshness: {fresh}"
@@ -0,0 +1,429 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from proxmoxer import ProxmoxAPI
+
+# Guest types returned by /cluster/resources that we know how to control.
+GUEST_TYPES = ("qemu", "lxc")
+
+# action -> the guest status that makes the action pointless
+ALREADY_DONE = {
+    "shutdown": "stopped",
+    "stop": "stopped",
+    "start": "running",
+}
+
+# Proxmox access tickets expire 2 hours after login.
+TICKET_LIFETIME = 2 * 60 * 60
+
+
+class ProxmoxConnectionManager:
+    """
+    Keeps one authenticated ProxmoxAPI session per cluster node.
+
+    Logging in with a password costs a round trip to /access/ticket, which
+    is the last thing we want in the middle of a price spike. The manager
+    logs in once per node up front and keeps the sessions around:
+
+    - API tokens (token_name / token_value) never expire and are preferred.
+    - Password tickets are valid for 2 hours. They are replaced in the
+      background once older than `renew_after` seconds, so a curtailment
+      never waits on a login.
+
+    `hosts` maps node name -> address. Nodes that are missing from it are
+    picked up from /cluster/status by discover(); anything still unknown is
+    reached through another node, which Proxmox proxies transparently.
+    """
+
+    def __init__(self, hosts, user, password=None, token_name=None, token_value=None,
+                 verify_ssl=False, renew_after=50 * 60, timeout=5):
+        self.hosts = dict(hosts)
+        self.user = user
+        self.password = password
+        self.token_name = token_name
+        self.token_value = token_value
+        self.verify_ssl = verify_ssl
+        self.renew_after = renew_after
+        self.timeout = timeout
+
+        self._connections = {}  # node -> (ProxmoxAPI, login time)
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    @property
+    def uses_token(self):
+        return bool(self.token_name and self.token_value)
+
+    def _login(self, host):
+        if self.uses_token:
+            return ProxmoxAPI(
+                host, user=self.user, token_name=self.token_name, token_value=self.token_value,
+                verify_ssl=self.verify_ssl, timeout=self.timeout,
+            )
+        return ProxmoxAPI(
+            host, user=self.user, password=self.password,
+            verify_ssl=self.verify_ssl, timeout=self.timeout,
+        )
+
+    def _usable(self, logged_in_at):
+        age = time.monotonic() - logged_in_at
+        return self.uses_token or age < TICKET_LIFETIME - 5 * 60
+
+    def connection(self, node=None):
+        """
+        Returns the session for `node`, or for any reachable node if `node`
+        has no session of its own. Logs in only if nothing usable is cached.
+        """
+        with self._lock:
+            entry = self._connections.get(node)
+            if entry and self._usable(entry[1]):
+                return entry[0]
+
+        if node in self.hosts:
+            try:
+                return self._connect(node)
+            except Exception:
+                pass
+
+        # Fall back to any other node; Proxmox forwards the call.
+        with self._lock:
+            for other, (api, logged_in_at) in self._connections.items():
+                if other != node and self._usable(logged_in_at):
+                    return api
+        for other in self.hosts:
+            if other != node:
+                try:
+                    return self._connect(other)
+                except Exception:
+                    continue
+        raise ConnectionError(f"No Proxmox node reachable (wanted {node})")
+
+    def _connect(self, node):
+        api = self._login(self.hosts[node])
+        with self._lock:
+            self._connections[node] = (api, time.monotonic())
+        return api
+
+    def discover(self):
+        """
+        Adds every cluster member listed in /cluster/status to `hosts`.
+        """
+        for entry in self.connection().cluster.status.get():
+            if entry.get("type") == "node" and entry.get("ip") and entry["name"] not in self.hosts:
+                self.hosts[entry["name"]] = entry["ip"]
+        return self.hosts
+
+    def prewarm(self):
+        """
+        Logs in to every node in parallel. Returns {node: error} for the
+        nodes that could not be reached (empty when all is well).
+        """
+        def login(node):
+            try:
+                self.connection(node)
+                return node, None
+            except Exception as e:
+                return node, e
+
+        with ThreadPoolExecutor(max_workers=len(self.hosts) or 1) as pool:
+            errors = dict(pool.map(login, list(self.hosts)))
+        return {node: e for node, e in errors.items() if e is not None}
+
+    def renew_expiring(self):
+        """
+        Replaces ticket sessions that are due for renewal. The old session
+        keeps serving requests until the new one is ready.
+        """
+        if self.uses_token:
+            return
+        now = time.monotonic()
+        with self._lock:
+            due = [node for node, (_, logged_in_at) in self._connections.items()
+                   if now - logged_in_at >= self.renew_after]
+        for node in due:
+            try:
+                self._connect(node)
+            except Exception as e:
+                print(f"      -> Proxmox {node}: ticket renewal failed: {e}")
+
+    def start_refresher(self, interval=60):
+        """Renews tickets from a daemon thread every `interval` seconds."""
+        if self.uses_token or self._refresher:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.renew_expiring()
+
+        self._refresher = threading.Thread(target=run, name="proxmox-ticket-refresher", daemon=True)
+        self._refresher.start()
+
+
+def guest_index(proxmox):
+    """
+    Returns {vmid: resource} for every VM and LXC container in the cluster.
+
+    One GET /cluster/resources?type=vm replaces a status.current.get() per
+    guest. Each resource carries `node`, `type` (qemu/lxc) and `status`.
+    """
+    resources = proxmox.cluster.resources.get(type="vm")
+    return {
+        int(r["vmid"]): r
+        for r in resources
+        if r.get("type") in GUEST_TYPES
+    }
+
+
+def guest_status_endpoint(proxmox, guest):
+    """nodes/{node}/{qemu|lxc}/{vmid}/status for a /cluster/resources entry."""
+    return proxmox.nodes(guest["node"])(guest["type"])(guest["vmid"]).status
+
+
+def dispatch_guests(manager, vmids, action, max_workers=8, tasks=None):
+    """
+    Sends `action` ("shutdown", "stop" or "start") to every guest in `vmids`
+    that is not already in the target state.
+
+    Guests are located with one bulk status query, so VMs that migrated
+    are still found. Each node's guests are handled over that node's own
+    session, nodes in parallel, `max_workers` calls per node at a time.
+
+    Returns (results, latency) where results maps vmid -> outcome string
+    ("sent", "already stopped", "not found" or "error: ...") and latency is
+    the seconds from the bulk status query to the last command sent.
+    If `tasks` is a dict, it receives {vmid: (guest, upid, sent at)} for
+    every command sent, for ShutdownTracker (sent at: time.monotonic()).
+    """
+    start = time.perf_counter()
+    index = guest_index(manager.connection())
+    skip_status = ALREADY_DONE[action]
+
+    results = {}
+    by_node = {}
+    for vmid in vmids:
+        guest = index.get(int(vmid))
+        if guest is None:
+            results[vmid] = "not found"
+        elif guest.get("status") == skip_status:
+            results[vmid] = f"already {skip_status}"
+        else:
+            by_node.setdefault(guest["node"], []).append((vmid, guest))
+
+    def send(item):
+        vmid, guest = item
+        try:
+            proxmox = manager.connection(guest["node"])
+            upid = guest_status_endpoint(proxmox, guest)(action).post()
+            if tasks is not None:
+                tasks[vmid] = (guest, upid, time.monotonic())
+            return vmid, "sent"
+        except Exception as e:
+            return vmid, f"error: {e}"
+
+    def send_node(guests):
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(guests))) as pool:
+            return list(pool.map(send, guests))
+
+    if by_node:
+        with ThreadPoolExecutor(max_workers=len(by_node)) as pool:
+            for node_results in pool.map(send_node, by_node.values()):
+                results.update(node_results)
+
+    latency = time.perf_counter() - start
+    return {vmid: results[vmid] for vmid in vmids}, latency
+
+
+def print_dispatch_results(results, latency):
+    """Console summary in the same format the controllers always used."""
+    for vmid, outcome in results.items():
+        if outcome == "sent":
+            print(f"      -> VM {vmid}: Signal sent.")
+        elif outcome.startswith("error"):
+            print(f"      -> VM {vmid} Error: {outcome[7:]}")
+        else:
+            print(f"      -> VM {vmid}: {outcome.capitalize()}.")
+
+    sent = sum(1 for outcome in results.values() if outcome == "sent")
+    print(f"      -> {sent}/{len(results)} guests signalled in {latency:.2f}s")
+
+
+# How a tracked shutdown ended (ShutdownReport.outcomes)
+STOPPED_GRACEFULLY = "stopped"
+HARD_STOPPED = "hard stopped"
+STILL_RUNNING = "still running"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+class ShutdownReport:
+    """
+    What a curtailment actually achieved on one Proxmox backend.
+
+    seconds:  {vmid: seconds from its command to being seen stopped}
+    outcomes: {vmid: STOPPED_GRACEFULLY / HARD_STOPPED / STILL_RUNNING}
+    mw:       {vmid: the guest's share of its device group's MW}
+    """
+
+    def __init__(self, mw=None):
+        self.seconds = {}
+        self.outcomes = {}
+        self.mw = mw or {}
+
+    def count(self, outcome):
+        return sum(1 for o in self.outcomes.values() if o == outcome)
+
+    @property
+    def shed_mw(self):
+        """MW of the guests that are actually off."""
+        return sum(self.mw.get(vmid, 0.0) for vmid, o in self.outcomes.items() if o != STILL_RUNNING)
+
+    @property
+    def target_mw(self):
+        return sum(self.mw.get(vmid, 0.0) for vmid in self.outcomes)
+
+    def latency(self):
+        """(p50, p95, max) time-to-stopped in seconds, or None if nothing stopped."""
+        values = list(self.seconds.values())
+        if not values:
+            return None
+        return percentile(values, 50), percentile(values, 95), max(values)
+
+    def summary(self):
+        off = len(self.outcomes) - self.count(STILL_RUNNING)
+        line = f"{off}/{len(self.outcomes)} guests off"
+        if self.target_mw:
+            line = f"{self.shed_mw:.2f}/{self.target_mw:.2f} MW shed, " + line
+        latency = self.latency()
+        if latency is not None:
+            line += f" | time-to-stopped p50 {latency[0]:.0f}s, p95 {latency[1]:.0f}s, max {latency[2]:.0f}s"
+        if self.count(HARD_STOPPED):
+            line += f" | {self.count(HARD_STOPPED)} hard-stopped"
+        if self.count(STILL_RUNNING):
+            line += f" | {self.count(STILL_RUNNING)} STILL RUNNING"
+        return line
+
+
+class ShutdownTracker:
+    """
+    Follows graceful shutdowns until the guests are actually off.
+
+    An ACPI shutdown is only a request. A guest that ignores it keeps
+    running, and drawing power, while its task waits. track() watches the
+    guests that were sent a shutdown, every `interval` seconds:
+
+    - one /cluster/resources query shows which guests are off. Each guest's
+      time-to-stopped is measured from its own command, to within
+      `interval`;
+    - one task-list read per node (only tasks that ended in an error,
+      since the oldest pending shutdown started) shows which shutdown
+      tasks (UPIDs) have failed;
+    - a guest still running `deadline` seconds after its shutdown, or
+      whose task failed, gets a hard `stop` (with `hard_stop` on). One
+      still running `stop_deadline` seconds after that is reported as
+      not shed.
+
+    The work per round is O(nodes) requests, not O(guests), plus one
+    request per hard stop.
+    """
+
+    def __init__(self, manager, deadline=120, stop_deadline=30, hard_stop=True, interval=2, max_workers=8):
+        self.manager = manager
+        self.deadline = deadline
+        self.stop_deadline = stop_deadline
+        self.hard_stop = hard_stop
+        self.interval = interval
+        self.max_workers = max_workers
+
+    def _failed_tasks(self, pending):
+        """vmids of `pending` whose shutdown task ended without stopping the guest."""
+        by_node = {}
+        for vmid, (guest, upid, _) in pending.items():
+            if isinstance(upid, str):
+                by_node.setdefault(guest["node"], {})[upid] = vmid
+
+        def check(item):
+            node, upids = item
+            try:
+                # UPID:node:pid:pstart:starttime:type:id:user: (starttime in hex)
+                since = min(int(upid.split(":")[4], 16) for upid in upids)
+            except (IndexError, ValueError):
+                since = 0
+            try:
+                # The archive list carries each finished task's exit status
+                # ("OK", "WARNINGS: n" or the error), so one GET covers the node
+                errors = self.manager.connection(node).nodes(node).tasks.get(
+                    errors=1, since=since, limit=len(upids) + 100)
+            except Exception:
+                return []  # the deadline still applies
+            return [upids[task["upid"]] for task in errors if task.get("upid") in upids]
+
+        if not by_node:
+            return set()
+        with ThreadPoolExecutor(max_workers=min(len(by_node), self.max_workers)) as pool:
+            return {vmid for failed in pool.map(check, by_node.items()) for vmid in failed}
+
+    def _stop(self, index, vmids):
+        def stop(vmid):
+            guest = index.get(int(vmid))
+            try:
+                guest_status_endpoint(self.manager.connection(guest["node"]), guest)("stop").post()
+                return vmid, None
+            except Exception as e:
+                return vmid, e
+
+        with ThreadPoolExecutor(max_workers=min(len(vmids), self.max_workers)) as pool:
+            for vmid, error in pool.map(stop, vmids):
+                if error is not None:
+                    print(f"      -> VM {vmid}: hard stop failed: {error}")
+
+    def track(self, tasks, mw=None, cancel=None):
+        """
+        Watches `tasks` ({vmid: (guest, upid, sent at)} from dispatch_guests)
+        until every guest is off or given up on. Returns a ShutdownReport.
+        Setting the `cancel` event (a resume) stops tracking early.
+        """
+        report = ShutdownReport(mw)
+        pending = dict(tasks)
+        hard_stopped = {}  # vmid -> monotonic time of the hard stop
+        cancel = cancel or threading.Event()
+        while pending and not cancel.is_set():
+            now = time.monotonic()
+            try:
+                index = guest_index(self.manager.connection())
+            except Exception as e:
+                print(f"      -> Proxmox: shutdown tracking could not read guest status: {e}")
+                cancel.wait(self.interval)
+                continue
+
+            for vmid in list(pending):
+                guest = index.get(int(vmid))
+                if guest is None or guest.get("status") == "stopped":
+                    report.seconds[vmid] = now - pending.pop(vmid)[2]
+                    report.outcomes[vmid] = HARD_STOPPED if vmid in hard_stopped else STOPPED_GRACEFULLY
+                elif vmid in hard_stopped and now - hard_stopped[vmid] >= self.stop_deadline:
+                    pending.pop(vmid)
+                    report.outcomes[vmid] = STILL_RUNNING
+
+            graceful = {vmid: task for vmid, task in pending.items() if vmid not in hard_stopped}
+            overdue = [vmid for vmid, (_, _, sent) in graceful.items() if now - sent >= self.deadline]
+            failed = self._failed_tasks(graceful) if graceful else set()
+            escalate = sorted(set(overdue) | failed, key=str)
+            if escalate and not self.hard_stop:
+                for vmid in escalate:
+                    pending.pop(vmid)
+                    report.outcomes[vmid] = STILL_RUNNING
+            elif escalate:
+                for vmid in escalate:
+                    reason = "shutdown task failed" if vmid in failed else f"still running after {self.deadline}s"
+                    print(f"      -> VM {vmid}: {reason}, escalating to hard stop.")
+                    hard_stopped[vmid] = now
+                self._stop(index, escalate)
+            if pending:
+                cancel.wait(self.interval)
+        return report
@@ -0,0 +1,275 @@
+"""
+Event-driven signal ingestion.
+
+Instead of waiting up to 300 seconds for the next poll, a controller can
+receive curtailment signals as they happen, from either source:
+
+- a local webhook: POST /webhook with a JSON body shaped like the
+  /api/curtailment response, plus a "region" field (anything else is
+  rejected with 400);
+- a Server-Sent Events stream whose `data:` lines carry the same JSON.
+
+Both feed one queue. Duplicate events (same `id`, or the same content
+within `dedup_seconds`) are dropped. If nothing arrives for `quiet_after`
+seconds the controller falls back to a normal poll, so a dead stream
+never leaves it blind.
+
+Stand-in publisher for testing:
+    python -m gridwatch.push publish --region ERCOT --price 350 --curtail
+"""
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from gridwatch.api import SUPPORTED_REGIONS
+
+WEBHOOK_PATH = "/webhook"
+
+
+def event_errors(event):
+    """What is wrong with a pushed event's shape, as a list of messages (empty = valid)."""
+    if not isinstance(event, dict):
+        return ["event must be a JSON object"]
+    errors = []
+    region = event.get("region")
+    if not isinstance(region, str) or region.upper() not in SUPPORTED_REGIONS:
+        errors.append(f"region must be one of {', '.join(SUPPORTED_REGIONS)}")
+    if not isinstance(event.get("curtail"), bool):
+        errors.append("curtail must be true or false")
+    if not isinstance(event.get("metrics"), dict):
+        errors.append("metrics must be an object")
+    reason = event.get("trigger_reason")
+    if reason is not None and not isinstance(reason, str):
+        errors.append("trigger_reason must be a string or null")
+    return errors
+
+
+class EventDeduplicator:
+    """
+    Remembers recently seen event keys for `ttl` seconds.
+    """
+
+    def __init__(self, ttl=900, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(event):
+        if event.get("id") or event.get("event_id"):
+            return str(event.get("id") or event.get("event_id"))
+        content = {k: event.get(k) for k in ("region", "curtail", "trigger_reason", "metrics")}
+        return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_new(self, event):
+        key = self.key(event)
+        now = time.monotonic()
+        with self._lock:
+            while self._seen and (next(iter(self._seen.values())) < now - self.ttl
+                                  or len(self._seen) > self.max_entries):
+                self._seen.popitem(last=False)
+            if key in self._seen:
+                return False
+            self._seen[key] = now
+            return True
+
+
+class SignalFeed:
+    """
+    Collects pushed curtailment events from a webhook and/or an SSE stream.
+
+    Usage:
+        feed = SignalFeed(listen=("127.0.0.1", 8765), token="secret")
+        feed.start()
+        event = feed.get(timeout=300)   # None if the feed went quiet
+    """
+
+    def __init__(self, listen=None, token=None, sse_url=None, sse_headers=None, dedup_seconds=900):
+        self.listen = listen
+        self.token = token
+        self.sse_url = sse_url
+        self.sse_headers = sse_headers or {}
+        self.dedup = EventDeduplicator(dedup_seconds)
+        self.events = queue.Queue()
+        self.server = None
+        self.last_event_time = None
+
+    def publish(self, event):
+        """Queues one event unless it is malformed (see event_errors) or a duplicate. Returns True if queued."""
+        if event_errors(event):
+            return False
+        if not self.dedup.is_new(event):
+            return False
+        self.events.put(event)
+        return True
+
+    def get(self, timeout=None):
+        try:
+            event = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self.last_event_time = time.monotonic()
+        return event
+
+    def start(self):
+        if self.listen:
+            self._start_webhook()
+        if self.sse_url:
+            threading.Thread(target=self._consume_sse, name="gridwatch-sse", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    # --- Webhook receiver ---
+
+    def _start_webhook(self):
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.split("?")[0] != WEBHOOK_PATH:
+                    return self._reply(404, {"error": "not found"})
+                if feed.token and self.headers.get("X-GridWatch-Token") != feed.token:
+                    return self._reply(401, {"error": "bad token"})
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    event = json.loads(self.rfile.read(length) or b"null")
+                except ValueError:
+                    return self._reply(400, {"error": "invalid JSON"})
+                errors = event_errors(event)
+                if errors:
+                    return self._reply(400, {"error": "; ".join(errors)})
+                queued = feed.publish(event)
+                self._reply(202 if queued else 200, {"queued": queued})
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.listen, Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="gridwatch-webhook", daemon=True).start()
+
+    # --- SSE consumer ---
+
+    def _consume_sse(self):
+        last_id = None
+        backoff = 1
+        while True:
+            headers = dict(self.sse_headers, Accept="text/event-stream")
+            if last_id:
+                headers["Last-Event-ID"] = last_id
+            try:
+                with requests.get(self.sse_url, headers=headers, stream=True, timeout=(5, 90)) as response:
+                    response.raise_for_status()
+                    backoff = 1
+                    data, event_id = [], None
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line is None:
+                            continue
+                        if line == "":
+                            if data:
+                                self._publish_sse("\n".join(data), event_id)
+                            data, event_id = [], None
+                        elif line.startswith("data:"):
+                            data.append(line[5:].lstrip())
+                        elif line.startswith("id:"):
+                            event_id = last_id = line[3:].strip()
+            except Exception as e:
+                print(f"\n[PUSH] SSE stream lost ({e}); reconnecting in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def _publish_sse(self, payload, event_id):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if event_id and isinstance(event, dict):
+            event.setdefault("id", event_id)
+        self.publish(event)
+
+
+def run_push_mode(feed, handle_event, poll, regions, quiet_after=300):
+    """
+    Main loop for push mode.
+
+    handle_event(region, event) runs the normal hysteresis logic for each
+    pushed event; poll() is the regular check_grid_status(). Events for
+    regions we don't watch are ignored. When the feed has been quiet for
+    `quiet_after` seconds we poll once and keep listening. One poll runs
+    up front so the state is current before the first event.
+    """
+    feed.start()
+    poll()
+    while True:
+        event = feed.get(timeout=quiet_after)
+        if event is None:
+            print(f"\n[PUSH] No events for {quiet_after}s, polling instead.")
+            poll()
+            continue
+
+        region = event["region"].upper()
+        if region not in regions:
+            continue
+        try:
+            handle_event(region, event)
+        except Exception as e:
+            print(f"\n[PUSH] Could not process event for {region}: {e}")
+
+
+def publish(url, event, token=None, timeout=5):
+    """Stand-in publisher: POSTs one event to a controller's webhook."""
+    headers = {"X-GridWatch-Token": token} if token else {}
+    return requests.post(url, json=event, headers=headers, timeout=timeout)
+
+
+def _main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="GridWatch push-mode test publisher.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="send one test event to a controller's webhook")
+    pub.add_argument("--url", default="http://127.0.0.1:8765" + WEBHOOK_PATH)
+    pub.add_argument("--token")
+    pub.add_argument("--region", default="ERCOT")
+    pub.add_argument("--price", type=float, default=250.0)
+    pub.add_argument("--utilization", type=float, default=80.0)
+    pub.add_argument("--curtail", action="store_true")
+    args = parser.parse_args()
+
+    event = {
+        "region": args.region,
+        "curtail": args.curtail,
+        "trigger_reason": "TEST EVENT",
+        "metrics": {
+            "price_usd": args.price,
+            "load_mw": 0,
+            "utilization_pct": args.utilization,
+            "data_age_mins": 0,
+        },
+    }
+    response = publish(args.url, event, args.token)
+    print(f"{response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    _main()
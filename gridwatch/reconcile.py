@@ -0,0 +1,132 @@
+"""
+Desired-state reconciliation against a cached fleet state table.
+
+The controller only sends commands on transitions (curtail / resume), so
+without this nothing notices a rig restarted by hand mid-event, or a stop
+the management API acknowledged but never delivered.
+
+FleetStateTable holds the last observed state of every device, refreshed
+with one bulk read per backend (Backend.observe()). The Reconciler
+compares it with the state the controller last commanded for each device
+(FleetBackend.desired). It then re-sends the command only to the devices
+that drifted, so a cycle costs one read plus O(drifted devices) commands
+instead of O(fleet).
+
+Rules:
+- A device commanded to stop is held stopped until it is resumed. If it
+  shows up running again, it is stopped again.
+- A device commanded to start is only chased until it has been seen
+  running once (a dropped start). Stopping it by hand later is left
+  alone.
+- Devices are given `grace` seconds after a command before they count as
+  drifted (an ACPI shutdown takes a while). Offline or unknown devices are
+  skipped, since they can't be commanded anyway.
+- Backends mid-way through a staggered resume are skipped until the ramp
+  is done.
+
+Usage:
+    reconciler = Reconciler(grace=180)
+    reconciler.reconcile(backend)   # -> {"stop": [...], "start": [...]}
+"""
+import threading
+import time
+
+# Observed device states, as returned by Backend.observe()
+RUNNING = "running"
+STOPPED = "stopped"
+OFFLINE = "offline"
+UNKNOWN = "unknown"
+
+
+class FleetStateTable:
+    """In-memory (backend, device) -> (observed state, monotonic time) table."""
+
+    def __init__(self):
+        self.devices = {}
+        self.refreshed = {}  # backend -> monotonic time of the last bulk read
+        self._lock = threading.Lock()
+
+    def update(self, backend, observed):
+        """Stores one bulk read. Returns the devices whose state changed."""
+        now = time.monotonic()
+        changed = []
+        with self._lock:
+            for device, state in observed.items():
+                previous = self.devices.get((backend, device))
+                if previous is None or previous[0] != state:
+                    changed.append(device)
+                self.devices[(backend, device)] = (state, now)
+            self.refreshed[backend] = now
+        return changed
+
+    def get(self, backend, device):
+        with self._lock:
+            entry = self.devices.get((backend, device))
+        return entry[0] if entry else None
+
+    def age(self, backend):
+        """Seconds since `backend` was last read (None if never)."""
+        refreshed = self.refreshed.get(backend)
+        return None if refreshed is None else time.monotonic() - refreshed
+
+    def counts(self, backend):
+        """{state: number of devices} for one backend."""
+        counts = {}
+        with self._lock:
+            for (name, _), (state, _) in self.devices.items():
+                if name == backend:
+                    counts[state] = counts.get(state, 0) + 1
+        return counts
+
+
+class Reconciler:
+    """Re-sends commands to FleetBackend devices whose observed state drifted."""
+
+    def __init__(self, grace=180, table=None):
+        self.grace = grace
+        self.table = table or FleetStateTable()
+
+    def refresh(self, backend):
+        """One bulk read into the table. Returns False if the backend can't be observed."""
+        observed = backend.observe()
+        if observed is None:
+            return False
+        self.table.update(backend.name, observed)
+        return True
+
+    def drift(self, backend):
+        """
+        {"stop": [ids], "start": [ids]} of devices whose observed state is
+        not the commanded one. Confirms (and forgets) starts that landed.
+        """
+        now = time.monotonic()
+        drifted = {backend.stop_action: [], backend.start_action: []}
+        for device, (want, commanded_at) in list(backend.desired.items()):
+            seen = self.table.get(backend.name, device)
+            if seen not in (RUNNING, STOPPED):
+                continue
+            if seen == want:
+                if want == RUNNING:
+                    backend.desired.pop(device, None)  # start confirmed; no longer enforced
+                continue
+            if now - commanded_at < self.grace:
+                continue
+            drifted[backend.stop_action if want == STOPPED else backend.start_action].append(device)
+        return drifted
+
+    def reconcile(self, backend):
+        """
+        Refreshes `backend` and corrects its drift.
+        Returns {action: [ids re-sent]} (empty when nothing drifted).
+        """
+        if backend.resuming or not self.refresh(backend):
+            return {}
+        sent = {}
+        for action, ids in self.drift(backend).items():
+            if not ids:
+                continue
+            reason = "running again" if action == backend.stop_action else "still stopped"
+            print(f"\n   [RECONCILE] {backend.name}: {len(ids)} devices {reason}, re-sending {action}.")
+            backend.send_command(action, ids)
+            sent[action] = ids
+        return sent
@@ -0,0 +1,281 @@
+"""
+Tail-latency hardening for the GridWatch fetch.
+
+ResilientClient wraps a GridWatchClient with the same get_curtailment()
+interface and adds:
+
+- hedging: if a request is slower than the region's recent p95, a second
+  identical request is sent and whichever answers first wins;
+- retries with full-jitter exponential backoff for 429 / 5xx / network
+  errors, as long as they fit inside `deadline` seconds (the poll window);
+- a circuit breaker that opens after `failure_threshold` failed fetches in
+  a row and lets one trial request through every `reset_after` seconds;
+- a last-known-good snapshot per region, served while the breaker is open
+  or a fetch failed, with data_age_mins advanced by the local age and
+  "stale": True set.
+
+fail_safe() then decides what to do once the data is too old to trust:
+"curtail" (shed anyway), "run" (resume / keep running) or "hold" (freeze
+the current state until fresh data arrives).
+
+Usage:
+    client = ResilientClient(GridWatchClient(RAPIDAPI_KEY), deadline=30)
+    data = client.get_curtailment("ERCOT")
+    data, hold = fail_safe(data, "hold", max_age_mins=15)
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from gridwatch.api import GridWatchAPIError
+from gridwatch.metrics import ControllerMetrics
+
+# Fail-safe policies
+CURTAIL = "curtail"
+HOLD = "hold"
+RUN = "run"
+POLICIES = (CURTAIL, HOLD, RUN)
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open and there is no snapshot to serve."""
+
+
+def retryable(error):
+    """429s, 5xx and network errors are worth another try; other 4xx are not."""
+    if isinstance(error, GridWatchAPIError):
+        return error.status_code == 429 or error.status_code >= 500
+    return not isinstance(error, CircuitOpenError)
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed:    requests flow; `failure_threshold` failures in a row open it.
+    open:      requests are refused for `reset_after` seconds.
+    half_open: one trial request; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold=3, reset_after=60):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = HALF_OPEN
+                self._trial = False
+            if self.state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def failure(self):
+        """Records one failed fetch. Returns True if this opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != OPEN
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._trial = False
+                return opened
+            return False
+
+
+def stale_copy(data, held_seconds):
+    """A snapshot with data_age_mins advanced by the time it was held locally."""
+    metrics = dict(data.get("metrics") or {})
+    age = float(metrics.get("data_age_mins") or 0) + held_seconds / 60.0
+    metrics["data_age_mins"] = round(age, 2)
+    return dict(data, metrics=metrics, stale=True, stale_mins=round(age, 2))
+
+
+def fail_safe(data, policy, max_age_mins):
+    """
+    Applies the fail-safe policy when data_age_mins exceeds `max_age_mins`.
+    Returns (data, hold): hold=True means leave the current state alone.
+    Data that is fresh enough is returned unchanged.
+    """
+    age = (data.get("metrics") or {}).get("data_age_mins")
+    if max_age_mins is None or age is None or float(age) <= max_age_mins:
+        return data, False
+    if policy == HOLD:
+        return data, True
+    reason = f"FAIL-SAFE ({policy}): data is {float(age):.0f} min old"
+    return dict(data, curtail=policy == CURTAIL, trigger_reason=reason, fail_safe=True), False
+
+
+def no_data(policy):
+    """Stand-in response for when nothing has ever been fetched (e.g. right after a restart)."""
+    if policy == HOLD:
+        return None
+    return {
+        "curtail": policy == CURTAIL,
+        "trigger_reason": f"FAIL-SAFE ({policy}): no data from GridWatch",
+        "metrics": {"price_usd": None, "load_mw": None, "utilization_pct": None, "data_age_mins": None},
+        "stale": True,
+        "fail_safe": True,
+    }
+
+
+class ResilientClient:
+    """
+    GridWatchClient wrapper: hedged, retried, circuit-broken fetches with a
+    last-known-good fallback. Drop-in for the controller and fetch_regions().
+
+    hedge_min_ms:     never hedge sooner than this (avoids doubling every call).
+    hedge_default_ms: hedge delay until `hedge_samples` latencies are known.
+    """
+
+    def __init__(self, client, deadline=30, max_attempts=4, backoff_base=0.5, backoff_cap=8,
+                 hedge=True, hedge_min_ms=100, hedge_default_ms=1000, hedge_samples=20,
+                 failure_threshold=3, reset_after=60):
+        self.client = client
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_min_ms = hedge_min_ms
+        self.hedge_default_ms = hedge_default_ms
+        self.hedge_samples = hedge_samples
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.metrics = ControllerMetrics(enabled=False)  # replaced by the controller's
+        self.snapshots = {}  # (region, caps) -> (data, monotonic time fetched)
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="gridwatch-fetch")
+
+    # GridWatchClient attributes the controllers read
+    @property
+    def last_timing(self):
+        return self.client.last_timing
+
+    @property
+    def last_timings(self):
+        return self.client.last_timings
+
+    @property
+    def timeout(self):
+        return self.client.timeout
+
+    def seed(self, region, data, age_seconds, price_cap=None, stress_cap=None):
+        """Restores a journaled snapshot that was fetched `age_seconds` ago (e.g. by an earlier run)."""
+        with self._lock:
+            self.snapshots.setdefault((region, price_cap, stress_cap), (data, time.monotonic() - age_seconds))
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.client.close()
+
+    def hedge_delay(self, region):
+        """Seconds to wait before hedging: the p95 of recent successful calls."""
+        with self._lock:
+            samples = sorted(self._latencies.get(region, ()))
+        if len(samples) < self.hedge_samples:
+            return self.hedge_default_ms / 1000.0
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(p95, self.hedge_min_ms / 1000.0)
+
+    def _call(self, region, price_cap, stress_cap):
+        start = time.perf_counter()
+        data = self.client.get_curtailment(region, price_cap, stress_cap)
+        with self._lock:
+            self._latencies.setdefault(region, deque(maxlen=100)).append(time.perf_counter() - start)
+        return data
+
+    def _attempt(self, region, price_cap, stress_cap, deadline):
+        """One attempt; hedged with a second request if the first is slow."""
+        first = self._pool.submit(self._call, region, price_cap, stress_cap)
+        if not self.hedge:
+            return first.result()
+        done, _ = wait([first], timeout=self.hedge_delay(region))
+        if done:
+            return first.result()
+
+        self.metrics.fetch_event(region, "hedge")
+        second = self._pool.submit(self._call, region, price_cap, stress_cap)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"no answer within the {self.deadline}s poll window")
+            for future in done:
+                try:
+                    data = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is second:
+                    self.metrics.fetch_event(region, "hedge_won")
+                return data
+        raise error
+
+    def get_curtailment(self, region, price_cap=None, stress_cap=None):
+        """
+        Like GridWatchClient.get_curtailment(), but falls back to the
+        last-known-good snapshot (marked stale) instead of raising when the
+        API is slow or down. Raises only when there is no snapshot yet, or
+        for errors a retry can't fix (bad key, bad region).
+        """
+        key = (region, price_cap, stress_cap)
+        if not self.breaker.allow():
+            return self._snapshot(key, CircuitOpenError("circuit breaker open"))
+
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                data = self._attempt(region, price_cap, stress_cap, deadline)
+            except Exception as e:
+                if not retryable(e):
+                    self.breaker.success()  # the API answered; it's the request that's wrong
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                if attempt >= self.max_attempts or time.monotonic() + delay >= deadline:
+                    if self.breaker.failure():
+                        print(f"\n[BREAKER] GridWatch unreachable after {self.breaker.failures} failed polls; "
+                              f"serving last known data for {self.breaker.reset_after}s.")
+                        self.metrics.fetch_event(region, "breaker_open")
+                    return self._snapshot(key, e)
+                self.metrics.fetch_event(region, "retry")
+                time.sleep(delay)
+                continue
+
+            self.breaker.success()
+            with self._lock:
+                self.snapshots[key] = (data, time.monotonic())
+            return data
+
+    def _snapshot(self, key, error):
+        with self._lock:
+            snapshot = self.snapshots.get(key)
+        if snapshot is None:
+            raise error
+        data, fetched_at = snapshot
+        self.metrics.fetch_event(key[0], "snapshot")
+        return stale_copy(data, time.monotonic() - fetched_at)
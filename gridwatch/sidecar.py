@@ -0,0 +1,357 @@
+"""
+LAN caching sidecar: one upstream fetch per region per settlement interval,
+shared by every controller on the site.
+
+Serves the same GET /api/curtailment as the upstream API. The first request
+for a region (and cap combination) goes upstream; the answer is cached until
+the ISO should have published its next interval, worked out from the
+response's data_age_mins, so it never serves data older than upstream
+would. Requests that arrive while a fetch is in flight wait for that fetch
+instead of starting their own (coalescing), so a burst of clients after a
+publication still costs one upstream call.
+
+Cached answers are served from memory with data_age_mins advanced to the
+time of serving (adaptive pollers stay in phase), an ETag of the body
+actually served for 304s, and a Cache-Control max-age equal to the
+remaining TTL. If upstream fails, the last good answer is served for up
+to `max_stale` seconds, marked with X-GridWatch-Cache: STALE and, in the
+body, "stale": true (as the controller's own snapshots are). GET /health returns counters and
+TTLs as JSON.
+
+Usage:
+    python -m gridwatch.sidecar --api-key YOUR_RAPIDAPI_KEY --listen 0.0.0.0:8080 \\
+        --warm ERCOT PJM
+
+    # controllers:  GRIDWATCH_URL = "http://192.168.1.5:8080"
+    # Home Assistant rest sensor:  resource: "http://192.168.1.5:8080/api/curtailment"
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from gridwatch.api import API_URL, CURTAILMENT_PATH, GridWatchClient, GridWatchAPIError
+from gridwatch.resilience import stale_copy
+
+# One upstream answer, ready to serve. `data` is None for upstream errors;
+# `stale` marks a last good answer held while upstream is failing.
+CachedResponse = namedtuple(
+    "CachedResponse", ["status", "data", "body", "fetched_at", "expires_at", "stale"], defaults=(False,)
+)
+
+# X-GridWatch-Cache values
+HIT = "HIT"
+MISS = "MISS"
+COALESCED = "COALESCED"
+STALE = "STALE"
+
+
+def ttl_for(data, interval=300, publish_delay=20, retry_ttl=30, min_ttl=5, max_ttl=300):
+    """
+    Seconds until the next settlement interval should be available upstream.
+
+    data_age_mins says how long ago the current interval was published, so
+    the next one is due `interval - age` seconds from now, plus the usual
+    publication delay. Past that point (a late interval) the answer is kept
+    for `retry_ttl` seconds only.
+    """
+    age = ((data or {}).get("metrics") or {}).get("data_age_mins")
+    if age is None:
+        return min(max_ttl, interval)
+    remaining = interval - float(age) * 60 + publish_delay
+    if remaining <= 0:
+        remaining = retry_ttl
+    return max(min_ttl, min(max_ttl, remaining))
+
+
+class _Flight:
+    """One upstream fetch that other requests can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class CurtailmentCache:
+    """
+    Coalescing TTL cache in front of a GridWatchClient.
+
+    get(region, price_cap, stress_cap) returns (CachedResponse, cache state).
+    error_ttl: how long an upstream error answer (e.g. 429) is cached, so a
+               failing upstream isn't hammered by every client.
+    """
+
+    def __init__(self, client, interval=300, publish_delay=20, retry_ttl=30, min_ttl=5, max_ttl=300,
+                 error_ttl=5, max_stale=900):
+        self.client = client
+        self.interval = interval
+        self.publish_delay = publish_delay
+        self.retry_ttl = retry_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.error_ttl = error_ttl
+        self.max_stale = max_stale
+        self.entries = {}
+        self.good = {}  # key -> last successful CachedResponse, for stale-if-error
+        self.stats = {"requests": 0, HIT: 0, MISS: 0, COALESCED: 0, STALE: 0, "upstream": 0, "upstream_errors": 0}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(region, price_cap=None, stress_cap=None):
+        return (region.upper(), price_cap, stress_cap)
+
+    def get(self, region, price_cap=None, stress_cap=None, refresh=False):
+        key = self.key(region, price_cap, stress_cap)
+        now = time.monotonic()
+        with self._lock:
+            if not refresh:
+                self.stats["requests"] += 1
+            entry = self.entries.get(key)
+            if entry is not None and not refresh and now < entry.expires_at:
+                self.stats[HIT] += 1
+                return entry, HIT
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait(self.client.timeout + 1)
+            with self._lock:
+                self.stats[COALESCED] += 1
+            response = flight.response or entry
+            if response is None:
+                return self._unavailable("upstream fetch still in progress"), COALESCED
+            return response, COALESCED
+
+        state = MISS
+        try:
+            flight.response, state = self._fetch(key)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.response is not None:
+                    self.entries[key] = flight.response
+                if not refresh:
+                    self.stats[state] += 1
+            flight.done.set()
+        return flight.response, state
+
+    def _fetch(self, key):
+        region, price_cap, stress_cap = key
+        with self._lock:
+            self.stats["upstream"] += 1
+        now = time.monotonic()
+        try:
+            data = self.client.get_curtailment(region, price_cap, stress_cap)
+        except Exception as e:
+            with self._lock:
+                self.stats["upstream_errors"] += 1
+            good = self.good.get(key)
+            if good is not None and now - good.fetched_at < self.max_stale:
+                # Keep serving the last good answer; try upstream again after error_ttl
+                return good._replace(expires_at=now + self.error_ttl, stale=True), STALE
+            if isinstance(e, GridWatchAPIError):
+                body = e.text.encode() if isinstance(e.text, str) else (e.text or b"")
+                return CachedResponse(e.status_code, None, body, now, now + self.error_ttl), MISS
+            return self._unavailable(str(e))._replace(expires_at=now + self.error_ttl), MISS
+
+        body = json.dumps(data).encode()
+        ttl = ttl_for(data, self.interval, self.publish_delay, self.retry_ttl, self.min_ttl, self.max_ttl)
+        response = CachedResponse(200, data, body, now, now + ttl)
+        self.good[key] = response
+        return response, MISS
+
+    @staticmethod
+    def _unavailable(reason):
+        now = time.monotonic()
+        body = json.dumps({"error": f"upstream unavailable: {reason}"}).encode()
+        return CachedResponse(502, None, body, now, now)
+
+    def warm(self, regions, stop_event=None):
+        """
+        Keeps `regions` (no caps) fetched in the background, refetching each
+        one as soon as its TTL runs out, so clients rarely wait on upstream.
+        """
+        stop_event = stop_event or threading.Event()
+
+        def run():
+            while not stop_event.is_set():
+                for region in regions:
+                    entry = self.entries.get(self.key(region))
+                    if entry is None or time.monotonic() >= entry.expires_at:
+                        self.get(region, refresh=True)
+                with self._lock:
+                    expiries = [self.entries[self.key(r)].expires_at for r in regions if self.key(r) in self.entries]
+                wait = min(expiries, default=time.monotonic() + self.min_ttl) - time.monotonic()
+                stop_event.wait(max(wait, 0.05))
+
+        threading.Thread(target=run, name="gridwatch-sidecar-warm", daemon=True).start()
+        return stop_event
+
+    def summary(self):
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self.stats)
+            entries = {
+                "/".join(str(part) for part in key if part is not None): round(entry.expires_at - now, 1)
+                for key, entry in self.entries.items()
+            }
+        served = stats["requests"] or 1
+        stats["hit_ratio"] = round((stats[HIT] + stats[COALESCED] + stats[STALE]) / served, 3)
+        return {"stats": stats, "ttl_seconds": entries}
+
+
+def render(response, now=None):
+    """
+    Body to send for a cached answer: data_age_mins is advanced by the time
+    spent in the cache so downstream schedulers see the true age. A stale
+    answer (upstream failing) is marked like a ResilientClient snapshot.
+    """
+    if response.data is None:
+        return response.body
+    if response.stale:
+        return json.dumps(stale_copy(response.data, (now or time.monotonic()) - response.fetched_at)).encode()
+    metrics = response.data.get("metrics")
+    if not metrics or metrics.get("data_age_mins") is None:
+        return response.body
+    held = (now or time.monotonic()) - response.fetched_at
+    if held < 1:
+        return response.body
+    data = dict(response.data, metrics=dict(metrics, data_age_mins=round(metrics["data_age_mins"] + held / 60, 2)))
+    return json.dumps(data).encode()
+
+
+def etag_for(body):
+    """ETag of a served body. It changes whenever the rendered age or stale marker does."""
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+class Sidecar:
+    """
+    The HTTP side: serves a CurtailmentCache on the LAN.
+
+    token: if set, clients must send it as X-GridWatch-Token or as their
+           X-RapidAPI-Key (so scripts can just set RAPIDAPI_KEY to it).
+    """
+
+    def __init__(self, cache, listen=("0.0.0.0", 8080), token=None):
+        self.cache = cache
+        self.listen = listen
+        self.token = token
+        self.server = None
+
+    def start(self):
+        sidecar = self
+        cache = self.cache
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"     # keep-alive for pooled clients
+            disable_nagle_algorithm = True    # no delayed-ACK stall on small replies
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == "/health":
+                    return self._reply(200, json.dumps(cache.summary()).encode())
+                if url.path != CURTAILMENT_PATH:
+                    return self._reply(404, b'{"error": "not found"}')
+                if sidecar.token and sidecar.token not in (
+                    self.headers.get("X-GridWatch-Token"), self.headers.get("X-RapidAPI-Key")
+                ):
+                    return self._reply(401, b'{"error": "bad token"}')
+
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                region = query.get("region")
+                if not region:
+                    return self._reply(400, b'{"error": "region is required"}')
+                response, state = cache.get(region, query.get("price_cap"), query.get("stress_cap"))
+
+                headers = {"X-GridWatch-Cache": STALE if response.stale else state}
+                if response.status == 200:
+                    now = time.monotonic()
+                    body = render(response, now)
+                    headers["ETag"] = etag_for(body)
+                    headers["Age"] = str(int(now - response.fetched_at))
+                    headers["Cache-Control"] = f"max-age={max(0, int(response.expires_at - now))}"
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        return self._reply(304, b"", headers)
+                    return self._reply(200, body, headers)
+                self._reply(response.status, response.body, headers)
+
+            def _reply(self, status, body, headers=None):
+                self.send_response(status)
+                if status != 304:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.listen, Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="gridwatch-sidecar", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+
+def _main():
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="GridWatch LAN caching sidecar.")
+    parser.add_argument("--api-key", default=os.environ.get("RAPIDAPI_KEY"),
+                        help="RapidAPI key (default: $RAPIDAPI_KEY)")
+    parser.add_argument("--listen", default="0.0.0.0:8080", help="host:port to serve on (default 0.0.0.0:8080)")
+    parser.add_argument("--upstream", default=API_URL, help="upstream API base URL")
+    parser.add_argument("--token", help="shared secret clients must send (X-GridWatch-Token or X-RapidAPI-Key)")
+    parser.add_argument("--warm", nargs="*", default=[], metavar="REGION",
+                        help="regions to keep fetched in the background")
+    parser.add_argument("--max-stale", type=float, default=900,
+                        help="serve the last good answer this long when upstream fails (default 900s)")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("--api-key or $RAPIDAPI_KEY is required")
+
+    host, port = args.listen.rsplit(":", 1)
+    cache = CurtailmentCache(GridWatchClient(args.api_key, base_url=args.upstream), max_stale=args.max_stale)
+    sidecar = Sidecar(cache, (host, int(port)), args.token).start()
+    if args.warm:
+        cache.warm([region.upper() for region in args.warm])
+
+    print("--- GridWatch Sidecar Started ---")
+    print(f"Serving: {sidecar.url}{CURTAILMENT_PATH}  (health: {sidecar.url}/health)")
+    print(f"Upstream: {args.upstream}")
+    if args.warm:
+        print(f"Warm regions: {', '.join(args.warm)}")
+    print("Press Ctrl+C to stop.\n")
+    try:
+        while True:
+            time.sleep(300)
+            stats = cache.summary()["stats"]
+            print(f"[{time.strftime('%H:%M:%S')}] {stats['requests']} requests | {stats['upstream']} upstream "
+                  f"| hit ratio {stats['hit_ratio']:.0%} | {stats['upstream_errors']} upstream errors")
+    except KeyboardInterrupt:
+        sidecar.stop()
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DeviceGroup:
+    """
+    A set of devices that are shed together.
+
+    priority: lower numbers are shed first and resumed last. Put the most
+              expensive / least critical loads in the lowest tier.
+    mw:       the group's power draw, used to stop shedding once the
+              target reduction is reached.
+    """
+
+    def __init__(self, name, ids, priority=1, mw=0.0):
+        self.name = name
+        self.ids = list(ids)
+        self.priority = priority
+        self.mw = float(mw)
+
+    def __repr__(self):
+        return f"DeviceGroup({self.name!r}, {len(self.ids)} devices, priority={self.priority}, mw={self.mw})"
+
+    @classmethod
+    def from_config(cls, entries, default_ids):
+        """
+        Builds groups from the DEVICE_GROUPS list used in the trigger scripts.
+        An empty list means one group holding every device.
+        """
+        if not entries:
+            return [cls("all", default_ids)]
+        return [
+            cls(entry.get("name", f"group-{i}"), entry["ids"],
+                entry.get("priority", 1), entry.get("mw", 0.0))
+            for i, entry in enumerate(entries)
+        ]
+
+
+def shed_plan(groups, target_mw=None):
+    """
+    Returns the tiers to shed, in order, as a list of lists of groups.
+
+    Lowest priority first; within a priority the largest loads go first so
+    the target is reached with as few commands as possible. Stops adding
+    groups once `target_mw` is covered (None sheds everything).
+    """
+    ordered = sorted(groups, key=lambda g: (g.priority, -g.mw))
+    tiers = []
+    shed = 0.0
+    for group in ordered:
+        if target_mw is not None and shed >= target_mw:
+            break
+        if tiers and tiers[-1][0].priority == group.priority:
+            tiers[-1].append(group)
+        else:
+            tiers.append([group])
+        shed += group.mw
+    return tiers
+
+
+def resume_waves(groups, wave_size):
+    """
+    Splits the devices of `groups` into waves of at most `wave_size`,
+    most critical groups first.
+    """
+    ids = []
+    for group in sorted(groups, key=lambda g: (-g.priority, -g.mw)):
+        ids.extend(group.ids)
+    return [ids[i:i + wave_size] for i in range(0, len(ids), wave_size)]
+
+
+class TierScheduler:
+    """
+    Sheds device groups tier by tier and brings them back in waves.
+
+    stop_fn(ids) / start_fn(ids) send the actual commands for one list of
+    device IDs; they are whatever the backend already uses (Proxmox guest
+    dispatch, HiveOS/Foreman bulk dispatch, ...).
+
+    Curtailment runs every group of a tier in parallel, then moves to the
+    next tier until `target_mw` is shed. Resume starts `wave_size` devices
+    every `wave_interval` seconds from a background thread, so the poll
+    loop keeps running; a new curtailment cancels any waves not yet sent.
+    """
+
+    def __init__(self, groups, stop_fn, start_fn, target_mw=None, wave_size=50, wave_interval=10):
+        self.groups = groups
+        self.stop_fn = stop_fn
+        self.start_fn = start_fn
+        self.target_mw = target_mw
+        self.wave_size = wave_size
+        self.wave_interval = wave_interval
+
+        self.shed_groups = []
+        self._cancel = threading.Event()
+        self._resume_thread = None
+
+    def curtail(self):
+        """
+        Sheds tiers until the target is reached.
+        Returns (shed_mw, elapsed_seconds, {group name: stop_fn result}).
+        """
+        self.cancel_resume()
+        start = time.perf_counter()
+        results = {}
+        shed_mw = 0.0
+
+        for tier in shed_plan(self.groups, self.target_mw):
+            with ThreadPoolExecutor(max_workers=len(tier)) as pool:
+                for group, result in zip(tier, pool.map(lambda g: self.stop_fn(g.ids), tier)):
+                    results[group.name] = result
+                    shed_mw += group.mw
+                    if group not in self.shed_groups:
+                        self.shed_groups.append(group)
+
+        return shed_mw, time.perf_counter() - start, results
+
+    def resume(self, background=True):
+        """
+        Starts the shed groups again in rate-limited waves.
+        Returns the number of waves scheduled.
+        """
+        self.cancel_resume()
+        waves = resume_waves(self.shed_groups or self.groups, self.wave_size)
+        self.shed_groups = []
+        self._cancel.clear()
+
+        if background:
+            self._resume_thread = threading.Thread(
+                target=self._run_waves, args=(waves,), name="gridwatch-resume", daemon=True
+            )
+            self._resume_thread.start()
+        else:
+            self._run_waves(waves)
+        return len(waves)
+
+    def _run_waves(self, waves):
+        for i, wave in enumerate(waves):
+            if self._cancel.is_set():
+                print(f"      -> Resume cancelled after {i}/{len(waves)} waves.")
+                return
+            print(f"      -> Resume wave {i + 1}/{len(waves)}: {len(wave)} devices")
+            self.start_fn(wave)
+            if i + 1 < len(waves) and self._cancel.wait(self.wave_interval):
+                print(f"      -> Resume cancelled after {i + 1}/{len(waves)} waves.")
+                return
+
+    @property
+    def resuming(self):
+        """True while resume waves are still being sent."""
+        return self._resume_thread is not None and self._resume_thread.is_alive()
+
+    def cancel_resume(self):
+        """Stops an in-flight resume before its next wave."""
+        if self._resume_thread and self._resume_thread.is_alive():
+            self._cancel.set()
+            self._resume_thread.join()
+        self._resume_thread = None
@@ -1,15 +1,21 @@
-import requests
-import time
-import datetime
-import os
+import sys
+
+from gridwatch.backends import CallbackBackend
+from gridwatch.controller import Controller
 
 # --- CONFIGURATION ---
 # Get your key from: https://rapidapi.com/cnorris1316/api/gridwatch-us-telemetry
 RAPIDAPI_KEY = "YOUR_RAPIDAPI_KEY_HERE"
 
+GRIDWATCH_URL = None   # [LAN Sidecar] e.g. "http://192.168.1.5:8080"; None = RapidAPI directly
+
 # Region Options: PJM, MISO, ERCOT, SPP, NYISO, ISONE, CAISO
 REGION = "ERCOT"
 
+# Multi-Region Mode: list several ISOs to watch them all from one process,
+# e.g. ["ERCOT", "PJM", "MISO"]. Leave empty to monitor REGION only.
+REGIONS = []
+
 # Safety Thresholds
 PRICE_CAP = 200        # Shut down if price > $200/MWh
 STRESS_CAP = 90        # Shut down if grid stress > 90%
@@ -20,116 +26,93 @@ COOLDOWN_MINUTES = 15  # Minutes grid must be NORMAL before resuming
 # Simulation Mode (Set to False to actually execute commands)
 SIMULATION_MODE = True
 
-# --- STATE TRACKING (DO NOT EDIT) ---
-# These variables track the "Live" state of your farm.
-# Modifying them manually will break the auto-resume logic.
-CURRENTLY_CURTAILED = False
-LAST_NORMAL_TIME = None
-
-def stop_mining_rigs():
+# --- OPTIONAL FEATURES ---
+# Each is described in integrations/README.md under the heading in brackets.
+LOCAL_DECISIONS = True                  # [Local Decisions] False = let the API decide
+HISTORY_DIR = "gridwatch_history"       # [Metric History] None disables
+STATE_FILE = "gridwatch_state.jsonl"    # [Warm Restarts] None disables
+EVENTS_FILE = "gridwatch_events.jsonl"  # [Event Stream] None disables
+RECONCILE_INTERVAL = None               # [Fleet Reconciliation] seconds, e.g. 120
+RESILIENT_FETCH = True                  # [Fetch Resilience & Fail-Safe]
+FAIL_SAFE_POLICY = "hold"               # "curtail", "run" or "hold" once data is stale
+FAIL_SAFE_AFTER_MINS = 15
+FORECAST_THRESHOLD = None               # [Pre-emptive Curtailment] e.g. 0.8
+FORECAST_HORIZON = 3                    # 5-minute intervals ahead
+ADAPTIVE_POLLING = True                 # [Adaptive Polling] False = fixed 300 s poll
+PUSH_ENABLED = False                    # [Push Mode]
+PUSH_LISTEN = ("127.0.0.1", 8765)
+PUSH_TOKEN = None                       # Shared secret expected in X-GridWatch-Token
+PUSH_SSE_URL = None                     # Server-Sent Events URL to subscribe to
+METRICS_LISTEN = None                   # [Prometheus Metrics] e.g. ("127.0.0.1", 9108)
+
+# --- BACKENDS ---
+# Everything listed here is curtailed from this one process: one poll per
+# cycle, then stop / resume sent to every backend concurrently, each with
+# its own timeout. `regions=[...]` limits a backend to some ISOs, and
+# `profile={...}` gives it its own caps and cooldown [Local Decisions].
+# Leave the list empty to use the stop_mining_rigs / resume_mining_rigs
+# hooks below. Import the ones you use, e.g.
+# from gridwatch.backends import ProxmoxBackend, HiveOSBackend, ForemanBackend, ShellBackend, WebhookBackend
+BACKENDS = [
+    # ProxmoxBackend({"pve": "192.168.1.10"}, "root@pam", token_name="gridwatch",
+    #                token_value="YOUR_TOKEN", vmids=[100, 101, 102], timeout=120),
+    # HiveOSBackend("YOUR_HIVE_API_TOKEN", 123456, [112233, 445566], timeout=60),
+    # ForemanBackend("YOUR_FOREMAN_TOKEN", [123, 456], regions=["PJM"], timeout=60),
+    # ShellBackend("pdu", "./pdu.sh off", "./pdu.sh on", timeout=30,
+    #              profile={"price_cap": 120, "stress_cap": 95, "cooldown_minutes": 30}),
+    # WebhookBackend("home-assistant", "http://homeassistant.local:8123/api/webhook/gridwatch"),
+]
+
+def stop_mining_rigs(region):
     """
     Place your specific shutdown logic here.
+    `region` tells you which ISO triggered the curtailment.
     Examples:
     - Call a smart plug API (Tasmota/Kasa/Shelly)
     - SSH into a management node
     - Execute a local shell command
     """
-    print("   [ACTION] 🛑 SENDING SHUTDOWN SIGNAL TO RIGS...")
+    print(f"   [ACTION] 🛑 SENDING SHUTDOWN SIGNAL TO {region} RIGS...")
 
-def resume_mining_rigs():
+def resume_mining_rigs(region):
     """
     Place your specific resume/start logic here.
     """
-    print("   [ACTION] SENDING RESUME SIGNAL TO RIGS...")
-
-def check_grid_status():
-    global CURRENTLY_CURTAILED, LAST_NORMAL_TIME
-
-    url = "https://gridwatch-us-telemetry.p.rapidapi.com/api/curtailment"
-
-    querystring = {
-        "region": REGION,
-        "price_cap": str(PRICE_CAP),
-        "stress_cap": str(STRESS_CAP)
-    }
-
-    headers = {
-        "X-RapidAPI-Key": RAPIDAPI_KEY,
-        "X-RapidAPI-Host": "gridwatch-us-telemetry.p.rapidapi.com"
-    }
-
-    try:
-        print(f"Checking {REGION} grid status...", end="\r")
-        response = requests.get(url, headers=headers, params=querystring, timeout=10)
-
-        if response.status_code != 200:
-            print(f"\n❌ API Error: {response.status_code} - {response.text}")
-            return
-
-        data = response.json()
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-
-        # --- LOGIC ENGINE ---
-        if data.get('curtail'):
-            # CASE 1: Grid is CRITICAL
-            if not CURRENTLY_CURTAILED:
-                print(f"\n[{timestamp}] 🔴 CURTAILMENT SIGNAL RECEIVED!")
-                print(f"   Reason: {data['trigger_reason']}")
-                print(f"   Price: ${data['metrics']['price_usd']}/MWh | Load: {data['metrics']['load_mw']} MW")
-
-                if not SIMULATION_MODE:
-                    stop_mining_rigs()
-                    CURRENTLY_CURTAILED = True
-                else:
-                    print("   [SIMULATION] Shutdown command sent.")
-                    CURRENTLY_CURTAILED = True
-
-            # Reset cooldown timer because grid is bad again
-            LAST_NORMAL_TIME = None
-
-        else:
-            # CASE 2: Grid is NORMAL
-            if CURRENTLY_CURTAILED:
-                # We are currently stopped, check if we can resume
-                if LAST_NORMAL_TIME is None:
-                    print(f"\n[{timestamp}] 🟡 Grid Normal. Starting {COOLDOWN_MINUTES}m cooldown timer...")
-                    LAST_NORMAL_TIME = datetime.datetime.now()
-
-                # Check how long it has been normal
-                elapsed = datetime.datetime.now() - LAST_NORMAL_TIME
-                remaining = (COOLDOWN_MINUTES * 60) - elapsed.total_seconds()
-
-                if remaining <= 0:
-                    print(f"\n[{timestamp}] 🟢 Cooldown Complete. Resuming Operations.")
-                    if not SIMULATION_MODE:
-                        resume_mining_rigs()
-                        CURRENTLY_CURTAILED = False
-                        LAST_NORMAL_TIME = None
-                    else:
-                        print("   [SIMULATION] Resume command sent.")
-                        CURRENTLY_CURTAILED = False
-                        LAST_NORMAL_TIME = None
-                else:
-                    # Still waiting
-                    print(f"\n[{timestamp}] 🟡 Grid Normal. Waiting {int(remaining/60)}m {int(remaining%60)}s for safety cooldown.")
-
-            else:
-                # Normal Operation (Already Running)
-                print(f"\n[{timestamp}] 🟢 Grid Normal. Operations Nominal.")
-
-            print(f"   Price: ${data['metrics']['price_usd']}/MWh | Utilization: {data['metrics']['utilization_pct']}%")
-
-    except Exception as e:
-        print(f"\nError connecting to GridWatch: {e}")
+    print(f"   [ACTION] SENDING RESUME SIGNAL TO {region} RIGS...")
+
+# --- CONTROLLER ---
+# Shared polling + decision core: one pooled API session, one RegionState
+# (curtailed flag + cooldown timer) per region, adaptive poll timing.
+CONTROLLER = Controller(
+    RAPIDAPI_KEY, REGIONS or [REGION],
+    BACKENDS or [CallbackBackend("rigs", stop_mining_rigs, resume_mining_rigs)],
+    price_cap=PRICE_CAP,
+    stress_cap=STRESS_CAP,
+    cooldown_minutes=COOLDOWN_MINUTES,
+    simulation=SIMULATION_MODE,
+    local_decisions=LOCAL_DECISIONS,
+    history_dir=HISTORY_DIR,
+    adaptive_polling=ADAPTIVE_POLLING,
+    metrics_listen=METRICS_LISTEN,
+    base_url=GRIDWATCH_URL,
+    state_file=STATE_FILE,
+    events_file=EVENTS_FILE,
+    reconcile_interval=RECONCILE_INTERVAL,
+    resilient=RESILIENT_FETCH,
+    fail_safe_policy=FAIL_SAFE_POLICY,
+    fail_safe_after_mins=FAIL_SAFE_AFTER_MINS,
+    forecast_threshold=FORECAST_THRESHOLD,
+    forecast_horizon=FORECAST_HORIZON
+)
 
 if __name__ == "__main__":
-    print(f"--- GridWatch 'Kill Switch' Monitor Started ---")
-    print(f"Monitoring: {REGION}")
-    print(f"Thresholds: Price > ${PRICE_CAP} | Stress > {STRESS_CAP}%")
-    print(f"Cooldown: {COOLDOWN_MINUTES} Minutes")
-    print(f"Press Ctrl+C to stop.\n")
-
-    while True:
-        check_grid_status()
-        # Check every 5 minutes (300 seconds)
-        time.sleep(300)
+    # --once: one poll + dispatch, then exit (for systemd timers / cron)
+    if "--once" in sys.argv[1:]:
+        CONTROLLER.once()
+        sys.exit(0)
+    CONTROLLER.banner("GridWatch 'Kill Switch' Monitor")
+    feed = None
+    if PUSH_ENABLED:
+        from gridwatch.push import SignalFeed
+        feed = SignalFeed(PUSH_LISTEN, PUSH_TOKEN, PUSH_SSE_URL)
+    CONTROLLER.run(feed)
@@ -0,0 +1,73 @@
+"""
+GridWatch: real-time grid price and stress for Home Assistant.
+
+configuration.yaml:
+
+    gridwatch:
+      api_key: !secret gridwatch_api_key
+      regions: [ERCOT, PJM]
+      price_cap: 200          # $/MWh: curtail binary_sensor
+      stress_cap: 90          # % utilization
+      cooldown_minutes: 15
+      cheap_below: 0.05       # $/kWh: cheap power binary_sensor
+      expensive_above: 0.10
+"""
+import voluptuous as vol
+
+from homeassistant.const import CONF_API_KEY, CONF_SCAN_INTERVAL, Platform
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.discovery import async_load_platform
+
+from .const import (
+    API_URL, CONF_CHEAP_BELOW, CONF_CHEAP_DELAY, CONF_COOLDOWN, CONF_EXPENSIVE_ABOVE, CONF_PRICE_CAP,
+    CONF_REGIONS, CONF_STRESS_CAP, CONF_URL, DEFAULT_CHEAP_BELOW, DEFAULT_CHEAP_DELAY, DEFAULT_COOLDOWN,
+    DEFAULT_EXPENSIVE_ABOVE, DEFAULT_PRICE_CAP, DEFAULT_REGIONS, DEFAULT_SCAN_INTERVAL, DEFAULT_STRESS_CAP,
+    DOMAIN,
+)
+from .coordinator import GridWatchCoordinator
+
+PLATFORMS = [Platform.SENSOR, Platform.BINARY_SENSOR]
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema({
+            vol.Required(CONF_API_KEY): cv.string,
+            vol.Optional(CONF_REGIONS, default=DEFAULT_REGIONS): vol.All(
+                cv.ensure_list, [vol.All(cv.string, vol.Upper)], vol.Length(min=1)),
+            # LAN sidecar (python -m gridwatch.sidecar), e.g. http://192.168.1.5:8080
+            vol.Optional(CONF_URL, default=API_URL): cv.url,
+            vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): cv.time_period,
+            vol.Optional(CONF_PRICE_CAP, default=DEFAULT_PRICE_CAP): vol.Coerce(float),
+            vol.Optional(CONF_STRESS_CAP, default=DEFAULT_STRESS_CAP): vol.Coerce(float),
+            vol.Optional(CONF_COOLDOWN, default=DEFAULT_COOLDOWN): cv.positive_int,
+            vol.Optional(CONF_CHEAP_BELOW, default=DEFAULT_CHEAP_BELOW): vol.Coerce(float),
+            vol.Optional(CONF_EXPENSIVE_ABOVE, default=DEFAULT_EXPENSIVE_ABOVE): vol.Coerce(float),
+            vol.Optional(CONF_CHEAP_DELAY, default=DEFAULT_CHEAP_DELAY): cv.positive_int,
+        })
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup(hass, config):
+    """Creates the shared coordinator and loads the sensor platforms."""
+    conf = config[DOMAIN]
+    coordinator = GridWatchCoordinator(
+        hass,
+        api_key=conf[CONF_API_KEY],
+        regions=conf[CONF_REGIONS],
+        url=conf[CONF_URL],
+        scan_interval=conf[CONF_SCAN_INTERVAL],
+        price_cap=conf[CONF_PRICE_CAP],
+        stress_cap=conf[CONF_STRESS_CAP],
+        cooldown_minutes=conf[CONF_COOLDOWN],
+        cheap_below=conf[CONF_CHEAP_BELOW],
+        expensive_above=conf[CONF_EXPENSIVE_ABOVE],
+        cheap_delay_minutes=conf[CONF_CHEAP_DELAY],
+    )
+    await coordinator.async_refresh()
+    hass.data[DOMAIN] = coordinator
+
+    for platform in PLATFORMS:
+        hass.async_create_task(async_load_platform(hass, platform, DOMAIN, {}, config))
+    return True
@@ -0,0 +1,63 @@
+"""Curtail and cheap-power binary sensors, with native hysteresis (see coordinator.py)."""
+from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    if discovery_info is None:
+        return
+    coordinator = hass.data[DOMAIN]
+    entities = []
+    for region in coordinator.regions:
+        entities.append(CurtailSensor(coordinator, region))
+        entities.append(CheapPowerSensor(coordinator, region))
+    async_add_entities(entities)
+
+
+class GridWatchBinarySensor(CoordinatorEntity, BinarySensorEntity):
+    key = None
+    label = None
+
+    def __init__(self, coordinator, region):
+        super().__init__(coordinator)
+        self.region = region
+        self._attr_name = f"GridWatch {region} {self.label}"
+        self._attr_unique_id = f"{DOMAIN}_{region.lower()}_{self.key}"
+
+    @property
+    def available(self):
+        return super().available and self.region in (self.coordinator.data or {})
+
+    @property
+    def is_on(self):
+        return self.coordinator.data[self.region][self.key]
+
+
+class CurtailSensor(GridWatchBinarySensor):
+    """
+    ON while the grid is over price_cap / stress_cap, and until it has
+    been normal for cooldown_minutes. The same rule the Python controllers use.
+    """
+
+    key = "curtail"
+    label = "Curtail"
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+
+    @property
+    def extra_state_attributes(self):
+        region = self.coordinator.data[self.region]
+        return {
+            "trigger_reason": region["trigger_reason"],
+            "cooldown_remaining_s": round(region["cooldown_remaining"]),
+            "price_cap": self.coordinator.price_cap,
+            "stress_cap": self.coordinator.stress_cap,
+        }
+
+
+class CheapPowerSensor(GridWatchBinarySensor):
+    """ON when power is cheap; replaces the template binary_sensor.gridwatch_cheap_power."""
+
+    key = "cheap"
+    label = "Cheap Power Available"
@@ -0,0 +1,28 @@
+"""Constants for the GridWatch integration."""
+from datetime import timedelta
+
+DOMAIN = "gridwatch"
+
+API_HOST = "gridwatch-us-telemetry.p.rapidapi.com"
+API_URL = f"https://{API_HOST}"
+CURTAILMENT_PATH = "/api/curtailment"
+
+CONF_REGIONS = "regions"
+CONF_URL = "url"
+CONF_PRICE_CAP = "price_cap"
+CONF_STRESS_CAP = "stress_cap"
+CONF_COOLDOWN = "cooldown_minutes"
+CONF_CHEAP_BELOW = "cheap_below"
+CONF_EXPENSIVE_ABOVE = "expensive_above"
+CONF_CHEAP_DELAY = "cheap_delay_minutes"
+
+DEFAULT_REGIONS = ["ERCOT"]
+DEFAULT_SCAN_INTERVAL = timedelta(seconds=300)
+DEFAULT_PRICE_CAP = 200        # $/MWh
+DEFAULT_STRESS_CAP = 90        # % utilization
+DEFAULT_COOLDOWN = 15          # minutes
+DEFAULT_CHEAP_BELOW = 0.05     # $/kWh
+DEFAULT_EXPENSIVE_ABOVE = 0.10  # $/kWh
+DEFAULT_CHEAP_DELAY = 5        # minutes
+
+REQUEST_TIMEOUT = 10
@@ -0,0 +1,170 @@
+"""
+One coordinated update for every configured region.
+
+All regions are fetched concurrently over Home Assistant's shared, pooled
+aiohttp session, with ETags so an unchanged interval costs a 304. The
+entities only read coordinator.data, so adding a region or an attribute
+never adds an API call.
+
+The hysteresis that configuration.yaml did with template re-rendering
+lives here as plain state objects, updated once per fetch:
+
+- CurtailState: the controllers' rule. Curtail when price > price_cap or
+  utilization > stress_cap, and stay curtailed until the grid has been
+  normal for `cooldown_minutes`.
+- CheapPowerState: the "cheap power" band. On below `cheap_below`, off
+  above `expensive_above`, unchanged in between. A flip only happens once
+  the new side has held for `delay_minutes`.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+import aiohttp
+
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import API_HOST, CURTAILMENT_PATH, DOMAIN, REQUEST_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CurtailState:
+    """Curtail / cooldown hysteresis for one region (gridwatch.monitor.RegionState)."""
+
+    def __init__(self, cooldown_minutes):
+        self.cooldown = timedelta(minutes=cooldown_minutes)
+        self.curtailed = False
+        self.normal_since = None
+
+    def update(self, breach, now):
+        """Feeds one reading. Returns the seconds left in the cooldown (0 if none)."""
+        if breach:
+            self.curtailed = True
+            self.normal_since = None
+            return 0
+        if not self.curtailed:
+            return 0
+        if self.normal_since is None:
+            self.normal_since = now
+        remaining = (self.cooldown - (now - self.normal_since)).total_seconds()
+        if remaining <= 0:
+            self.curtailed = False
+            self.normal_since = None
+            return 0
+        return remaining
+
+
+class CheapPowerState:
+    """Cheap-power band with an on / off delay (the old template binary_sensor)."""
+
+    def __init__(self, cheap_below, expensive_above, delay_minutes):
+        self.cheap_below = cheap_below
+        self.expensive_above = expensive_above
+        self.delay = timedelta(minutes=delay_minutes)
+        self.is_on = False
+        self.pending_since = None
+
+    def update(self, price_kwh, now):
+        """Feeds one price in $/kWh (None: no price published, treated as expensive)."""
+        if price_kwh is None or price_kwh > self.expensive_above:
+            want = False
+        elif price_kwh < self.cheap_below:
+            want = True
+        else:
+            want = self.is_on
+        if want == self.is_on:
+            self.pending_since = None
+            return self.is_on
+        if self.pending_since is None:
+            self.pending_since = now
+        if now - self.pending_since >= self.delay:
+            self.is_on = want
+            self.pending_since = None
+        return self.is_on
+
+
+def breach_reason(metrics, price_cap, stress_cap):
+    """The trigger reason if either cap is breached, else None (gridwatch.decision.evaluate)."""
+    price = metrics.get("price_usd")
+    utilization = metrics.get("utilization_pct")
+    reasons = []
+    if price is not None and float(price) > price_cap:
+        reasons.append(f"Price ${price}/MWh > ${price_cap:g} cap")
+    if utilization is not None and float(utilization) > stress_cap:
+        reasons.append(f"Grid stress {utilization}% > {stress_cap:g}% cap")
+    return " & ".join(reasons) or None
+
+
+class GridWatchCoordinator(DataUpdateCoordinator):
+    """
+    Fetches every region in one update. coordinator.data is
+    {region: {"metrics", "curtail", "trigger_reason", "cooldown_remaining", "cheap"}}.
+    A region whose fetch failed is left out, and its entities go
+    unavailable. The update only fails when every region did.
+    """
+
+    def __init__(self, hass, api_key, regions, url, scan_interval, price_cap, stress_cap,
+                 cooldown_minutes, cheap_below, expensive_above, cheap_delay_minutes):
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=scan_interval)
+        self.session = async_get_clientsession(hass)
+        self.regions = list(regions)
+        self.url = url.rstrip("/") + CURTAILMENT_PATH
+        self.headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": API_HOST}
+        self.price_cap = price_cap
+        self.stress_cap = stress_cap
+        self.curtail = {region: CurtailState(cooldown_minutes) for region in self.regions}
+        self.cheap = {
+            region: CheapPowerState(cheap_below, expensive_above, cheap_delay_minutes)
+            for region in self.regions
+        }
+        self._cache = {}  # region -> (etag, last response)
+
+    async def _fetch(self, region):
+        headers = dict(self.headers)
+        cached = self._cache.get(region)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        async with self.session.get(
+            self.url, params={"region": region}, headers=headers,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        ) as response:
+            if response.status == 304 and cached:
+                return cached[1]
+            if response.status != 200:
+                text = await response.text()
+                raise UpdateFailed(f"API error {response.status} - {text[:200]}")
+            data = await response.json()
+            etag = response.headers.get("ETag")
+        if etag:
+            self._cache[region] = (etag, data)
+        return data
+
+    async def _async_update_data(self):
+        results = await asyncio.gather(*(self._fetch(region) for region in self.regions),
+                                       return_exceptions=True)
+        now = dt_util.utcnow()
+        data = {}
+        errors = []
+        for region, result in zip(self.regions, results):
+            if isinstance(result, Exception):
+                errors.append(f"{region}: {str(result) or type(result).__name__}")  # timeouts have no message
+                continue
+            metrics = result.get("metrics") or {}
+            reason = breach_reason(metrics, self.price_cap, self.stress_cap)
+            remaining = self.curtail[region].update(reason is not None, now)
+            price = metrics.get("price_usd")
+            data[region] = {
+                "metrics": metrics,
+                "curtail": self.curtail[region].curtailed,
+                "trigger_reason": reason,
+                "cooldown_remaining": remaining,
+                "cheap": self.cheap[region].update(None if price is None else float(price) / 1000, now),
+            }
+        if errors:
+            _LOGGER.warning("GridWatch fetch failed for %s", "; ".join(errors))
+        if not data:
+            raise UpdateFailed("; ".join(errors))
+        return data
@@ -0,0 +1,99 @@
+"""Price, load, utilization and data age sensors, one set per region."""
+from dataclasses import dataclass
+from typing import Callable
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass, SensorEntity, SensorEntityDescription, SensorStateClass,
+)
+from homeassistant.const import PERCENTAGE, UnitOfPower, UnitOfTime
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+
+
+@dataclass(frozen=True, kw_only=True)
+class GridWatchSensorDescription(SensorEntityDescription):
+    value_fn: Callable
+
+
+def _price_kwh(metrics):
+    # Tier 2 regions (Duke, TVA, ...) publish no price: the sensor reads unknown
+    price = metrics.get("price_usd")
+    return None if price is None else round(float(price) / 1000, 5)
+
+
+SENSORS = (
+    GridWatchSensorDescription(
+        key="price",
+        name="Price",
+        native_unit_of_measurement="USD/kWh",
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=4,
+        value_fn=_price_kwh,
+    ),
+    GridWatchSensorDescription(
+        key="load",
+        name="Load",
+        device_class=SensorDeviceClass.POWER,
+        native_unit_of_measurement=UnitOfPower.MEGA_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.get("load_mw"),
+    ),
+    GridWatchSensorDescription(
+        key="utilization",
+        name="Utilization",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.get("utilization_pct"),
+    ),
+    GridWatchSensorDescription(
+        key="data_age",
+        name="Data Age",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        value_fn=lambda metrics: metrics.get("data_age_mins"),
+    ),
+)
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    if discovery_info is None:
+        return
+    coordinator = hass.data[DOMAIN]
+    async_add_entities(
+        GridWatchSensor(coordinator, region, description)
+        for region in coordinator.regions
+        for description in SENSORS
+    )
+
+
+class GridWatchSensor(CoordinatorEntity, SensorEntity):
+    """One metric of one region, read from the shared coordinator."""
+
+    def __init__(self, coordinator, region, description):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self.region = region
+        self._attr_name = f"GridWatch {region} {description.name}"
+        self._attr_unique_id = f"{DOMAIN}_{region.lower()}_{description.key}"
+
+    @property
+    def available(self):
+        return super().available and self.region in (self.coordinator.data or {})
+
+    @property
+    def native_value(self):
+        return self.entity_description.value_fn(self.coordinator.data[self.region]["metrics"])
+
+    @property
+    def extra_state_attributes(self):
+        if self.entity_description.key != "price":
+            return None
+        # Same attributes the REST sensor exposed, plus the raw $/MWh price
+        metrics = self.coordinator.data[self.region]["metrics"]
+        return {
+            "price_usd_mwh": metrics.get("price_usd"),
+            "utilization_pct": metrics.get("utilization_pct"),
+            "load_mw": metrics.get("load_mw"),
+            "data_age_mins": metrics.get("data_age_mins"),
+        }
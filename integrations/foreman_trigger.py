@@ -1,12 +1,18 @@
-import requests
-import time
-import datetime
 import os
+import sys
+
+# Make the shared `gridwatch` package importable when run as a script.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gridwatch.backends import ForemanBackend
+from gridwatch.controller import Controller
 
 # --- CONFIGURATION ---
 # Get your key from: https://rapidapi.com/cnorris1316/api/gridwatch-us-telemetry
 RAPIDAPI_KEY = "YOUR_RAPIDAPI_KEY_HERE"
 
+GRIDWATCH_URL = None   # [LAN Sidecar] e.g. "http://192.168.1.5:8080"; None = RapidAPI directly
+
 # Region Options: PJM, MISO, ERCOT, SPP, NYISO, ISONE, CAISO
 REGION = "ERCOT"
 
@@ -20,130 +26,89 @@ COOLDOWN_MINUTES = 15  # Minutes grid must be NORMAL before resuming
 # Simulation Mode (Set to False to actually execute shutdown commands)
 SIMULATION_MODE = True
 
+# --- OPTIONAL FEATURES ---
+# Each is described in integrations/README.md under the heading in brackets.
+LOCAL_DECISIONS = True                  # [Local Decisions] False = let the API decide
+HISTORY_DIR = "gridwatch_history"       # [Metric History] None disables
+STATE_FILE = "gridwatch_state.jsonl"    # [Warm Restarts] None disables
+EVENTS_FILE = "gridwatch_events.jsonl"  # [Event Stream] None disables
+RECONCILE_INTERVAL = None               # [Fleet Reconciliation] seconds, e.g. 120
+RESILIENT_FETCH = True                  # [Fetch Resilience & Fail-Safe]
+FAIL_SAFE_POLICY = "hold"               # "curtail", "run" or "hold" once data is stale
+FAIL_SAFE_AFTER_MINS = 15
+FORECAST_THRESHOLD = None               # [Pre-emptive Curtailment] e.g. 0.8
+FORECAST_HORIZON = 3                    # 5-minute intervals ahead
+ADAPTIVE_POLLING = True                 # [Adaptive Polling] False = fixed 300 s poll
+PUSH_ENABLED = False                    # [Push Mode]
+PUSH_LISTEN = ("127.0.0.1", 8765)
+PUSH_TOKEN = None                       # Shared secret expected in X-GridWatch-Token
+PUSH_SSE_URL = None                     # Server-Sent Events URL to subscribe to
+METRICS_LISTEN = None                   # [Prometheus Metrics] e.g. ("127.0.0.1", 9108)
+
 # --- FOREMAN CONFIGURATION ---
 FOREMAN_ENABLED = True
 FOREMAN_API_TOKEN = "YOUR_FOREMAN_TOKEN"
 FOREMAN_MINER_IDS = [123, 456] # List of Miner IDs to control (Required)
-
-# --- STATE TRACKING (DO NOT EDIT) ---
-CURRENTLY_CURTAILED = False
-LAST_NORMAL_TIME = None
-
-def stop_mining_rigs():
-    """
-    Executes shutdown logic for Foreman.
-    """
-    print(f"   [ACTION] 🛑 SENDING SHUTDOWN SIGNAL TO FOREMAN...")
-
-    if FOREMAN_ENABLED:
-        try:
-            url = "https://api.foreman.mn/api/v2/miners/command"
-            headers = {"Authorization": f"Token {FOREMAN_API_TOKEN}"}
-            # 'stop' pauses mining; usually safer than full power off
-            payload = {"command": "stop", "miner_ids": FOREMAN_MINER_IDS}
-
-            requests.post(url, json=payload, headers=headers)
-            print("      -> Foreman: Stop command sent.")
-        except Exception as e:
-            print(f"      -> Foreman Error: {e}")
-
-def resume_mining_rigs():
-    """
-    Executes resume logic for Foreman.
-    """
-    print(f"   [ACTION] SENDING RESUME SIGNAL TO FOREMAN...")
-
-    if FOREMAN_ENABLED:
-        try:
-            url = "https://api.foreman.mn/api/v2/miners/command"
-            headers = {"Authorization": f"Token {FOREMAN_API_TOKEN}"}
-            payload = {"command": "start", "miner_ids": FOREMAN_MINER_IDS}
-
-            requests.post(url, json=payload, headers=headers)
-            print("      -> Foreman: Start command sent.")
-        except Exception as e:
-            print(f"      -> Foreman Error: {e}")
-
-def check_grid_status():
-    global CURRENTLY_CURTAILED, LAST_NORMAL_TIME
-
-    url = "https://gridwatch-us-telemetry.p.rapidapi.com/api/curtailment"
-
-    querystring = {
-        "region": REGION,
-        "price_cap": str(PRICE_CAP),
-        "stress_cap": str(STRESS_CAP)
-    }
-
-    headers = {
-        "X-RapidAPI-Key": RAPIDAPI_KEY,
-        "X-RapidAPI-Host": "gridwatch-us-telemetry.p.rapidapi.com"
-    }
-
-    try:
-        print(f"Checking {REGION} grid status...", end="\r")
-        response = requests.get(url, headers=headers, params=querystring, timeout=10)
-
-        if response.status_code != 200:
-            print(f"\n❌ API Error: {response.status_code} - {response.text}")
-            return
-
-        data = response.json()
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-
-        if data.get('curtail'):
-            # CASE 1: CRITICAL
-            if not CURRENTLY_CURTAILED:
-                print(f"\n[{timestamp}] 🔴 CURTAILMENT SIGNAL RECEIVED!")
-                print(f"   Reason: {data['trigger_reason']}")
-                print(f"   Price: ${data['metrics']['price_usd']}/MWh | Load: {data['metrics']['load_mw']} MW")
-
-                if not SIMULATION_MODE:
-                    stop_mining_rigs()
-                    CURRENTLY_CURTAILED = True
-                else:
-                    print("   [SIMULATION] Foreman Stop command would fire.")
-                    CURRENTLY_CURTAILED = True
-
-            LAST_NORMAL_TIME = None
-
-        else:
-            # CASE 2: NORMAL
-            if CURRENTLY_CURTAILED:
-                if LAST_NORMAL_TIME is None:
-                    print(f"\n[{timestamp}] 🟡 Grid Normal. Starting {COOLDOWN_MINUTES}m cooldown...")
-                    LAST_NORMAL_TIME = datetime.datetime.now()
-
-                elapsed = datetime.datetime.now() - LAST_NORMAL_TIME
-                remaining = (COOLDOWN_MINUTES * 60) - elapsed.total_seconds()
-
-                if remaining <= 0:
-                    print(f"\n[{timestamp}] 🟢 Cooldown Complete. Resuming Foreman.")
-                    if not SIMULATION_MODE:
-                        resume_mining_rigs()
-                        CURRENTLY_CURTAILED = False
-                        LAST_NORMAL_TIME = None
-                    else:
-                        print("   [SIMULATION] Foreman Start command would fire.")
-                        CURRENTLY_CURTAILED = False
-                        LAST_NORMAL_TIME = None
-                else:
-                    print(f"\n[{timestamp}] 🟡 Waiting for cooldown ({int(remaining)}s)...")
-            else:
-                print(f"\n[{timestamp}] 🟢 Grid Normal. Foreman Running.")
-
-            print(f"   Price: ${data['metrics']['price_usd']}/MWh")
-
-    except Exception as e:
-        print(f"\nError connecting to GridWatch: {e}")
+FOREMAN_BATCH_SIZE = 100       # Max miner IDs per API request
+FOREMAN_MAX_PARALLEL = 4       # Requests in flight at once
+FOREMAN_TIMEOUT = 60           # Seconds to wait for a stop/start before moving on
+
+# --- PRIORITY TIERS (optional) ---
+# Lower priority numbers are shed first and resumed last; "mw" is the group's draw.
+# Leave DEVICE_GROUPS empty to treat every FOREMAN_MINER_IDS entry as one group.
+DEVICE_GROUPS = [
+    # {"name": "s9-fleet",  "ids": [123], "priority": 1, "mw": 1.4},
+    # {"name": "s19-fleet", "ids": [456], "priority": 2, "mw": 3.2},
+]
+CURTAIL_TARGET_MW = None   # Stop shedding once this many MW are off (None = shed everything)
+RESUME_WAVE_SIZE = 50     # Devices started per resume wave
+RESUME_WAVE_INTERVAL = 30  # Seconds between resume waves (ramp)
+
+# --- CONTROLLER ---
+# Shared polling + decision core (gridwatch.controller) driving the Foreman backend.
+# 'stop' pauses mining; usually safer than full power off.
+BACKENDS = []
+if FOREMAN_ENABLED:
+    BACKENDS.append(ForemanBackend(
+        FOREMAN_API_TOKEN, FOREMAN_MINER_IDS,
+        batch_size=FOREMAN_BATCH_SIZE,
+        max_parallel=FOREMAN_MAX_PARALLEL,
+        groups=DEVICE_GROUPS,
+        target_mw=CURTAIL_TARGET_MW,
+        wave_size=RESUME_WAVE_SIZE,
+        wave_interval=RESUME_WAVE_INTERVAL,
+        timeout=FOREMAN_TIMEOUT
+    ))
+
+CONTROLLER = Controller(
+    RAPIDAPI_KEY, [REGION], BACKENDS,
+    price_cap=PRICE_CAP,
+    stress_cap=STRESS_CAP,
+    cooldown_minutes=COOLDOWN_MINUTES,
+    simulation=SIMULATION_MODE,
+    local_decisions=LOCAL_DECISIONS,
+    history_dir=HISTORY_DIR,
+    adaptive_polling=ADAPTIVE_POLLING,
+    metrics_listen=METRICS_LISTEN,
+    base_url=GRIDWATCH_URL,
+    state_file=STATE_FILE,
+    events_file=EVENTS_FILE,
+    reconcile_interval=RECONCILE_INTERVAL,
+    resilient=RESILIENT_FETCH,
+    fail_safe_policy=FAIL_SAFE_POLICY,
+    fail_safe_after_mins=FAIL_SAFE_AFTER_MINS,
+    forecast_threshold=FORECAST_THRESHOLD,
+    forecast_horizon=FORECAST_HORIZON
+)
 
 if __name__ == "__main__":
-    print(f"--- GridWatch 'Kill Switch' (Foreman) Started ---")
-    print(f"Monitoring: {REGION}")
-    print(f"Thresholds: Price > ${PRICE_CAP} | Stress > {STRESS_CAP}%")
-    print(f"Cooldown: {COOLDOWN_MINUTES} Minutes")
-    print(f"Press Ctrl+C to stop.\n")
-
-    while True:
-        check_grid_status()
-        time.sleep(300)
+    # --once: one poll + dispatch, then exit (for systemd timers / cron)
+    if "--once" in sys.argv[1:]:
+        CONTROLLER.once()
+        sys.exit(0)
+    CONTROLLER.banner("GridWatch 'Kill Switch' (Foreman)")
+    feed = None
+    if PUSH_ENABLED:
+        from gridwatch.push import SignalFeed
+        feed = SignalFeed(PUSH_LISTEN, PUSH_TOKEN, PUSH_SSE_URL)
+    CONTROLLER.run(feed)
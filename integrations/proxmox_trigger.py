@@ -1,15 +1,17 @@
-import requests
-import time
-import datetime
-import urllib3
-from proxmoxer import ProxmoxAPI
+import os
+import sys
 
-# Disable SSL warnings for self-signed Proxmox certs
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Make the shared `gridwatch` package importable when run as a script.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gridwatch.backends import ProxmoxBackend
+from gridwatch.controller import Controller
 
 # --- CONFIGURATION ---
 # Get your key from: https://rapidapi.com/cnorris1316/api/gridwatch-us-telemetry
 RAPIDAPI_KEY = "YOUR_RAPIDAPI_KEY_HERE"
+
+GRIDWATCH_URL = None   # [LAN Sidecar] e.g. "http://192.168.1.5:8080"; None = RapidAPI directly
 REGION = "ERCOT" # Region Options: PJM, MISO, ERCOT, SPP, NYISO, ISONE, CAISO
 
 # Safety Thresholds
@@ -20,147 +22,108 @@ COOLDOWN_MINUTES = 15  # Minutes grid must be NORMAL before resuming
 # Simulation Mode (Set to False to actually execute shutdowns)
 SIMULATION_MODE = True
 
+# --- OPTIONAL FEATURES ---
+# Each is described in integrations/README.md under the heading in brackets.
+LOCAL_DECISIONS = True                  # [Local Decisions] False = let the API decide
+HISTORY_DIR = "gridwatch_history"       # [Metric History] None disables
+STATE_FILE = "gridwatch_state.jsonl"    # [Warm Restarts] None disables
+EVENTS_FILE = "gridwatch_events.jsonl"  # [Event Stream] None disables
+RECONCILE_INTERVAL = None               # [Fleet Reconciliation] seconds, e.g. 120
+RESILIENT_FETCH = True                  # [Fetch Resilience & Fail-Safe]
+FAIL_SAFE_POLICY = "hold"               # "curtail", "run" or "hold" once data is stale
+FAIL_SAFE_AFTER_MINS = 15
+FORECAST_THRESHOLD = None               # [Pre-emptive Curtailment] e.g. 0.8
+FORECAST_HORIZON = 3                    # 5-minute intervals ahead
+ADAPTIVE_POLLING = True                 # [Adaptive Polling] False = fixed 300 s poll
+PUSH_ENABLED = False                    # [Push Mode]
+PUSH_LISTEN = ("127.0.0.1", 8765)
+PUSH_TOKEN = None                       # Shared secret expected in X-GridWatch-Token
+PUSH_SSE_URL = None                     # Server-Sent Events URL to subscribe to
+METRICS_LISTEN = None                   # [Prometheus Metrics] e.g. ("127.0.0.1", 9108)
+
 # --- PROXMOX CONFIGURATION ---
 PROXMOX_ENABLED = True
 PROXMOX_HOST = "192.168.1.X"      # IP address of your Proxmox Server
 PROXMOX_USER = "root@pam"         # User (usually root@pam)
 PROXMOX_PASSWORD = "YOUR_PASSWORD"
 PROXMOX_NODE = "pve"              # Name of your node (check your web UI)
-TARGET_VMS = [100, 101, 102]      # List of VM IDs to manage
-
-# --- STATE TRACKING (DO NOT EDIT) ---
-CURRENTLY_CURTAILED = False
-LAST_NORMAL_TIME = None
-
-def get_proxmox_connection():
-    """Establishes a connection to the Proxmox API."""
-    try:
-        return ProxmoxAPI(
-            PROXMOX_HOST,
-            user=PROXMOX_USER,
-            password=PROXMOX_PASSWORD,
-            verify_ssl=False
-        )
-    except Exception as e:
-        print(f"   [ERROR] Could not connect to Proxmox: {e}")
-        return None
-
-def curtail_workloads():
-    """
-    Executes GRACEFUL SHUTDOWN for Proxmox VMs.
-    Protects filesystem integrity for AI/HPC workloads.
-    """
-    print(f"   [ACTION] 🛑 INITIATING GRACEFUL SHUTDOWN (SIGTERM)...")
-
-    if PROXMOX_ENABLED:
-        proxmox = get_proxmox_connection()
-        if not proxmox: return
-
-        for vmid in TARGET_VMS:
-            try:
-                # 1. Check status first
-                status = proxmox.nodes(PROXMOX_NODE).qemu(vmid).status.current.get()
-                if status.get('status') == 'running':
-                    # 2. Send ACPI Shutdown (Soft Stop)
-                    proxmox.nodes(PROXMOX_NODE).qemu(vmid).status.shutdown.post()
-                    print(f"      -> VM {vmid}: Shutdown signal sent.")
-                else:
-                    print(f"      -> VM {vmid}: Already stopped.")
-            except Exception as e:
-                print(f"      -> VM {vmid} Error: {e}")
-
-def resume_workloads():
-    """
-    Boots up Proxmox VMs (AI/Compute Nodes).
-    """
-    print(f"   [ACTION] INITIATING COMPUTE STARTUP...")
-
-    if PROXMOX_ENABLED:
-        proxmox = get_proxmox_connection()
-        if not proxmox: return
-
-        for vmid in TARGET_VMS:
-            try:
-                status = proxmox.nodes(PROXMOX_NODE).qemu(vmid).status.current.get()
-                if status.get('status') == 'stopped':
-                    proxmox.nodes(PROXMOX_NODE).qemu(vmid).status.start.post()
-                    print(f"      -> VM {vmid}: Start signal sent.")
-                else:
-                    print(f"      -> VM {vmid}: Already running.")
-            except Exception as e:
-                print(f"      -> VM {vmid} Error: {e}")
-
-def check_grid_status():
-    global CURRENTLY_CURTAILED, LAST_NORMAL_TIME
 
-    url = "https://gridwatch-us-telemetry.p.rapidapi.com/api/curtailment"
-    querystring = {"region": REGION, "price_cap": str(PRICE_CAP), "stress_cap": str(STRESS_CAP)}
-    headers = {"X-RapidAPI-Key": RAPIDAPI_KEY, "X-RapidAPI-Host": "gridwatch-us-telemetry.p.rapidapi.com"}
-
-    try:
-        print(f"Checking {REGION} grid status...", end="\r")
-        response = requests.get(url, headers=headers, params=querystring, timeout=10)
-
-        if response.status_code != 200:
-            print(f"\n❌ API Error: {response.status_code} - {response.text}")
-            return
-
-        data = response.json()
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-
-        # --- LOGIC ENGINE ---
-        if data.get('curtail'):
-            # CASE 1: CRITICAL
-            if not CURRENTLY_CURTAILED:
-                print(f"\n[{timestamp}] 🔴 CURTAILMENT SIGNAL RECEIVED!")
-                print(f"   Reason: {data['trigger_reason']}")
-                print(f"   Price: ${data['metrics']['price_usd']}/MWh")
-
-                if not SIMULATION_MODE:
-                    curtail_workloads()
-                    CURRENTLY_CURTAILED = True
-                else:
-                    print("   [SIMULATION] Proxmox Shutdown would fire.")
-                    CURRENTLY_CURTAILED = True
-
-            LAST_NORMAL_TIME = None
-
-        else:
-            # CASE 2: NORMAL
-            if CURRENTLY_CURTAILED:
-                if LAST_NORMAL_TIME is None:
-                    print(f"\n[{timestamp}] 🟡 Grid Normal. Starting {COOLDOWN_MINUTES}m cooldown...")
-                    LAST_NORMAL_TIME = datetime.datetime.now()
-
-                elapsed = datetime.datetime.now() - LAST_NORMAL_TIME
-                remaining = (COOLDOWN_MINUTES * 60) - elapsed.total_seconds()
-
-                if remaining <= 0:
-                    print(f"\n[{timestamp}] 🟢 Cooldown Complete. Resuming Operations.")
-                    if not SIMULATION_MODE:
-                        resume_workloads()
-                        CURRENTLY_CURTAILED = False
-                        LAST_NORMAL_TIME = None
-                    else:
-                        print("   [SIMULATION] Proxmox Start command would fire.")
-                        CURRENTLY_CURTAILED = False
-                        LAST_NORMAL_TIME = None
-                else:
-                    print(f"\n[{timestamp}] 🟡 Waiting for cooldown ({int(remaining)}s)...")
-            else:
-                print(f"\n[{timestamp}] 🟢 Grid Normal. Workloads Active.")
-
-            print(f"   Price: ${data['metrics']['price_usd']}/MWh")
-
-    except Exception as e:
-        print(f"\nError connecting to GridWatch: {e}")
+# Optional API token (Datacenter -> Permissions -> API Tokens).
+# Recommended: tokens never expire, so no login is ever needed mid-event.
+PROXMOX_TOKEN_NAME = None         # e.g. "gridwatch"
+PROXMOX_TOKEN_VALUE = None        # e.g. "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
+
+# Clusters: map each node name to its address. Other cluster members are
+# discovered automatically, and guests are found on whichever node they run.
+PROXMOX_NODES = {PROXMOX_NODE: PROXMOX_HOST}
+
+# --- PRIORITY TIERS (optional) ---
+# Lower priority numbers are shed first and resumed last; "mw" is the group's draw.
+# Leave DEVICE_GROUPS empty to treat every TARGET_VMS entry as one group.
+DEVICE_GROUPS = [
+    # {"name": "batch-training", "ids": [100, 101], "priority": 1, "mw": 0.6},
+    # {"name": "inference",      "ids": [102],      "priority": 2, "mw": 0.2},
+]
+CURTAIL_TARGET_MW = None   # Stop shedding once this many MW are off (None = shed everything)
+RESUME_WAVE_SIZE = 10     # Devices started per resume wave
+RESUME_WAVE_INTERVAL = 30  # Seconds between resume waves (ramp)
+TARGET_VMS = [100, 101, 102]      # List of VM / LXC container IDs to manage
+PROXMOX_MAX_PARALLEL = 8          # Shutdown/start calls in flight at once
+PROXMOX_TIMEOUT = 120             # Seconds to wait for a shutdown/start before moving on
+PROXMOX_SHUTDOWN_DEADLINE = 120   # Seconds a guest gets to power off before escalation
+PROXMOX_HARD_STOP = True          # Hard-stop guests still running after the deadline (False = report only)
+
+# --- CONTROLLER ---
+# Shared polling + decision core (gridwatch.controller) driving the Proxmox backend.
+# Curtailment is a GRACEFUL (ACPI) shutdown, protecting filesystem integrity
+# for AI/HPC workloads; sessions are opened once at startup and reused.
+BACKENDS = []
+if PROXMOX_ENABLED:
+    BACKENDS.append(ProxmoxBackend(
+        PROXMOX_NODES, PROXMOX_USER,
+        password=PROXMOX_PASSWORD,
+        token_name=PROXMOX_TOKEN_NAME,
+        token_value=PROXMOX_TOKEN_VALUE,
+        vmids=TARGET_VMS,
+        max_parallel=PROXMOX_MAX_PARALLEL,
+        shutdown_deadline=PROXMOX_SHUTDOWN_DEADLINE,
+        hard_stop=PROXMOX_HARD_STOP,
+        groups=DEVICE_GROUPS,
+        target_mw=CURTAIL_TARGET_MW,
+        wave_size=RESUME_WAVE_SIZE,
+        wave_interval=RESUME_WAVE_INTERVAL,
+        timeout=PROXMOX_TIMEOUT
+    ))
+
+CONTROLLER = Controller(
+    RAPIDAPI_KEY, [REGION], BACKENDS,
+    price_cap=PRICE_CAP,
+    stress_cap=STRESS_CAP,
+    cooldown_minutes=COOLDOWN_MINUTES,
+    simulation=SIMULATION_MODE,
+    local_decisions=LOCAL_DECISIONS,
+    history_dir=HISTORY_DIR,
+    adaptive_polling=ADAPTIVE_POLLING,
+    metrics_listen=METRICS_LISTEN,
+    base_url=GRIDWATCH_URL,
+    state_file=STATE_FILE,
+    events_file=EVENTS_FILE,
+    reconcile_interval=RECONCILE_INTERVAL,
+    resilient=RESILIENT_FETCH,
+    fail_safe_policy=FAIL_SAFE_POLICY,
+    fail_safe_after_mins=FAIL_SAFE_AFTER_MINS,
+    forecast_threshold=FORECAST_THRESHOLD,
+    forecast_horizon=FORECAST_HORIZON
+)
 
 if __name__ == "__main__":
-    print(f"--- GridWatch 'Proxmox Controller' Started ---")
-    print(f"Targeting Node: {PROXMOX_NODE} | VMs: {TARGET_VMS}")
-    print(f"Thresholds: Price > ${PRICE_CAP}")
-    print(f"Press Ctrl+C to stop.\n")
-
-    while True:
-        check_grid_status()
-        time.sleep(300)
+    # --once: one poll + dispatch, then exit (for systemd timers / cron)
+    if "--once" in sys.argv[1:]:
+        CONTROLLER.once()
+        sys.exit(0)
+    CONTROLLER.banner("GridWatch 'Kill Switch' (Proxmox)")
+    feed = None
+    if PUSH_ENABLED:
+        from gridwatch.push import SignalFeed
+        feed = SignalFeed(PUSH_LISTEN, PUSH_TOKEN, PUSH_SSE_URL)
+    CONTROLLER.run(feed)
@@ -0,0 +1,67 @@
+"""
+Polls through the LAN sidecar over time: the served data_age_mins must keep
+advancing (no 304 pinning an old age) and a held answer must say it's stale.
+
+Usage:
+    python -m pytest -q tests/test_sidecar.py
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from gridwatch.api import GridWatchClient
+from gridwatch.sidecar import CurtailmentCache, Sidecar
+from mock_servers import MockGridWatch
+
+
+@pytest.fixture
+def sidecar():
+    upstream = MockGridWatch(latency_ms=0).start()
+    cache = CurtailmentCache(GridWatchClient("key", base_url=upstream.url, timeout=2), error_ttl=60)
+    server = Sidecar(cache, listen=("127.0.0.1", 0)).start()
+    host, port = server.server.server_address[:2]
+    client = GridWatchClient("key", base_url=f"http://{host}:{port}")
+    yield upstream, cache, client
+    server.server.shutdown()
+    upstream.stop()
+
+
+def age(cache, seconds):
+    """Pretend every cached answer was fetched `seconds` earlier."""
+    for store in (cache.entries, cache.good):
+        for key, response in store.items():
+            store[key] = response._replace(fetched_at=response.fetched_at - seconds)
+
+
+def test_age_advances_through_revalidation(sidecar):
+    upstream, cache, client = sidecar
+    assert client.get_curtailment("ERCOT")["metrics"]["data_age_mins"] == 0.5
+
+    age(cache, 120)
+    data = client.get_curtailment("ERCOT")
+    assert data["metrics"]["data_age_mins"] == pytest.approx(2.5, abs=0.05)
+    assert not data.get("stale")
+
+
+def test_held_answer_is_marked_stale(sidecar):
+    upstream, cache, client = sidecar
+    client.get_curtailment("ERCOT")
+
+    upstream.error_rate = 1.0  # every upstream call now answers 503
+    age(cache, 60)
+    for key, response in cache.entries.items():
+        cache.entries[key] = response._replace(expires_at=0)
+    data = client.get_curtailment("ERCOT")
+    assert data["stale"] is True
+    assert data["metrics"]["data_age_mins"] == data["stale_mins"] == pytest.approx(1.5, abs=0.05)
+
+    # Later polls answered from the held entry stay stale and keep ageing
+    age(cache, 60)
+    data = client.get_curtailment("ERCOT")
+    assert data["stale"] is True
+    assert data["metrics"]["data_age_mins"] == pytest.approx(2.5, abs=0.05)